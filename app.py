@@ -1,20 +1,23 @@
 import os
 import time
+import startup_profile
+startup_profile.begin(__name__)
 import random
 import json
+import hashlib
 import math
-import requests
-import redis
 import re
-from datetime import datetime, timedelta
+import threading
+import click
+from datetime import datetime, timezone
 from functools import wraps
-from flask import Flask, Response, render_template, request, jsonify, make_response
+from flask import Flask, Response, render_template, request, jsonify, make_response, g, stream_with_context
 from flask_cors import CORS
 from flask_compress import Compress
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
-from pytz import timezone as pytz_timezone
+import metrics
+import reference_snapshot
+import synthetic_data
 
 # Muat variabel environment
 load_dotenv()
@@ -35,12 +38,30 @@ IS_PRODUCTION = ENV_MODE == "production"
 USE_REAL_API_ENV = os.getenv("USE_REAL_API", "false").lower()
 USE_REAL_API = USE_REAL_API_ENV == "true"
 
+# Data sintetis (mode dummy / load test): seed tetap = output identik antar panggilan & instance
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", 42))
+SYNTHETIC_BMKG_COUNT = int(os.getenv("SYNTHETIC_BMKG_COUNT", 15))
+SYNTHETIC_USGS_COUNT = int(os.getenv("SYNTHETIC_USGS_COUNT", 50))
+
 # [BARU] Konfigurasi Base URL Peta
 # Di Production: Gunakan URL Supabase Storage
 # Di Development: Gunakan path lokal Flask '/static/maps'
 SUPABASE_MAPS_URL = os.getenv("SUPABASE_MAPS_URL") # Contoh: https://xyz.supabase.co/.../maps
 LOCAL_MAPS_URL = "/static/maps"
 
+# Render marker cuaca: "dom" (elemen HTML per marker) atau "gl" (GeoJSON ber-cluster, digambar WebGL)
+MARKER_RENDER_MODE = "gl" if os.getenv("MARKER_RENDER_MODE", "dom").lower() == "gl" else "dom"
+
+# URL Upstream (bisa diarahkan ke server tiruan lokal untuk benchmark/load test)
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+BMKG_URL = os.getenv("BMKG_URL", "https://data.bmkg.go.id/DataMKG/TEWS/gempaterkini.json")
+USGS_URL = os.getenv("USGS_URL", "https://earthquake.usgs.gov/fdsnws/event/1/query")
+
+# Snapshot data referensi (hasil migrate_data.py). Jika file tidak ada, lookup statis memakai database.
+REFERENCE_SNAPSHOT_PATH = os.getenv("REFERENCE_SNAPSHOT_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "reference_snapshot.bin"
+)
+
 print(f"🚀 RUNNING IN {ENV_MODE.upper()} MODE")
 print(f"📡 API SOURCE: {'REAL OPEN-METEO/BMKG' if USE_REAL_API else 'DUMMY DATA'}")
 
@@ -70,6 +91,27 @@ def cache_control(max_age=60, s_maxage=600, stale_while_revalidate=300):
         return wrapped_view
     return decorator
 
+# ================== INSTRUMENTASI REQUEST (METRICS) ==================
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") # Jika diisi, /metrics butuh "Authorization: Bearer <METRICS_TOKEN>"
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Mencatat latensi & ukuran payload per route lalu menambahkan header Server-Timing."""
+    start = g.pop('request_start', None)
+    if start is None: return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    metrics.HTTP_REQUEST_DURATION.observe(elapsed, route=route, method=request.method, status=response.status_code)
+    if not response.is_streamed and response.content_length is not None:
+        metrics.HTTP_RESPONSE_SIZE.observe(response.content_length, route=route)
+    response.headers['Server-Timing'] = metrics.format_server_timing(elapsed)
+    return response
+
 # ================== DATABASE CONFIGURATION (SUPABASE) ==================
 if IS_PRODUCTION:
     DATABASE_URL = os.getenv("DATABASE_URL")
@@ -84,51 +126,132 @@ else:
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Inisialisasi Engine DB (PostgreSQL)
+def _timed_queue_pool_class():
+    """QueuePool yang mencatat waktu tunggu checkout koneksi (metrik db_pool_wait_seconds)."""
+    from sqlalchemy.pool import QueuePool
+
+    class TimedQueuePool(QueuePool):
+        def _do_get(self):
+            with metrics.timed(metrics.DB_POOL_WAIT, "db-pool"):
+                return super()._do_get()
+    return TimedQueuePool
+
+def instrument_engine(db_engine):
+    """Memasang timer query (metrik db_query_duration_seconds + Server-Timing 'db') pada engine."""
+    from sqlalchemy import event
+
+    # Waktu mulai disimpan di execution context (satu per eksekusi), bukan stack di conn.info:
+    # query yang gagal tidak memanggil after_cursor_execute dan ikut dibuang bersama context-nya
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(db_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_query_start', None)
+        if start is None: return
+        elapsed = time.perf_counter() - start
+        metrics.DB_QUERY_DURATION.observe(elapsed)
+        metrics.add_server_timing("db", elapsed)
+
+# Inisialisasi Engine DB (PostgreSQL) secara lazy: import SQLAlchemy & pembuatan engine baru
+# terjadi pada query pertama, bukan saat cold start (mis. /api/wmo-codes tidak butuh DB).
 # Pool size disesuaikan untuk serverless (jangan terlalu besar)
 engine = None
 Session = None
-
-if DATABASE_URL:
-    engine = create_engine(
-        DATABASE_URL, 
-        pool_size=5, 
-        max_overflow=10, 
-        pool_pre_ping=True
-    )
-    Session = sessionmaker(bind=engine)
+_db_init_lock = threading.Lock()
+
+def get_session_factory():
+    """Sessionmaker database (engine dibuat saat pertama dipanggil). None jika DATABASE_URL kosong."""
+    global engine, Session
+    if Session is None and DATABASE_URL:
+        with _db_init_lock:
+            if Session is None:
+                with startup_profile.step("init db-engine"):
+                    from sqlalchemy import create_engine
+                    from sqlalchemy.orm import sessionmaker
+                    engine = create_engine(
+                        DATABASE_URL, 
+                        poolclass=_timed_queue_pool_class(),
+                        pool_size=5, 
+                        max_overflow=10, 
+                        pool_pre_ping=True
+                    )
+                    instrument_engine(engine)
+                    Session = sessionmaker(bind=engine)
+    return Session
 
 # ================== REDIS CACHE CONFIGURATION (UPSTASH) ==================
 
 REDIS_URL = os.getenv("REDIS_URL")
 redis_client = None
+_redis_checked = False
+_redis_init_lock = threading.Lock()
 
-if REDIS_URL:
-    try:
-        # Gunakan strict=False untuk parsing URL redis rediss://
-        redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-        # Test koneksi
-        redis_client.ping()
-        print("✅ Terhubung ke Redis (Upstash)")
-    except Exception as e:
-        print(f"❌ Gagal koneksi Redis: {e}")
-        redis_client = None
-else:
-    print("⚠️ REDIS_URL tidak ditemukan. Caching akan menggunakan in-memory (tidak persisten di Vercel).")
+def get_redis():
+    """
+    Client Redis yang dibuat lazy pada operasi cache pertama (bukan saat import), termasuk ping.
+    None jika REDIS_URL kosong atau koneksi gagal -> cache memakai in-memory.
+    """
+    global redis_client, _redis_checked
+    if redis_client is None and not _redis_checked:
+        with _redis_init_lock:
+            if not _redis_checked:
+                with startup_profile.step("init redis"):
+                    if REDIS_URL:
+                        try:
+                            import redis
+                            # Gunakan strict=False untuk parsing URL redis rediss://
+                            client = redis.from_url(REDIS_URL, decode_responses=True)
+                            # Test koneksi
+                            client.ping()
+                            redis_client = client
+                            print("✅ Terhubung ke Redis (Upstash)")
+                        except Exception as e:
+                            print(f"❌ Gagal koneksi Redis: {e}")
+                    else:
+                        print("⚠️ REDIS_URL tidak ditemukan. Caching akan menggunakan in-memory (tidak persisten di Vercel).")
+                _redis_checked = True
+    return redis_client
 
 # Cache TTL Defaults
 CACHE_TTL_WEATHER = 1800  # 30 menit
 CACHE_TTL_GEMPA_BMKG = 60 # 1 menit
 CACHE_TTL_GEMPA_USGS = 300 # 5 menit
+CACHE_TTL_STALE = int(os.getenv("CACHE_TTL_STALE", 21600)) # 6 jam: salinan "stale" untuk degradasi saat upstream ditolak/gagal
+
+# Konfigurasi Warm-Up Cache Cuaca
+# WARMUP_PRIORITY: urutan kelompok wilayah yang dipanaskan (dipisah koma)
+#   - "kabkota"   : semua Kabupaten/Kota
+#   - "kecamatan" : Kecamatan paling sering diminta (berdasarkan hit counter)
+WARMUP_PRIORITY = [p.strip() for p in os.getenv("WARMUP_PRIORITY", "kabkota,kecamatan").split(",") if p.strip()]
+WARMUP_BATCH_SIZE = int(os.getenv("WARMUP_BATCH_SIZE", 50))           # Lokasi per panggilan Open-Meteo
+WARMUP_TOP_KECAMATAN = int(os.getenv("WARMUP_TOP_KECAMATAN", 200))    # Jumlah kecamatan populer
+WARMUP_INTERVAL = int(os.getenv("WARMUP_INTERVAL", 900))  # Jarak antar run (detik), sama dengan jadwal .github/workflows/warmup.yml
+WARMUP_MARGIN = int(os.getenv("WARMUP_MARGIN", 300))      # Toleransi keterlambatan run (jitter penjadwal + durasi run)
+# Ambang = interval + margin: entri yang dilewati satu run masih hidup sampai run berikutnya.
+# Entri warm-up ditulis dengan TTL 2x ambang, sehingga run berikutnya melewatinya (sisa >= ambang)
+# dan run sesudahnya me-refresh-nya (sisa < ambang, belum kedaluwarsa): tiap entri di-refresh
+# sekali per dua interval (30 menit = CACHE_TTL_WEATHER pada jadwal 15 menit), bukan setiap run.
+WARMUP_REFRESH_BEFORE = int(os.getenv("WARMUP_REFRESH_BEFORE", WARMUP_INTERVAL + WARMUP_MARGIN))
+WARMUP_TIME_BUDGET = float(os.getenv("WARMUP_TIME_BUDGET", 40)) # Batas durasi satu run endpoint cron (detik), < maxDuration fungsi
+ROLLUP_DEBOUNCE = int(os.getenv("ROLLUP_DEBOUNCE", 300)) # Jeda minimum antar hitung ulang rollup dari request user (detik)
+SUB_WILAYAH_STREAM_CHUNK = int(os.getenv("SUB_WILAYAH_STREAM_CHUNK", 25)) # Lokasi per panggilan upstream saat streaming NDJSON
+CRON_SECRET = os.getenv("CRON_SECRET") # Penjadwal (GitHub Actions / Vercel Cron) mengirim "Authorization: Bearer <CRON_SECRET>"
+HIT_COUNTER_KEY = "hits:kecamatan"
 
 # Fallback In-Memory Cache (Jika Redis mati/tidak ada)
 MEMORY_CACHE = {}
+MEMORY_HIT_COUNTER = {}
 
-def get_cache(key):
-    """Mengambil data dari cache (Redis -> Memory)."""
+def _read_cache(key):
+    """Lookup cache mentah tanpa pencatatan metrik."""
+    client = get_redis()
+    start = time.perf_counter()
     try:
-        if redis_client:
-            data = redis_client.get(key)
+        if client:
+            data = client.get(key)
             return json.loads(data) if data else None
         else:
             entry = MEMORY_CACHE.get(key)
@@ -138,23 +261,404 @@ def get_cache(key):
     except Exception as e:
         print(f"Cache Get Error: {e}")
         return None
+    finally:
+        metrics.add_server_timing("cache", time.perf_counter() - start)
+
+def get_cache(key):
+    """Mengambil data dari cache (Redis -> Memory)."""
+    data = _read_cache(key)
+    metrics.CACHE_REQUESTS.inc(family=key.split(":", 1)[0], outcome="hit" if data else "miss")
+    return data
+
+def _payload_version(payload):
+    """Hash pendek (16 hex) dari payload JSON, dipakai sebagai versi data cuaca."""
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
 
-def set_cache(key, value, ttl):
-    """Menyimpan data ke cache (Redis -> Memory)."""
+def set_cache(key, value, ttl, stale_ttl=None, versioned=False):
+    """
+    Menyimpan data ke cache (Redis -> Memory).
+    Jika stale_ttl diisi, salinan juga disimpan di 'stale:<key>' dengan umur lebih panjang
+    agar bisa disajikan saat upstream kehabisan budget atau gagal.
+    Jika versioned, value (dict) diberi 'version' = hash payload JSON yang sama dengan yang
+    disimpan, sehingga data hanya diserialisasi sekali.
+    """
+    client = get_redis()
     try:
-        if redis_client:
-            redis_client.setex(key, ttl, json.dumps(value))
+        payload = None
+        if versioned:
+            payload = json.dumps(value)
+            value["version"] = _payload_version(payload)
+            # Sisipkan versi ke payload yang sudah jadi, tanpa serialisasi ulang
+            payload = f'{payload[:-1]}, "version": "{value["version"]}"}}'
+        if client:
+            payload = payload or json.dumps(value)
+            if stale_ttl:
+                pipe = client.pipeline(transaction=False)
+                pipe.setex(key, ttl, payload)
+                pipe.setex(f"stale:{key}", stale_ttl, payload)
+                pipe.execute()
+            else:
+                client.setex(key, ttl, payload)
         else:
+            now = time.time()
             MEMORY_CACHE[key] = {
                 'data': value,
-                'expire_at': time.time() + ttl
+                'expire_at': now + ttl
             }
+            if stale_ttl:
+                MEMORY_CACHE[f"stale:{key}"] = {'data': value, 'expire_at': now + stale_ttl}
     except Exception as e:
         print(f"Cache Set Error: {e}")
 
+def get_stale_cache(key):
+    """Mengambil salinan stale dari sebuah key (lihat set_cache stale_ttl)."""
+    data = _read_cache(f"stale:{key}")
+    metrics.CACHE_REQUESTS.inc(family=key.split(":", 1)[0], outcome="stale_hit" if data else "stale_miss")
+    return data
+
+def get_cache_ttls(keys):
+    """Sisa umur beberapa entri cache dalam detik (0 jika tidak ada/kedaluwarsa), satu round-trip Redis via pipeline."""
+    keys = list(keys)
+    if not keys: return []
+    client = get_redis()
+    try:
+        if client:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.ttl(key)
+            return [max(0, ttl) for ttl in pipe.execute()]
+        now = time.time()
+        ttls = []
+        for key in keys:
+            entry = MEMORY_CACHE.get(key)
+            ttls.append(max(0, int(entry['expire_at'] - now)) if entry else 0)
+        return ttls
+    except Exception as e:
+        print(f"Cache TTL Error: {e}")
+        return [0] * len(keys)
+
+def record_hits(wilayah_ids):
+    """Menambah hit counter untuk wilayah (dipakai warm-up untuk memilih kecamatan populer)."""
+    client = get_redis()
+    if not wilayah_ids: return
+    try:
+        if client:
+            pipe = client.pipeline(transaction=False)
+            for wilayah_id in wilayah_ids:
+                pipe.zincrby(HIT_COUNTER_KEY, 1, wilayah_id)
+            pipe.execute()
+        else:
+            for wilayah_id in wilayah_ids:
+                MEMORY_HIT_COUNTER[wilayah_id] = MEMORY_HIT_COUNTER.get(wilayah_id, 0) + 1
+    except Exception as e:
+        print(f"Hit Counter Error: {e}")
+
+def get_top_hits(limit):
+    """Mengambil ID wilayah dengan hit terbanyak (urut menurun)."""
+    client = get_redis()
+    try:
+        if client:
+            return client.zrevrange(HIT_COUNTER_KEY, 0, limit - 1)
+        ranked = sorted(MEMORY_HIT_COUNTER.items(), key=lambda kv: kv[1], reverse=True)
+        return [wilayah_id for wilayah_id, _ in ranked[:limit]]
+    except Exception as e:
+        print(f"Hit Counter Error: {e}")
+        return []
+
+# ================== RATE LIMIT UPSTREAM (TOKEN BUCKET) ==================
+
+# Budget bersama per upstream (dibagi semua instance serverless lewat Redis).
+# Format env: "<kapasitas>/<periode_detik>", contoh RATE_LIMIT_OPEN_METEO="600/60"
+# Biaya Open-Meteo dihitung per lokasi (satu panggilan multi-koordinat = N token).
+def _parse_rate_limit(env_name, default):
+    capacity, period = os.getenv(env_name, default).split("/")
+    return {"capacity": float(capacity), "refill_per_sec": float(capacity) / float(period)}
+
+UPSTREAM_BUDGETS = {
+    "open-meteo": _parse_rate_limit("RATE_LIMIT_OPEN_METEO", "600/60"),
+    "bmkg": _parse_rate_limit("RATE_LIMIT_BMKG", "30/60"),
+    "usgs": _parse_rate_limit("RATE_LIMIT_USGS", "30/60"),
+}
+
+# Prioritas: request interaktif (viewport user) didahulukan dari warm-up/background.
+# Panggilan background hanya boleh memakai token di atas cadangan (reserve) ini,
+# sehingga sisa budget selalu tersedia untuk user.
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+BACKGROUND_RESERVE_RATIO = float(os.getenv("RATE_LIMIT_BACKGROUND_RESERVE", 0.3))
+
+RATE_LIMIT_STATS_KEY = "ratelimit:stats"
+MEMORY_BUCKETS = {}
+MEMORY_RATE_LIMIT_STATS = {}
+
+# Refill + ambil token secara atomik di Redis
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local floor = tonumber(ARGV[5])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens - cost >= floor then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) * 2)
+return allowed
+"""
+_token_bucket_script = None
+
+def _take_memory_tokens(upstream, budget, cost, floor):
+    """Token bucket lokal (fallback jika Redis tidak tersedia)."""
+    now = time.time()
+    bucket = MEMORY_BUCKETS.setdefault(upstream, {'tokens': budget['capacity'], 'ts': now})
+    bucket['tokens'] = min(budget['capacity'], bucket['tokens'] + max(0, now - bucket['ts']) * budget['refill_per_sec'])
+    bucket['ts'] = now
+    if bucket['tokens'] - cost >= floor:
+        bucket['tokens'] -= cost
+        return True
+    return False
+
+def _record_rate_limit_stat(upstream, priority, outcome):
+    client = get_redis()
+    field = f"{upstream}:{priority}:{outcome}"
+    try:
+        if client:
+            client.hincrby(RATE_LIMIT_STATS_KEY, field, 1)
+            return
+    except Exception as e:
+        print(f"Rate Limit Stats Error: {e}")
+    MEMORY_RATE_LIMIT_STATS[field] = MEMORY_RATE_LIMIT_STATS.get(field, 0) + 1
+
+def _budget_floor(budget, priority):
+    """Sisa token minimum yang harus tertinggal setelah panggilan (cadangan untuk interaktif)."""
+    return budget['capacity'] * BACKGROUND_RESERVE_RATIO if priority == PRIORITY_BACKGROUND else 0
+
+def max_upstream_cost(upstream, priority=PRIORITY_INTERACTIVE):
+    """
+    Biaya terbesar yang masih mungkin diizinkan budget (bucket penuh dikurangi cadangan).
+    Panggilan yang lebih mahal selalu ditolak, jadi pemanggil harus memecahnya.
+    None jika upstream tidak dibatasi.
+    """
+    budget = UPSTREAM_BUDGETS.get(upstream)
+    if not budget: return None
+    return max(1, int(budget['capacity'] - _budget_floor(budget, priority)))
+
+def acquire_upstream_budget(upstream, cost=1, priority=PRIORITY_INTERACTIVE):
+    """
+    Mengambil token dari budget upstream. Mengembalikan True jika panggilan boleh dilakukan.
+    Jika False, pemanggil sebaiknya menyajikan data stale alih-alih memanggil upstream.
+    """
+    client = get_redis()
+    global _token_bucket_script
+    budget = UPSTREAM_BUDGETS.get(upstream)
+    if not budget: return True
+
+    floor = _budget_floor(budget, priority)
+    allowed = None
+    if client:
+        try:
+            if _token_bucket_script is None:
+                _token_bucket_script = client.register_script(TOKEN_BUCKET_LUA)
+            allowed = bool(_token_bucket_script(
+                keys=[f"ratelimit:bucket:{upstream}"],
+                args=[budget['capacity'], budget['refill_per_sec'], time.time(), cost, floor]
+            ))
+        except Exception as e:
+            print(f"Rate Limit Error ({upstream}): {e}")
+    if allowed is None:
+        allowed = _take_memory_tokens(upstream, budget, cost, floor)
+
+    _record_rate_limit_stat(upstream, priority, "allowed" if allowed else "denied")
+    if not allowed:
+        print(f"RATE LIMIT: {upstream} ({priority}) ditolak, biaya {cost} token.")
+    return allowed
+
+def get_rate_limit_stats():
+    """Counter allowed/denied per upstream & prioritas, contoh {"open-meteo": {"interactive:allowed": 10}}."""
+    client = get_redis()
+    raw = {}
+    try:
+        if client:
+            raw = client.hgetall(RATE_LIMIT_STATS_KEY)
+    except Exception as e:
+        print(f"Rate Limit Stats Error: {e}")
+    if not raw:
+        raw = MEMORY_RATE_LIMIT_STATS
+    stats = {}
+    for field, count in raw.items():
+        upstream, counter = field.split(":", 1)
+        stats.setdefault(upstream, {})[counter] = int(count)
+    return stats
+
+# ================== CIRCUIT BREAKER UPSTREAM ==================
+
+# State per upstream: closed (normal) -> open (fail fast) -> half-open (satu probe) -> closed/open.
+# State disimpan di Redis agar semua instance melihat outage yang sama (fallback in-memory).
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5)) # Gagal dalam jendela -> open
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", 60))        # Jendela rolling penghitungan gagal (detik)
+CIRCUIT_COOLDOWN = int(os.getenv("CIRCUIT_COOLDOWN", 30))    # Lama open sebelum half-open (detik)
+CIRCUIT_PROBE_TIMEOUT = 20  # Batas waktu satu probe half-open (> timeout request upstream)
+NEGATIVE_CACHE_TTL = int(os.getenv("NEGATIVE_CACHE_TTL", 30)) # Umur entri negatif (detik)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half-open"
+
+MEMORY_CIRCUITS = {}
+
+def _memory_circuit(upstream):
+    return MEMORY_CIRCUITS.setdefault(upstream, {'state': CIRCUIT_CLOSED, 'open_until': 0, 'probe_until': 0, 'failures': []})
+
+def get_circuit_state(upstream):
+    """Mengembalikan state circuit saat ini: closed / open / half-open."""
+    client = get_redis()
+    try:
+        if client:
+            state, open_until = client.mget(f"circuit:{upstream}:state", f"circuit:{upstream}:open")
+            if state != CIRCUIT_OPEN: return CIRCUIT_CLOSED
+            return CIRCUIT_OPEN if open_until else CIRCUIT_HALF_OPEN
+    except Exception as e:
+        print(f"Circuit Error ({upstream}): {e}")
+    circuit = _memory_circuit(upstream)
+    if circuit['state'] != CIRCUIT_OPEN: return CIRCUIT_CLOSED
+    return CIRCUIT_OPEN if time.time() < circuit['open_until'] else CIRCUIT_HALF_OPEN
+
+def circuit_allows(upstream, state=None):
+    """
+    True jika upstream boleh dipanggil. Saat open selalu False (fail fast);
+    saat half-open hanya satu pemanggil (probe) yang mendapat True.
+    state: hasil get_circuit_state yang sudah dibaca pemanggil (hemat satu round-trip).
+    """
+    client = get_redis()
+    state = state or get_circuit_state(upstream)
+    if state == CIRCUIT_CLOSED: return True
+    if state == CIRCUIT_OPEN: return False
+    try:
+        if client:
+            return bool(client.set(f"circuit:{upstream}:probe", 1, nx=True, ex=CIRCUIT_PROBE_TIMEOUT))
+    except Exception as e:
+        print(f"Circuit Error ({upstream}): {e}")
+    circuit = _memory_circuit(upstream)
+    now = time.time()
+    if now < circuit['probe_until']: return False
+    circuit['probe_until'] = now + CIRCUIT_PROBE_TIMEOUT
+    return True
+
+def _open_circuit(upstream):
+    client = get_redis()
+    print(f"CIRCUIT: {upstream} OPEN selama {CIRCUIT_COOLDOWN} detik.")
+    try:
+        if client:
+            pipe = client.pipeline(transaction=False)
+            pipe.set(f"circuit:{upstream}:state", CIRCUIT_OPEN)
+            pipe.set(f"circuit:{upstream}:open", 1, ex=CIRCUIT_COOLDOWN)
+            pipe.delete(f"circuit:{upstream}:probe", f"circuit:{upstream}:failures")
+            pipe.execute()
+            return
+    except Exception as e:
+        print(f"Circuit Error ({upstream}): {e}")
+    circuit = _memory_circuit(upstream)
+    circuit.update({'state': CIRCUIT_OPEN, 'open_until': time.time() + CIRCUIT_COOLDOWN, 'probe_until': 0, 'failures': []})
+
+def record_upstream_success(upstream):
+    """Menutup circuit setelah probe (atau panggilan biasa) berhasil."""
+    client = get_redis()
+    if get_circuit_state(upstream) == CIRCUIT_CLOSED: return
+    print(f"CIRCUIT: {upstream} pulih, CLOSED.")
+    try:
+        if client:
+            client.delete(f"circuit:{upstream}:state", f"circuit:{upstream}:open",
+                                f"circuit:{upstream}:probe", f"circuit:{upstream}:failures")
+            return
+    except Exception as e:
+        print(f"Circuit Error ({upstream}): {e}")
+    MEMORY_CIRCUITS.pop(upstream, None)
+
+def record_upstream_failure(upstream):
+    """Mencatat kegagalan; membuka circuit jika ambang terlampaui atau probe half-open gagal."""
+    client = get_redis()
+    metrics.UPSTREAM_ERRORS.inc(upstream=upstream)
+    if get_circuit_state(upstream) == CIRCUIT_HALF_OPEN:
+        _open_circuit(upstream)
+        return
+    now = time.time()
+    failures = None
+    try:
+        if client:
+            key = f"circuit:{upstream}:failures"
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(key, {f"{now}:{random.random()}": now})
+            pipe.zremrangebyscore(key, 0, now - CIRCUIT_WINDOW)
+            pipe.zcard(key)
+            pipe.expire(key, CIRCUIT_WINDOW)
+            failures = pipe.execute()[2]
+    except Exception as e:
+        print(f"Circuit Error ({upstream}): {e}")
+    if failures is None:
+        circuit = _memory_circuit(upstream)
+        circuit['failures'] = [t for t in circuit['failures'] if t > now - CIRCUIT_WINDOW] + [now]
+        failures = len(circuit['failures'])
+    if failures >= CIRCUIT_FAILURE_THRESHOLD:
+        _open_circuit(upstream)
+
+def is_upstream_failure(error):
+    """
+    True jika exception menandakan upstream bermasalah (timeout, koneksi gagal, HTTP 5xx).
+    Error klien (4xx karena parameter buruk, respons yang tidak bisa diparse) berarti upstream
+    menjawab: tidak dihitung ke circuit breaker maupun negative cache.
+    """
+    import requests
+    if isinstance(error, requests.HTTPError):
+        return error.response is None or error.response.status_code >= 500
+    return isinstance(error, (requests.Timeout, requests.ConnectionError))
+
+def record_upstream_error(upstream, error):
+    """Mencatat exception panggilan upstream. Mengembalikan True jika dihitung sebagai kegagalan upstream."""
+    if is_upstream_failure(error):
+        record_upstream_failure(upstream)
+        return True
+    # Upstream sehat (hanya request ini yang salah): lepaskan slot probe half-open jika ada
+    record_upstream_success(upstream)
+    return False
+
+def acquire_upstream_call(upstream, cost=1, priority=PRIORITY_INTERACTIVE):
+    """
+    Gerbang satu panggilan upstream. Circuit open ditolak lebih dulu (tanpa memotong budget
+    maupun tercatat "allowed"), lalu budget diambil, baru slot probe half-open diklaim,
+    agar slot itu tidak tertahan oleh panggilan yang akhirnya ditolak budget.
+    """
+    state = get_circuit_state(upstream)
+    if state == CIRCUIT_OPEN: return False
+    if not acquire_upstream_budget(upstream, cost=cost, priority=priority): return False
+    return circuit_allows(upstream, state)
+
+def get_circuit_stats():
+    return {upstream: get_circuit_state(upstream) for upstream in UPSTREAM_BUDGETS}
+
+def set_negative_cache(keys):
+    """Menandai key yang baru saja gagal diambil agar request berikutnya tidak mengulang timeout."""
+    for key in keys:
+        set_cache(f"neg:{key}", 1, NEGATIVE_CACHE_TTL)
+
+def is_negative_cached(key):
+    return bool(_read_cache(f"neg:{key}"))
+
+def upstream_get(upstream, url, **kwargs):
+    """requests.get yang mencatat latensi upstream (metrik + Server-Timing 'upstream')."""
+    import requests # Lazy: tidak dibayar saat cold start route yang tidak memanggil upstream
+    with metrics.timed(metrics.UPSTREAM_DURATION, "upstream", upstream=upstream):
+        return requests.get(url, **kwargs)
+
 # ================== KONSTANTA & HELPER ==================
 
 ID_REGEX = re.compile(r"^[a-zA-Z0-9_.-]+$")
+VERSION_REGEX = re.compile(r"^[0-9a-f]{16}$")
 SEARCH_REGEX = re.compile(r"^[a-zA-Z0-9\s.,'-]+$")
 MAX_SEARCH_LENGTH = 50
 
@@ -185,67 +689,9 @@ WMO_CODE_MAP = {
 # ================== DUMMY GENERATORS ==================
 
 def generate_dummy_api_response(wilayah_infos):
-    """Menghasilkan data dummy untuk Open-Meteo."""
+    """Menghasilkan data dummy untuk Open-Meteo (deterministik & koheren, lihat synthetic_data.py)."""
     print(f"MODE DUMMY: Menghasilkan data untuk {len(wilayah_infos)} lokasi.")
-    dummy_list = []
-    total_hourly_points = 336
-    total_daily_points = 14
-    possible_codes = list(WMO_CODE_MAP.keys())
-
-    dummy_tz_str = 'Asia/Singapore' # WIB ~ Singapore time offset
-    dummy_tz = pytz_timezone(dummy_tz_str)
-    now_in_tz = datetime.now(dummy_tz)
-    start_date_in_tz = (now_in_tz - timedelta(days=7)).date()
-
-    start_datetime_local = datetime(start_date_in_tz.year, start_date_in_tz.month, start_date_in_tz.day, 0, 0, 0)
-
-    dummy_hourly_times = [
-        (start_datetime_local + timedelta(hours=i)).strftime('%Y-%m-%dT%H:%M')
-        for i in range(total_hourly_points)
-    ]
-    dummy_daily_times = [
-        (start_date_in_tz + timedelta(days=i)).isoformat()
-        for i in range(total_daily_points)
-    ]
-
-    localized_start = dummy_tz.localize(start_datetime_local)
-    dummy_offset_second = localized_start.utcoffset()
-    dummy_offset_seconds = int(dummy_offset_second.total_seconds()) if dummy_offset_second else 25200 # Default WIB
-
-    for info in wilayah_infos:
-        hourly_data = {
-            'time': dummy_hourly_times,
-            'temperature_2m': [round(random.uniform(25.0, 32.0), 1) for _ in range(total_hourly_points)],
-            'relative_humidity_2m': [random.randint(60, 90) for _ in range(total_hourly_points)],
-            'apparent_temperature': [round(random.uniform(28.0, 35.0), 1) for _ in range(total_hourly_points)],
-            'is_day': [random.randint(0, 1) for _ in range(total_hourly_points)],
-            'precipitation_probability': [random.randint(0, 20) for _ in range(total_hourly_points)],
-            'weather_code': [random.choice(possible_codes) for _ in range(total_hourly_points)],
-            'wind_speed_10m': [round(random.uniform(0.5, 5.0), 1) for _ in range(total_hourly_points)],
-            'wind_direction_10m': [random.randint(0, 360) for _ in range(total_hourly_points)]
-        }
-        daily_data = {
-            'time': dummy_daily_times,
-            'weather_code': [random.choice(possible_codes) for _ in range(total_daily_points)],
-            'temperature_2m_max': [round(random.uniform(30.0, 34.0), 1) for _ in range(total_daily_points)],
-            'temperature_2m_min': [round(random.uniform(23.0, 26.0), 1) for _ in range(total_daily_points)]
-        }
-
-        location_dummy = {
-            'latitude': info['lat'],
-            'longitude': info['lon'],
-            'generationtime_ms': random.uniform(0.5, 2.0),
-            'utc_offset_seconds': dummy_offset_seconds,
-            'timezone': dummy_tz_str,
-            'timezone_abbreviation': 'WIB',
-            'elevation': random.uniform(5, 50),
-            'hourly_units': {},
-            'hourly': hourly_data,
-            'daily_units': {},
-            'daily': daily_data
-        }
-        dummy_list.append(location_dummy)
-    return dummy_list
+    return synthetic_data.weather_batch(wilayah_infos, seed=SYNTHETIC_SEED)
 
 def calculate_esteva_intensity(magnitude, depth_km):
     if not magnitude or not depth_km: return 0
@@ -266,173 +712,30 @@ def get_impact_level(mmi, is_tsunami):
     else:
         return {"status": "severe", "label": "Guncangan Kuat", "color": "#E53935", "pulse": "fast", "description": "Potensi kerusakan bangunan."}
 
-def generate_dummy_bmkg_data():
-    """
-    Menghasilkan data dummy BMKG (15 item) dengan variasi kategori dampak.
-    Struktur sama persis dengan respon JSON asli BMKG.
-    """
-    print("MODE DUMMY: Menghasilkan 15 data gempa BMKG palsu.")
-    gempa_list = []
-    now = datetime.now()
-
-    # 1. TSUNAMI CASE (Index 0)
-    gempa_list.append({
-        "Tanggal": now.strftime("%d %b %Y"),
-        "Jam": (now - timedelta(minutes=5)).strftime("%H:%M:%S WIB"),
-        "DateTime": (now - timedelta(minutes=5)).isoformat(),
-        "Coordinates": "-3.50,102.00",
-        "Lintang": "3.50 LS",
-        "Bujur": "102.00 BT",
-        "Magnitude": "8.5",
-        "Kedalaman": "10 km",
-        "Wilayah": "250 km BaratDaya BENGKULU",
-        "Potensi": "BERPOTENSI TSUNAMI UNTUK DITERUSKAN PADA MASYARAKAT"
-    })
-
-    # 2. SEVERE / GUNCANGAN KUAT (Index 1-3)
-    for i in range(3):
-        t = now - timedelta(hours=1, minutes=i*10)
-        gempa_list.append({
-            "Tanggal": t.strftime("%d %b %Y"),
-            "Jam": t.strftime("%H:%M:%S WIB"),
-            "DateTime": t.isoformat(),
-            "Coordinates": f"-7.{random.randint(10,99)},107.{random.randint(10,99)}",
-            "Lintang": "7.xx LS",
-            "Bujur": "107.xx BT",
-            "Magnitude": str(round(random.uniform(6.0, 7.5), 1)),
-            "Kedalaman": "15 km",
-            "Wilayah": f"{random.randint(10,50)} km BaratDaya TASIKMALAYA-JABAR",
-            "Potensi": "Tidak berpotensi tsunami"
-        })
-
-    # 3. MODERATE / TERASA (Index 4-8)
-    for i in range(5):
-        t = now - timedelta(hours=5, minutes=i*20)
-        gempa_list.append({
-            "Tanggal": t.strftime("%d %b %Y"),
-            "Jam": t.strftime("%H:%M:%S WIB"),
-            "DateTime": t.isoformat(),
-            "Coordinates": f"-8.{random.randint(10,99)},115.{random.randint(10,99)}", # Bali area
-            "Lintang": "8.xx LS",
-            "Bujur": "115.xx BT",
-            "Magnitude": str(round(random.uniform(4.5, 5.5), 1)),
-            "Kedalaman": "40 km",
-            "Wilayah": f"{random.randint(10,50)} km Selatan DENPASAR-BALI",
-            "Potensi": "Tidak berpotensi tsunami"
-        })
-
-    # 4. WEAK / LEMAH (Index 9-14)
-    for i in range(6):
-        t = now - timedelta(days=1, minutes=i*30)
-        # Gempa dalam atau kecil
-        is_deep = random.choice([True, False])
-        depth = random.randint(150, 400) if is_deep else random.randint(10, 30)
-        mag = round(random.uniform(5.0, 6.0), 1) if is_deep else round(random.uniform(3.0, 4.0), 1)
-        
-        gempa_list.append({
-            "Tanggal": t.strftime("%d %b %Y"),
-            "Jam": t.strftime("%H:%M:%S WIB"),
-            "DateTime": t.isoformat(),
-            "Coordinates": f"-2.{random.randint(10,99)},120.{random.randint(10,99)}", # Sulawesi
-            "Lintang": "2.xx LS",
-            "Bujur": "120.xx BT",
-            "Magnitude": str(mag),
-            "Kedalaman": f"{depth} km",
-            "Wilayah": f"{random.randint(10,50)} km TimurLaut LUWU-SULSEL",
-            "Potensi": "Tidak berpotensi tsunami"
-        })
-    return {"Infogempa": {"gempa": gempa_list}}
-
-def generate_dummy_usgs_data():
-    """
-    Menghasilkan GeoJSON dummy USGS (50 item) dengan properti lengkap.
-    """
-    print("MODE DUMMY: Menghasilkan 50 data gempa USGS palsu.")
-    features = []
-    now_ms = int(time.time() * 1000)
-
-    # Helper untuk koordinat acak sekitar Indonesia
-    def random_coords():
-        return [
-            round(random.uniform(95.0, 141.0), 2), # Lon
-            round(random.uniform(-11.0, 6.0), 2),  # Lat
-            round(random.uniform(10.0, 600.0), 1)  # Depth
-        ]
-
-    # 1. TSUNAMI CASE (Manual Injection)
-    features.append({
-        "type": "Feature",
-        "properties": {
-            "mag": 8.2,
-            "place": "Dummy Tsunami Location, Pacific",
-            "time": now_ms - 300000, # 5 mins ago
-            "updated": now_ms,
-            "tz": None,
-            "url": "https://dummy.usgs.gov",
-            "detail": "dummy",
-            "felt": 1000,
-            "cdi": 9.0,
-            "mmi": 9.0,
-            "alert": "red",
-            "status": "reviewed",
-            "tsunami": 1,
-            "sig": 1000,
-            "net": "us",
-            "code": "dummy1",
-            "ids": ",dummy1,",
-            "sources": ",us,",
-            "types": ",geoserve,origin,phase-data,",
-            "nst": None,
-            "dmin": None,
-            "rms": None,
-            "gap": None,
-            "magType": "mww",
-            "type": "earthquake",
-            "title": "M 8.2 - Dummy Tsunami"
-        },
-        "geometry": {
-            "type": "Point",
-            "coordinates": [130.0, -5.0, 15.0] # Banda Sea
-        },
-        "id": "dummy_tsunami_1"
-    })
-
-    # 2. Random Filling (49 items)
-    for i in range(49):
-        coords = random_coords()
-        # Distribusi Magnitudo yang realistis (sedikit yang besar, banyak yang kecil)
-        rand_val = random.random()
-        if rand_val < 0.7: # 70% Kecil/Sedang (4.5 - 5.5)
-            mag = round(random.uniform(4.5, 5.5), 1)
-        elif rand_val < 0.9: # 20% Signifikan (5.5 - 6.5)
-            mag = round(random.uniform(5.5, 6.5), 1)
-        else: # 10% Besar (6.5+)
-            mag = round(random.uniform(6.5, 7.5), 1)
-
-        features.append({
-            "type": "Feature",
-            "properties": {
-                "mag": mag,
-                "place": f"Dummy Location #{i+2}, Indonesia Region",
-                "time": now_ms - random.randint(0, 86400000), # Last 24h
-                "tsunami": 0,
-                "title": f"M {mag} - Dummy Loc #{i+2}"
-            },
-            "geometry": {
-                "type": "Point",
-                "coordinates": coords
-            },
-            "id": f"dummy_usgs_{i+2}"
-        })
+def generate_dummy_bmkg_data(count=None):
+    """
+    Menghasilkan data dummy BMKG dengan struktur sama persis dengan respon JSON asli BMKG.
+    Item pertama selalu skenario tsunami; sisanya tersebar di zona sumber gempa Indonesia.
+    """
+    count = count or SYNTHETIC_BMKG_COUNT
+    print(f"MODE DUMMY: Menghasilkan {count} data gempa BMKG palsu.")
+    return synthetic_data.bmkg_feed(count, seed=SYNTHETIC_SEED)
 
-    return {"type": "FeatureCollection", "features": features}
+def generate_dummy_usgs_data(count=None):
+    """
+    Menghasilkan GeoJSON dummy USGS dengan properti lengkap.
+    """
+    count = count or SYNTHETIC_USGS_COUNT
+    print(f"MODE DUMMY: Menghasilkan {count} data gempa USGS palsu.")
+    return synthetic_data.usgs_feed(count, seed=SYNTHETIC_SEED)
 
 # ================== LOGIKA PEMROSESAN API ==================
 
-def call_open_meteo_api(wilayah_infos):
-    """Memanggil API OpenMeteo asli."""
+def call_open_meteo_api(wilayah_infos, priority=PRIORITY_INTERACTIVE):
+    """Memanggil API OpenMeteo asli (None jika gagal atau budget upstream habis)."""
     if not wilayah_infos: return None
-    base_url = "https://api.open-meteo.com/v1/forecast"
+    if not acquire_upstream_call("open-meteo", cost=len(wilayah_infos), priority=priority): return None
+    base_url = OPEN_METEO_URL
     latitudes = [str(info['lat']) for info in wilayah_infos]
     longitudes = [str(info['lon']) for info in wilayah_infos]
     params = {
@@ -445,13 +748,18 @@ def call_open_meteo_api(wilayah_infos):
         "past_days": 7
     }
     try:
-        response = requests.get(base_url, params=params, timeout=15)
+        response = upstream_get("open-meteo", base_url, params=params, timeout=15)
         response.raise_for_status()
         api_data = response.json()
+        record_upstream_success("open-meteo")
         if isinstance(api_data, dict): return [api_data]
         return api_data
     except Exception as e:
         print(f"OpenMeteo Error: {e}")
+        # Hanya kegagalan upstream sungguhan (timeout/koneksi/5xx) yang dicatat negatif; penolakan
+        # budget/circuit dan error klien (4xx) tidak, agar request berikutnya tetap boleh mencoba
+        if record_upstream_error("open-meteo", e):
+            set_negative_cache(f"weather:{info['id']}" for info in wilayah_infos)
         return None
 
 def process_api_response(api_data_list, wilayah_infos):
@@ -469,12 +777,52 @@ def process_api_response(api_data_list, wilayah_infos):
         }
     return processed_data
 
-def process_wilayah_data(wilayah_list):
+def fetch_and_cache_weather(wilayah_infos, priority=PRIORITY_INTERACTIVE, ttl=CACHE_TTL_WEATHER):
     """
-    Orkestrator utama: Cek Cache -> Fetch (Real/Dummy) -> Simpan Cache -> Return.
+    Fetch cuaca (Real/Dummy) untuk daftar wilayah lalu simpan ke cache selama `ttl` detik.
+    Mengembalikan dict {wilayah_id: weather_data} untuk wilayah yang berhasil.
+    """
+    if not wilayah_infos: return {}
+    if USE_REAL_API:
+        # Dipecah agar biaya tiap panggilan tidak melebihi kapasitas budget (selalu ditolak)
+        chunk_size = max_upstream_cost("open-meteo", priority) or len(wilayah_infos)
+        new_weather_data_map = {}
+        for start in range(0, len(wilayah_infos), chunk_size):
+            chunk = wilayah_infos[start:start + chunk_size]
+            api_data_list = call_open_meteo_api(chunk, priority=priority)
+            if not api_data_list:
+                break # Budget habis / upstream gagal: sisa chunk disajikan dari data stale
+            new_weather_data_map.update(process_api_response(api_data_list, chunk))
+    else:
+        new_weather_data_map = process_api_response(generate_dummy_api_response(wilayah_infos), wilayah_infos)
+
+    if not new_weather_data_map:
+        return {}
+
+    for wilayah_id, weather_data in new_weather_data_map.items():
+        # Versi dihitung sekali saat ditulis, bukan di setiap request (lihat with_weather_version)
+        set_cache(f"weather:{wilayah_id}", weather_data, ttl, stale_ttl=CACHE_TTL_STALE, versioned=True)
+    # Kab/Kota yang baru di-refresh menandai rollup Provinsi & Negara untuk dihitung ulang:
+    # warm-up menghitungnya di akhir run, request user paling sering sekali per ROLLUP_DEBOUNCE
+    update_weather_rollups(new_weather_data_map, wilayah_infos)
+    if priority == PRIORITY_INTERACTIVE:
+        refresh_weather_rollups()
+    return new_weather_data_map
+
+def unavailable_weather(info):
+    """Placeholder wilayah tanpa data cuaca (upstream gagal/ditolak, tanpa salinan stale); tidak di-cache klien."""
+    return {**info, 'hourly': {}, 'daily': {}, 'unavailable': True}
+
+def iter_wilayah_data(wilayah_list, chunk_size=None):
+    """
+    Versi generator dari process_wilayah_data: menghasilkan (wilayah_id, data) begitu siap.
+    Cache hit (termasuk rollup & data stale) keluar lebih dulu, lalu wilayah yang belum ada
+    di-fetch per chunk (chunk_size lokasi per panggilan upstream; None = satu panggilan).
+    Wilayah tanpa koordinat, atau yang gagal di-fetch dan tidak punya data stale, dihasilkan sebagai placeholder
+    (lihat unavailable_weather), sehingga tidak ada wilayah yang hilang dari respons.
     """
-    final_data = {}
     ids_to_fetch_info = []
+    kecamatan_hits = []
 
     # 1. Cek Cache (Redis/Memory)
     for info in wilayah_list:
@@ -483,8 +831,16 @@ def process_wilayah_data(wilayah_list):
         # [ATURAN BARU] Skip fetch cuaca untuk Negara (0) dan Provinsi (1)
         tipadm = int(info.get('tipadm', 99))
         if tipadm <= 1:
-            # Langsung kembalikan data statis tanpa cuaca
-            final_data[wilayah_id] = {**info, 'hourly': {}, 'daily': {}}
+            # Sajikan rollup dari Kab/Kota yang sudah di-cache (tanpa panggilan upstream)
+            rollup = get_weather_rollup(wilayah_id, tipadm)
+            yield wilayah_id, ({**info, **rollup} if rollup else {**info, 'hourly': {}, 'daily': {}})
+            continue
+        if tipadm == 3:
+            kecamatan_hits.append(wilayah_id)
+        if info.get('lat') is None or info.get('lon') is None:
+            # Tanpa centroid (sebagian desa): tidak bisa di-fetch, dan jangan sampai
+            # "None" di parameter membuat seluruh chunk saudaranya ditolak upstream
+            yield wilayah_id, unavailable_weather(info)
             continue
 
         data_to_store = {**info}
@@ -494,27 +850,487 @@ def process_wilayah_data(wilayah_list):
         cached_weather = get_cache(f"weather:{wilayah_id}")
         
         if cached_weather:
-            final_data[wilayah_id] = {**info, **cached_weather}
+            yield wilayah_id, {**info, **cached_weather}
+        elif is_negative_cached(f"weather:{wilayah_id}"):
+            # Baru saja gagal diambil: jangan ulangi timeout, langsung pakai data stale
+            stale_weather = get_stale_cache(f"weather:{wilayah_id}")
+            yield wilayah_id, ({**info, **stale_weather} if stale_weather else unavailable_weather(info))
         else:
             ids_to_fetch_info.append(info) 
     
-    # 2. Fetch Data yang hilang (Hanya untuk Kab/Kota ke bawah)
-    if ids_to_fetch_info:
-        if USE_REAL_API:
-            api_data_list = call_open_meteo_api(ids_to_fetch_info)
+    # Catat popularitas kecamatan untuk prioritas warm-up
+    record_hits(kecamatan_hits)
+
+    # 2. Fetch Data yang hilang (Hanya untuk Kab/Kota ke bawah), per chunk
+    if not ids_to_fetch_info: return
+    chunk_size = chunk_size or len(ids_to_fetch_info)
+    for start in range(0, len(ids_to_fetch_info), chunk_size):
+        chunk = ids_to_fetch_info[start:start + chunk_size]
+        new_weather_data_map = fetch_and_cache_weather(chunk)
+        for info in chunk:
+            wilayah_id = str(info['id'])
+            if wilayah_id in new_weather_data_map:
+                yield wilayah_id, {**info, **new_weather_data_map[wilayah_id]}
+            else:
+                # Upstream ditolak budget / gagal: degradasi ke data stale jika ada
+                stale_weather = get_stale_cache(f"weather:{wilayah_id}")
+                yield wilayah_id, ({**info, **stale_weather} if stale_weather else unavailable_weather(info))
+
+def process_wilayah_data(wilayah_list):
+    """
+    Orkestrator utama: Cek Cache -> Fetch (Real/Dummy) -> Simpan Cache -> Return.
+    """
+    return dict(iter_wilayah_data(wilayah_list))
+
+def weather_version(data):
+    """
+    Versi isi data satu wilayah (hash pendek), dipakai klien untuk revalidasi entri cache-nya.
+    Entri cache menyimpan versinya sejak ditulis (set_cache versioned=True); fungsi ini hanya
+    untuk entri lama & data tanpa cache, karena serialisasi seluruh seri cuaca itu mahal.
+    """
+    return _payload_version(json.dumps(data, default=str))
+
+def with_weather_version(data):
+    """
+    Data wilayah yang dijamin punya 'version'. Versi tersimpan dipakai apa adanya; entri lama
+    (ditulis sebelum versi disimpan) dan data tanpa cache dihitung di tempat. Placeholder
+    unavailable tidak diberi versi karena memang tidak disimpan klien.
+    """
+    if "version" in data or data.get("unavailable"):
+        return data
+    return {**data, "version": weather_version(data)}
+
+def parse_known_versions(known_str):
+    """Parameter 'known=id:versi,...' dari klien -> {id: versi}. Pasangan tidak valid diabaikan."""
+    known = {}
+    for pair in (known_str or "").split(','):
+        wilayah_id, _, version = pair.partition(':')
+        if version and ID_REGEX.match(wilayah_id) and VERSION_REGEX.match(version):
+            known[wilayah_id] = version
+    return known
+
+def versioned_wilayah_data(data_map, known_versions):
+    """
+    Menambahkan 'version' ke setiap entri. Entri yang versinya sama dengan salinan klien
+    (known_versions) diganti penanda kecil {id, version, not_modified}, sehingga revalidasi
+    entri stale tidak mengirim ulang seluruh seri cuaca.
+    """
+    result = {}
+    for wilayah_id, data in data_map.items():
+        data = with_weather_version(data)
+        version = data.get("version")
+        if version and known_versions.get(wilayah_id) == version:
+            result[wilayah_id] = {"id": wilayah_id, "version": version, "not_modified": True}
         else:
-            api_data_list = generate_dummy_api_response(ids_to_fetch_info)
-            
-        if api_data_list:
-            new_weather_data_map = process_api_response(api_data_list, ids_to_fetch_info)
-            for info in ids_to_fetch_info:
+            result[wilayah_id] = data
+    return result
+
+def stream_wilayah_ndjson(wilayah_list):
+    """
+    Response NDJSON (satu wilayah per baris) yang dikirim bertahap: cache hit lebih dulu,
+    lalu hasil tiap chunk upstream. Memori dibatasi satu chunk, bukan seluruh hasil.
+    Urutan baris tidak dijamin; klien menempatkan tiap baris berdasarkan 'id'.
+    """
+    def generate():
+        try:
+            for _, data in iter_wilayah_data(wilayah_list, chunk_size=SUB_WILAYAH_STREAM_CHUNK):
+                yield json.dumps(with_weather_version(data)) + "\n"
+        except Exception as e:
+            # Status 200 sudah terkirim: laporkan error sebagai baris terakhir
+            print(f"ERROR STREAM SUB-WILAYAH: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Accel-Buffering'] = 'no' # Cegah proxy menahan chunk
+    return response
+
+# ================== ROLLUP CUACA PROVINSI & NEGARA ==================
+# Provinsi (1) dan Negara (0) tidak pernah di-fetch ke Open-Meteo. Agregatnya dibangun dari
+# seri Kab/Kota yang sudah di-cache:
+#   rollup:children:<prov>  -> hash {kab_id: kontribusi ringkas}
+#   rollup:provinsi:<prov>  -> agregat provinsi (format sama dengan weather:<id>)
+#   rollup:children:negara  -> hash {prov_id: kontribusi ringkas provinsi}
+#   rollup:negara           -> agregat nasional
+#   rollup:dirty            -> set provinsi yang anaknya berubah sejak agregat terakhir
+#   rollup:lock             -> kunci debounce hitung ulang (SET NX EX ROLLUP_DEBOUNCE)
+# Refresh Kab/Kota hanya menulis kontribusinya (tanpa membaca balik hash) dan menandai provinsinya
+# dirty. Agregasi (baca hash provinsi & nasional, hitung ulang) dikerjakan refresh_weather_rollups:
+# oleh warm-up di akhir run, dan dari request user paling sering sekali per ROLLUP_DEBOUNCE untuk
+# semua instance, agar rollup tetap terbentuk tanpa penjadwal warm-up.
+ROLLUP_NEGARA = "negara"
+MEMORY_ROLLUP_CHILDREN = {}
+MEMORY_ROLLUP_STATE = {'dirty': set(), 'lock_until': 0}
+
+def _utc_hour(local_time, utc_offset_seconds):
+    """Jam UTC (jam sejak epoch) dari string waktu lokal Open-Meteo 'YYYY-MM-DDTHH:MM'."""
+    local = datetime.fromisoformat(local_time).replace(tzinfo=timezone.utc)
+    return (int(local.timestamp()) - int(utc_offset_seconds or 0)) // 3600
+
+def _rollup_contribution(weather_data):
+    """
+    Ringkasan satu anak untuk agregasi: hanya seri yang dipakai rollup.
+    Berlaku untuk data Kab/Kota (n=1) maupun agregat Provinsi (n=jumlah Kab/Kota).
+    """
+    hourly = weather_data.get('hourly') or {}
+    daily = weather_data.get('daily') or {}
+    contribution = {
+        "n": (weather_data.get('rollup') or {}).get('children_count', 1),
+        "offset": weather_data.get('utc_offset_seconds') or 0,
+        "tz": [weather_data.get('timezone'), weather_data.get('timezone_abbreviation')],
+        "time": hourly.get('time') or [],
+        "mean": hourly.get('temperature_2m') or [],
+        "code": hourly.get('weather_code') or [],
+        "precip": hourly.get('precipitation_probability') or [],
+        "is_day": hourly.get('is_day') or [],
+        "daily_time": daily.get('time') or [],
+        "daily_max": daily.get('temperature_2m_max') or [],
+        "daily_min": daily.get('temperature_2m_min') or [],
+        "daily_code": daily.get('weather_code') or [],
+    }
+    # Kab/Kota: min = max = mean, tidak perlu disimpan dua kali
+    if 'temperature_2m_min' in hourly:
+        contribution["min"] = hourly['temperature_2m_min']
+        contribution["max"] = hourly.get('temperature_2m_max') or []
+    return contribution
+
+def _shift_series(values, delta, length):
+    """Menggeser seri anak ke sumbu waktu referensi (None untuk jam di luar jangkauan)."""
+    if delta == 0 and len(values) == length: return values
+    return [values[j + delta] if 0 <= j + delta < len(values) else None for j in range(length)]
+
+def _weighted_mean(column, weights):
+    pairs = [(v, w) for v, w in zip(column, weights) if v is not None]
+    total = sum(w for _, w in pairs)
+    return round(sum(v * w for v, w in pairs) / total, 1) if total else None
+
+def _column_min(column):
+    values = [v for v in column if v is not None]
+    return min(values) if values else None
+
+def _column_max(column):
+    values = [v for v in column if v is not None]
+    return max(values) if values else None
+
+def _dominant_code(column, weights):
+    """Kode WMO terbanyak (berbobot); seri dipecah ke kode yang lebih parah (nilai lebih besar)."""
+    tally = {}
+    for code, w in zip(column, weights):
+        if code is not None: tally[code] = tally.get(code, 0) + w
+    return max(tally, key=lambda code: (tally[code], code)) if tally else None
+
+def _aggregate_rollup(contributions, level):
+    """
+    Menggabungkan kontribusi anak menjadi satu seri agregat, kolom demi kolom.
+    Anak dengan zona waktu berbeda (WIB/WITA/WIT) disejajarkan lewat jam UTC ke sumbu
+    waktu zona mayoritas; seri harian disejajarkan lewat tanggal. Sumbu diambil dari anak
+    zona mayoritas yang paling baru di-fetch (time[0] paling akhir), sehingga anak yang
+    belum di-refresh tidak menyeret agregat ke jam-jam yang sudah lewat.
+    """
+    contributions = [c for c in contributions if c.get('time')]
+    if not contributions: return None
+
+    offsets = {}
+    for c in contributions:
+        offsets[c['offset']] = offsets.get(c['offset'], 0) + c['n']
+    ref_offset = max(offsets, key=offsets.get)
+    ref_start, ref = max(
+        ((_utc_hour(c['time'][0], ref_offset), c) for c in contributions if c['offset'] == ref_offset),
+        key=lambda item: (item[0], len(item[1]['time']))
+    )
+    length = len(ref['time'])
+    daily_time = ref['daily_time']
+
+    weights = [c['n'] for c in contributions]
+    means, mins, maxs, codes, precips = [], [], [], [], []
+    daily_max, daily_min, daily_code = [], [], []
+    for c in contributions:
+        delta = ref_start - _utc_hour(c['time'][0], c['offset'])
+        means.append(_shift_series(c['mean'], delta, length))
+        mins.append(_shift_series(c.get('min', c['mean']), delta, length))
+        maxs.append(_shift_series(c.get('max', c['mean']), delta, length))
+        codes.append(_shift_series(c['code'], delta, length))
+        precips.append(_shift_series(c['precip'], delta, length))
+
+        day_index = {day: i for i, day in enumerate(c['daily_time'])}
+        for target, values in ((daily_max, c['daily_max']), (daily_min, c['daily_min']), (daily_code, c['daily_code'])):
+            target.append([values[day_index[day]] if day_index.get(day, len(values)) < len(values) else None
+                           for day in daily_time])
+
+    timezone_name, timezone_abbr = ref.get('tz') or [None, None]
+    return {
+        "timezone": timezone_name,
+        "timezone_abbreviation": timezone_abbr,
+        "utc_offset_seconds": ref_offset,
+        "hourly": {
+            "time": ref['time'],
+            "temperature_2m": [_weighted_mean(col, weights) for col in zip(*means)],
+            "temperature_2m_min": [_column_min(col) for col in zip(*mins)],
+            "temperature_2m_max": [_column_max(col) for col in zip(*maxs)],
+            "weather_code": [_dominant_code(col, weights) for col in zip(*codes)],
+            "precipitation_probability": [_column_max(col) for col in zip(*precips)],
+            "is_day": ref['is_day'],
+        },
+        "daily": {
+            "time": daily_time,
+            "weather_code": [_dominant_code(col, weights) for col in zip(*daily_code)],
+            "temperature_2m_max": [_column_max(col) for col in zip(*daily_max)],
+            "temperature_2m_min": [_column_min(col) for col in zip(*daily_min)],
+        },
+        "rollup": {"level": level, "children_count": sum(weights), "updated_at": int(time.time())},
+    }
+
+def _store_rollup_children(updates_by_parent, mark_dirty=False):
+    """
+    Menulis kontribusi anak yang berubah ({parent: {anak: kontribusi}}) dalam satu pipeline,
+    tanpa membaca balik hash. mark_dirty: parent ditandai untuk refresh_weather_rollups.
+    """
+    client = get_redis()
+    if client:
+        pipe = client.pipeline(transaction=False)
+        for parent, updates in updates_by_parent.items():
+            key = f"rollup:children:{parent}"
+            pipe.hset(key, mapping={child: json.dumps(c) for child, c in updates.items()})
+            pipe.expire(key, CACHE_TTL_STALE)
+        if mark_dirty:
+            pipe.sadd("rollup:dirty", *updates_by_parent)
+            pipe.expire("rollup:dirty", CACHE_TTL_STALE)
+        pipe.execute()
+        return
+    for parent, updates in updates_by_parent.items():
+        MEMORY_ROLLUP_CHILDREN.setdefault(parent, {}).update(updates)
+    if mark_dirty:
+        MEMORY_ROLLUP_STATE['dirty'].update(updates_by_parent)
+
+def _load_rollup_children(parent):
+    """Seluruh kontribusi anak satu parent."""
+    client = get_redis()
+    if client:
+        return {child: json.loads(c) for child, c in client.hgetall(f"rollup:children:{parent}").items()}
+    return dict(MEMORY_ROLLUP_CHILDREN.get(parent, {}))
+
+def _take_dirty_rollups(force):
+    """
+    Mengambil lalu mengosongkan daftar provinsi dirty. Tanpa force hanya jika kunci debounce
+    didapat (satu pemanggil per ROLLUP_DEBOUNCE); force tetap memasang kunci agar request
+    sesudahnya tidak langsung menghitung ulang.
+    """
+    client = get_redis()
+    if client:
+        if not client.set("rollup:lock", 1, nx=not force, ex=ROLLUP_DEBOUNCE): return []
+        pipe = client.pipeline()  # MULTI: tanda dirty yang masuk sesudahnya tidak ikut terhapus
+        pipe.smembers("rollup:dirty")
+        pipe.delete("rollup:dirty")
+        return sorted(pipe.execute()[0])
+    state = MEMORY_ROLLUP_STATE
+    now = time.time()
+    if not force and now < state['lock_until']: return []
+    state['lock_until'] = now + ROLLUP_DEBOUNCE
+    dirty, state['dirty'] = state['dirty'], set()
+    return sorted(dirty)
+
+def update_weather_rollups(weather_map, wilayah_infos):
+    """
+    Mencatat kontribusi Kab/Kota yang baru di-refresh dan menandai provinsinya dirty.
+    Tidak menghitung agregat (lihat refresh_weather_rollups). Mengembalikan ID provinsi yang ditandai.
+    """
+    by_provinsi = {}
+    for info in wilayah_infos:
+        wilayah_id = str(info['id'])
+        if int(info.get('tipadm', 99)) != 2 or wilayah_id not in weather_map: continue
+        prov_id = wilayah_id.split('.', 1)[0]
+        by_provinsi.setdefault(prov_id, {})[wilayah_id] = _rollup_contribution(weather_map[wilayah_id])
+    if not by_provinsi: return []
+
+    try:
+        _store_rollup_children(by_provinsi, mark_dirty=True)
+    except Exception as e:
+        print(f"Rollup Error: {e}")
+        return []
+    return sorted(by_provinsi)
+
+def refresh_weather_rollups(force=False):
+    """
+    Menghitung ulang rollup provinsi yang dirty, lalu rollup nasional sekali untuk semuanya.
+    Tanpa force (jalur request) di-debounce lewat kunci rollup:lock; warm-up memanggil dengan
+    force=True di akhir run. Mengembalikan ID provinsi yang diperbarui.
+    """
+    provinsi_updates = {}
+    try:
+        for prov_id in _take_dirty_rollups(force):
+            aggregate = _aggregate_rollup(_load_rollup_children(prov_id).values(), "provinsi")
+            if aggregate:
+                set_cache(f"rollup:provinsi:{prov_id}", aggregate, CACHE_TTL_STALE, versioned=True)
+                provinsi_updates[prov_id] = _rollup_contribution(aggregate)
+        if provinsi_updates:
+            _store_rollup_children({ROLLUP_NEGARA: provinsi_updates})
+            aggregate = _aggregate_rollup(_load_rollup_children(ROLLUP_NEGARA).values(), "negara")
+            if aggregate:
+                set_cache(f"rollup:{ROLLUP_NEGARA}", aggregate, CACHE_TTL_STALE, versioned=True)
+    except Exception as e:
+        print(f"Rollup Error: {e}")
+    return sorted(provinsi_updates)
+
+def get_weather_rollup(wilayah_id, tipadm):
+    """Rollup cuaca untuk Negara (tipadm 0) atau Provinsi (tipadm 1); None jika belum terbentuk."""
+    if tipadm == 0:
+        return get_cache(f"rollup:{ROLLUP_NEGARA}")
+    return get_cache(f"rollup:provinsi:{wilayah_id}")
+
+# ================== WARM-UP CACHE CUACA ==================
+
+def get_warmup_candidates(group, session):
+    """Mengambil daftar wilayah (id, lat, lon, tipadm) untuk satu kelompok prioritas warm-up."""
+    from sqlalchemy import text, bindparam
+    if group == "kabkota":
+        query = text("""
+            SELECT "KDPKAB" as id, latitude as lat, longitude as lon, "TIPADM" as tipadm
+            FROM batas_kabupatenkota WHERE "KDPKAB" IS NOT NULL;
+        """)
+        return [dict(row) for row in session.execute(query).mappings()]
+    if group == "kecamatan":
+        top_ids = [i for i in get_top_hits(WARMUP_TOP_KECAMATAN) if ID_REGEX.match(i)]
+        if not top_ids: return []
+        query = text("""
+            SELECT "KDCPUM" as id, latitude as lat, longitude as lon, "TIPADM" as tipadm
+            FROM batas_kecamatandistrik WHERE "KDCPUM" IN :ids;
+        """).bindparams(bindparam("ids", expanding=True))
+        rows = {row['id']: dict(row) for row in session.execute(query, {"ids": top_ids}).mappings()}
+        # Pertahankan urutan popularitas
+        return [rows[i] for i in top_ids if i in rows]
+    print(f"WARM-UP: Kelompok prioritas tidak dikenal '{group}', dilewati.")
+    return []
+
+def warmup_weather_cache(priority=None, batch_size=None, refresh_before=None, max_batches=None, time_budget=None):
+    """
+    Memanaskan cache cuaca sebelum kedaluwarsa agar request user selalu kena cache.
+    Menelusuri kelompok wilayah sesuai urutan prioritas, melewati entri yang masih segar
+    (sisa TTL >= refresh_before), lalu fetch sisanya per batch dengan TTL 2x refresh_before
+    (lihat WARMUP_REFRESH_BEFORE). Run berhenti lebih awal jika waktu habis atau satu batch
+    gagal total (budget upstream habis / upstream gagal); sisanya dikerjakan run berikutnya.
+
+    Arguments:
+    - priority: Urutan kelompok (default WARMUP_PRIORITY).
+    - batch_size: Jumlah lokasi per panggilan upstream (default WARMUP_BATCH_SIZE).
+    - refresh_before: Ambang sisa TTL (detik) untuk refresh (default WARMUP_REFRESH_BEFORE).
+    - max_batches: Batas jumlah batch per pemanggilan (None = tanpa batas).
+    - time_budget: Batas durasi (detik) agar cron serverless tidak melewati batas waktu
+      eksekusi; batch baru tidak dimulai jika diperkirakan melewatinya (None = tanpa batas).
+    """
+    priority = priority or WARMUP_PRIORITY
+    batch_size = max(1, batch_size or WARMUP_BATCH_SIZE)
+    refresh_before = WARMUP_REFRESH_BEFORE if refresh_before is None else refresh_before
+    started = time.perf_counter()
+
+    stats = {"checked": 0, "fresh": 0, "refreshed": 0, "failed": 0, "batches": 0, "groups": {}}
+    session_factory = get_session_factory()
+    if not session_factory:
+        stats["error"] = "Database not connected"
+        return stats
+
+    # 1. Kumpulkan kandidat sesuai urutan prioritas (tanpa duplikat)
+    session = session_factory()
+    try:
+        seen = set()
+        candidates = []  # (kelompok, info)
+        for group in priority:
+            stats["groups"][group] = 0
+            for info in get_warmup_candidates(group, session):
                 wilayah_id = str(info['id'])
-                if wilayah_id in new_weather_data_map:
-                    weather_data = new_weather_data_map[wilayah_id]
-                    set_cache(f"weather:{wilayah_id}", weather_data, CACHE_TTL_WEATHER)
-                    final_data[wilayah_id] = {**info, **weather_data}
+                if wilayah_id in seen or info.get('lat') is None or info.get('lon') is None:
+                    continue
+                seen.add(wilayah_id)
+                candidates.append((group, info))
+    finally:
+        session.close()
 
-    return final_data
+    # 2. Cek sisa TTL semua kandidat dalam satu pipeline, pertahankan urutan prioritas
+    stats["checked"] = len(candidates)
+    ttls = get_cache_ttls(f"weather:{info['id']}" for _, info in candidates)
+    stale = []
+    for (group, info), ttl in zip(candidates, ttls):
+        if ttl >= refresh_before:
+            stats["fresh"] += 1
+            continue
+        stale.append(info)
+        stats["groups"][group] += 1
+
+    # 3. Refresh per batch
+    slowest_batch = 0.0
+    for start in range(0, len(stale), batch_size):
+        if max_batches is not None and stats["batches"] >= max_batches:
+            stats["stopped"] = "max_batches"
+            break
+        if time_budget is not None and time.perf_counter() - started + slowest_batch > time_budget:
+            stats["stopped"] = "time_budget"
+            break
+        batch = stale[start:start + batch_size]
+        batch_started = time.perf_counter()
+        refreshed = fetch_and_cache_weather(batch, priority=PRIORITY_BACKGROUND, ttl=2 * refresh_before)
+        slowest_batch = max(slowest_batch, time.perf_counter() - batch_started)
+        stats["batches"] += 1
+        stats["refreshed"] += len(refreshed)
+        stats["failed"] += len(batch) - len(refreshed)
+        if not refreshed:
+            stats["stopped"] = "upstream"
+            break
+
+    stats["pending"] = len(stale) - stats["refreshed"] - stats["failed"]
+    # Agregat Provinsi & Negara dihitung sekali per run (termasuk tanda dirty dari request user)
+    stats["rollups"] = len(refresh_weather_rollups(force=True))
+    print(f"WARM-UP: {stats}")
+    return stats
+
+# ================== SNAPSHOT DATA REFERENSI ==================
+
+_reference_snapshot = None
+_reference_snapshot_checked = False
+_reference_snapshot_lock = threading.Lock()
+
+def get_reference_snapshot():
+    """
+    Snapshot referensi wilayah (dimuat lazy, sekali per instance, via mmap).
+    Mengembalikan None jika snapshot belum dibangun/rusak -> endpoint kembali ke database.
+    """
+    global _reference_snapshot, _reference_snapshot_checked
+    if not _reference_snapshot_checked:
+        with _reference_snapshot_lock:
+            if not _reference_snapshot_checked:
+                try:
+                    if os.path.exists(REFERENCE_SNAPSHOT_PATH):
+                        with startup_profile.step("init reference-snapshot"):
+                            _reference_snapshot = reference_snapshot.ReferenceSnapshot(REFERENCE_SNAPSHOT_PATH)
+                        print(f"✅ Snapshot referensi dimuat (versi {_reference_snapshot.version})")
+                    else:
+                        print("⚠️ Snapshot referensi tidak ditemukan. Lookup statis memakai database.")
+                except Exception as e:
+                    print(f"❌ Gagal memuat snapshot referensi: {e}")
+                    _reference_snapshot = None
+                # Ditandai setelah snapshot terpasang, agar thread lain tidak membaca None lebih awal
+                _reference_snapshot_checked = True
+    return _reference_snapshot
+
+def reference_response(snapshot, build_payload):
+    """
+    Response JSON dari snapshot dengan ETag = versi snapshot.
+    Jika klien mengirim If-None-Match yang cocok, balas 304 tanpa membangun payload.
+    """
+    if request.if_none_match.contains(snapshot.version):
+        response = Response(status=304)
+    else:
+        response = jsonify(build_payload())
+    response.set_etag(snapshot.version)
+    return response
+
+def snapshot_sub_wilayah(snapshot, parent_id, target_tipadm):
+    """Daftar anak dari snapshot, dengan kolom yang sama seperti query get_sub_wilayah_cuaca."""
+    if target_tipadm == 1:
+        # Query provinsi memakai alias latitude/longitude
+        return [{"id": r["id"], "nama_simpel": r["nama_simpel"], "latitude": r["lat"], "longitude": r["lon"], "tipadm": r["tipadm"]}
+                for r in snapshot.level(1)]
+    if target_tipadm in (2, 3, 4):
+        return [{"id": r["id"], "nama_simpel": r["nama_simpel"], "lat": r["lat"], "lon": r["lon"], "tipadm": r["tipadm"]}
+                for r in snapshot.children(parent_id, target_tipadm)]
+    return []
 
 # ================== ROUTES (ENDPOINT) ==================
 
@@ -531,7 +1347,7 @@ def index():
         print(f"💻 Using Map Source: LOCAL ({map_base_url})")
 
     # Injeksi variable ke template HTML
-    return render_template('index.html', map_base_url=map_base_url)
+    return render_template('index.html', map_base_url=map_base_url, marker_render_mode=MARKER_RENDER_MODE)
 
 @app.route('/api/wmo-codes')
 @cache_control(max_age=3600, s_maxage=86400) # Cache 1 Hari
@@ -541,8 +1357,18 @@ def get_wmo_codes():
 @app.route('/api/provinsi-info')
 @cache_control(max_age=300, s_maxage=3600) # Cache 1 Jam (Data Statis)
 def get_provinsi_info():
-    if not Session: return jsonify({"error": "Database not connected"}), 500
-    session = Session()
+    snapshot = get_reference_snapshot()
+    if snapshot:
+        return reference_response(snapshot, lambda: [
+            {"id": r["id"], "nama_simpel": r["nama_simpel"], "nama_label": r["nama_simpel"],
+             "lat": r["lat"], "lon": r["lon"], "tipadm": r["tipadm"]}
+            for r in snapshot.level(1) if r["tipadm"] == 1
+        ])
+
+    session_factory = get_session_factory()
+    if not session_factory: return jsonify({"error": "Database not connected"}), 500
+    from sqlalchemy import text
+    session = session_factory()
     try:
         query = text("""
             SELECT "KDPPUM" as id, "WADMPR" as nama_simpel, "WADMPR" as nama_label, 
@@ -561,11 +1387,13 @@ def get_provinsi_info():
 @app.route('/api/cari-lokasi')
 @cache_control(max_age=60, s_maxage=300) # Cache 5 menit (pencarian sering berulang)
 def cari_lokasi():
-    if not Session: return jsonify({"error": "Database not connected"}), 500
+    session_factory = get_session_factory()
+    if not session_factory: return jsonify({"error": "Database not connected"}), 500
+    from sqlalchemy import text
     q = request.args.get('q', '').strip()
     if not q or len(q) < 3 or not SEARCH_REGEX.match(q): return jsonify([])
 
-    session = Session()
+    session = session_factory()
     try:
         # Query yang sama, tapi berjalan di atas PostGIS Supabase
         query = text("""
@@ -591,7 +1419,9 @@ def cari_lokasi():
 @app.route('/api/data-cuaca')
 @cache_control(max_age=300, s_maxage=1800) # Cache 30 menit
 def get_data_cuaca():
-    if not Session: return jsonify({"error": "Database not connected"}), 500
+    session_factory = get_session_factory()
+    if not session_factory: return jsonify({"error": "Database not connected"}), 500
+    from sqlalchemy import text
     bbox_str = request.args.get('bbox')
     zoom = int(float(request.args.get('zoom', 9)))
     
@@ -600,7 +1430,7 @@ def get_data_cuaca():
     xmin, ymin, xmax, ymax = [float(c) for c in bbox_str.split(',')]
     bbox_wkt = f'SRID=4326;POLYGON(({xmin} {ymin}, {xmax} {ymin}, {xmax} {ymax}, {xmin} {ymax}, {xmin} {ymin}))'
     
-    session = Session()
+    session = session_factory()
     try:
         # [NOTE] Kita tidak perlu menambahkan batas_negara di sini karena layer negara
         # dirender manual oleh PMTiles dan Marker, bukan via BBox Fetching API ini.
@@ -636,7 +1466,6 @@ def get_data_cuaca():
 @app.route('/api/sub-wilayah-cuaca')
 @cache_control(max_age=300, s_maxage=1800) # Cache 30 menit
 def get_sub_wilayah_cuaca():
-    if not Session: return jsonify({"error": "Database not connected"}), 500
     parent_id = request.args.get('id')
     parent_tipadm = int(request.args.get('tipadm', 0))
     view_mode = request.args.get('view', 'full')
@@ -644,7 +1473,23 @@ def get_sub_wilayah_cuaca():
     if not parent_id or not ID_REGEX.match(parent_id): return jsonify([])
 
     target_tipadm = parent_tipadm + 1
-    session = Session()
+
+    # Daftar anak dari snapshot referensi (tanpa koneksi DB) jika tersedia
+    snapshot = get_reference_snapshot()
+    if snapshot:
+        try:
+            sub_wilayah = snapshot_sub_wilayah(snapshot, parent_id, target_tipadm)
+            if view_mode == 'simple':
+                return reference_response(snapshot, lambda: sorted(sub_wilayah, key=lambda x: (x.get('nama_simpel') or '')))
+            return sub_wilayah_full_response(sub_wilayah)
+        except Exception as e:
+            print(f"ERROR API SUB-WILAYAH: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    session_factory = get_session_factory()
+    if not session_factory: return jsonify({"error": "Database not connected"}), 500
+    from sqlalchemy import text
+    session = session_factory()
     try:
         query_text = ""
         params = {"parent_id_prefix": f"{parent_id}.%"}
@@ -669,10 +1514,7 @@ def get_sub_wilayah_cuaca():
                 # [PERBAIKAN 2] Safety sorting untuk nilai None
                 return jsonify(sorted(sub_wilayah, key=lambda x: (x.get('nama_simpel') or '')))
             
-            # Full processing
-            data_lengkap = process_wilayah_data(sub_wilayah)
-            # Terapkan safety sorting juga di sini
-            return jsonify(sorted(data_lengkap.values(), key=lambda x: (x.get('nama_simpel') or '')))
+            return sub_wilayah_full_response(sub_wilayah)
         return jsonify([])
     except Exception as e:
         print(f"ERROR API SUB-WILAYAH: {e}") # Tambahkan print untuk debug di masa depan
@@ -680,18 +1522,45 @@ def get_sub_wilayah_cuaca():
     finally:
         session.close()
 
+def sub_wilayah_full_response(sub_wilayah):
+    """Mode view=full: daftar anak + cuaca (JSON array, atau NDJSON bertahap jika format=ndjson)."""
+    # Full processing (streaming): baris NDJSON dikirim begitu cache hit / chunk upstream selesai
+    if request.args.get('format') == 'ndjson':
+        return stream_wilayah_ndjson(sorted(sub_wilayah, key=lambda x: (x.get('nama_simpel') or '')))
+
+    # Full processing
+    data_lengkap = process_wilayah_data(sub_wilayah)
+    # Terapkan safety sorting juga di sini
+    return jsonify(sorted(data_lengkap.values(), key=lambda x: (x.get('nama_simpel') or '')))
+
 @app.route('/api/data-by-ids')
 @cache_control(max_age=300, s_maxage=1800) # Cache 30 menit
 def get_data_by_ids():
-    if not Session: return jsonify({"error": "Database not connected"}), 500
     ids_str = request.args.get('ids')
     if not ids_str: return jsonify({})
     
-    ids = [f"'{i}'" for i in ids_str.split(',') if ID_REGEX.match(i)]
-    if not ids: return jsonify({})
+    valid_ids = [i for i in ids_str.split(',') if ID_REGEX.match(i)]
+    if not valid_ids: return jsonify({})
+    # Versi entri stale milik klien (cache IndexedDB) untuk revalidasi per ID
+    known_versions = parse_known_versions(request.args.get('known'))
+
+    # Metadata dari snapshot referensi (tanpa koneksi DB) jika tersedia; cuaca tetap dari cache/upstream
+    snapshot = get_reference_snapshot()
+    if snapshot:
+        try:
+            rows = [{k: r[k] for k in ("id", "nama_simpel", "nama_label", "lat", "lon", "tipadm")}
+                    for r in snapshot.lookup(valid_ids)]
+            return jsonify(versioned_wilayah_data(process_wilayah_data(rows), known_versions))
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    session_factory = get_session_factory()
+    if not session_factory: return jsonify({"error": "Database not connected"}), 500
+    from sqlalchemy import text
+    ids = [f"'{i}'" for i in valid_ids]
     ids_tuple = f"({','.join(ids)})"
     
-    session = Session()
+    session = session_factory()
     try:
         # [UPDATE] Menambahkan batas_negara ke Union Query
         query = text(f"""
@@ -711,7 +1580,7 @@ def get_data_by_ids():
         """)
         result = session.execute(query)
         rows = [dict(row) for row in result.mappings()]
-        return jsonify(process_wilayah_data(rows))
+        return jsonify(versioned_wilayah_data(process_wilayah_data(rows), known_versions))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -776,13 +1645,20 @@ def get_gempa_bmkg():
         set_cache(cache_key, dummy, CACHE_TTL_GEMPA_BMKG)
         return jsonify(dummy)
     
+    if is_negative_cached(cache_key) or not acquire_upstream_call("bmkg"):
+        return jsonify(get_stale_cache(cache_key) or {"features": []})
     try:
-        resp = requests.get("https://data.bmkg.go.id/DataMKG/TEWS/gempaterkini.json", timeout=10)
+        resp = upstream_get("bmkg", BMKG_URL, timeout=10)
+        resp.raise_for_status()
         data = parse_bmkg_to_geojson(resp.json())
-        set_cache(cache_key, data, CACHE_TTL_GEMPA_BMKG)
+        record_upstream_success("bmkg")
+        set_cache(cache_key, data, CACHE_TTL_GEMPA_BMKG, stale_ttl=CACHE_TTL_STALE)
         return jsonify(data)
-    except:
-        return jsonify(get_cache(cache_key) or {"features": []})
+    except Exception as e:
+        print(f"BMKG Error: {e}")
+        record_upstream_error("bmkg", e)
+        set_negative_cache([cache_key])
+        return jsonify(get_stale_cache(cache_key) or {"features": []})
 
 @app.route('/api/gempa/usgs')
 @cache_control(max_age=300, s_maxage=300) # Cache 5 menit
@@ -803,9 +1679,13 @@ def get_gempa_usgs():
             props.update({"mmi": round(mmi,1), "status_label": impact['label'], "status_color": impact['color'], "pulse_mode": impact['pulse'], "status_desc": impact['description']})
         set_cache(cache_key, dummy, CACHE_TTL_GEMPA_USGS)
         return jsonify(dummy)
+    if is_negative_cached(cache_key) or not acquire_upstream_call("usgs"):
+        return jsonify(get_stale_cache(cache_key) or {"features": []})
     try:
-        resp = requests.get("https://earthquake.usgs.gov/fdsnws/event/1/query", params={"format": "geojson", "minlatitude": "-15", "maxlatitude": "10", "minlongitude": "90", "maxlongitude": "145", "minmagnitude": "4.5", "orderby": "time", "limit": "50"}, timeout=15)
+        resp = upstream_get("usgs", USGS_URL, params={"format": "geojson", "minlatitude": "-15", "maxlatitude": "10", "minlongitude": "90", "maxlongitude": "145", "minmagnitude": "4.5", "orderby": "time", "limit": "50"}, timeout=15)
+        resp.raise_for_status()
         data = resp.json()
+        record_upstream_success("usgs")
 
         # Post Processing USGS Real
         for feature in data.get('features', []):
@@ -816,10 +1696,48 @@ def get_gempa_usgs():
             mmi = calculate_esteva_intensity(props['mag'], depth)
             impact = get_impact_level(mmi, is_tsunami)
             props.update({"mmi": round(mmi,1), "status_label": impact['label'], "status_color": impact['color'], "pulse_mode": impact['pulse'], "status_desc": impact['description']})
-        set_cache(cache_key, data, CACHE_TTL_GEMPA_USGS)
+        set_cache(cache_key, data, CACHE_TTL_GEMPA_USGS, stale_ttl=CACHE_TTL_STALE)
         return jsonify(data)
-    except:
-        return jsonify(get_cache(cache_key) or {"features": []})
+    except Exception as e:
+        print(f"USGS Error: {e}")
+        record_upstream_error("usgs", e)
+        set_negative_cache([cache_key])
+        return jsonify(get_stale_cache(cache_key) or {"features": []})
+
+@app.route('/api/cron/warmup', methods=['GET', 'POST'])
+def cron_warmup():
+    """Endpoint cron untuk warm-up cache cuaca (dipanggil Vercel Cron / scheduler eksternal)."""
+    # Preview & production (URL publik) wajib memakai secret; tanpa secret hanya boleh di development
+    if not CRON_SECRET:
+        if ENV_MODE != "development":
+            return jsonify({"error": "CRON_SECRET not configured"}), 403
+    elif request.headers.get('Authorization') != f"Bearer {CRON_SECRET}":
+        return jsonify({"error": "Unauthorized"}), 401
+
+    max_batches = request.args.get('max_batches', type=int)
+    time_budget = request.args.get('time_budget', type=float) or WARMUP_TIME_BUDGET
+    stats = warmup_weather_cache(max_batches=max_batches, time_budget=time_budget)
+    if "error" in stats: return jsonify(stats), 500
+    return jsonify(stats)
+
+@app.cli.command('warmup-cache')
+@click.option('--priority', default=None, help='Urutan kelompok, contoh: "kabkota,kecamatan".')
+@click.option('--batch-size', type=int, default=None, help='Jumlah lokasi per panggilan upstream.')
+@click.option('--refresh-before', type=int, default=None, help='Refresh jika sisa TTL (detik) di bawah nilai ini.')
+@click.option('--max-batches', type=int, default=None, help='Batas jumlah batch.')
+@click.option('--time-budget', type=float, default=None, help='Batas durasi run (detik).')
+def warmup_cache_command(priority, batch_size, refresh_before, max_batches, time_budget):
+    """Memanaskan cache cuaca (flask --app app warmup-cache)."""
+    groups = [p.strip() for p in priority.split(',') if p.strip()] if priority else None
+    stats = warmup_weather_cache(groups, batch_size, refresh_before, max_batches, time_budget)
+    click.echo(json.dumps(stats, indent=2))
+
+@app.route('/metrics')
+def get_metrics():
+    """Metrik format Prometheus (per instance)."""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/monitoring-stats')
 def get_monitoring_stats():
@@ -827,9 +1745,15 @@ def get_monitoring_stats():
         "status": "online",
         "env": ENV_MODE,
         "api_source": "real" if USE_REAL_API else "dummy",
-        "database": "connected" if engine else "disconnected",
-        "cache": "redis" if redis_client else "memory"
+        "database": "connected" if engine else ("lazy" if DATABASE_URL else "disconnected"),
+        "cache": "redis" if get_redis() else "memory",
+        "reference_snapshot": get_reference_snapshot().version if get_reference_snapshot() else None,
+        "rate_limit": get_rate_limit_stats(),
+        "circuits": get_circuit_stats(),
+        "startup": startup_profile.summary()
     })
 
+startup_profile.mark_ready()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Utilitas bersama benchmark: menyiapkan app.py dengan stand-in lokal, statistik latensi, dan baseline.
+"""
+import contextlib
+import json
+import os
+import statistics
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+
+def load_app(env=None, database_url=None, fixture_sizes=None, use_fake_redis=True):
+    """
+    Mengimpor app.py dengan environment benchmark lalu memasang stand-in:
+    - Redis: FakeRedis in-process (kecuali use_fake_redis=False dan REDIS_URL diset)
+    - Database: PostGIS/PostgreSQL dari database_url, atau fixture SQLite sintetis
+    Environment harus diset SEBELUM import karena app.py membaca konfigurasi saat import.
+    """
+    defaults = {
+        "VERCEL_ENV": "development",
+        "USE_REAL_API": "false",
+        "DEV_DATABASE_URL": "",
+        # Budget longgar agar yang terukur adalah app, bukan penolakan rate limit
+        "RATE_LIMIT_OPEN_METEO": "1000000/1",
+        "RATE_LIMIT_BMKG": "1000000/1",
+        "RATE_LIMIT_USGS": "1000000/1",
+    }
+    if use_fake_redis:
+        defaults["REDIS_URL"] = ""
+    for key, value in {**defaults, **(env or {})}.items():
+        os.environ[key] = value
+
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    with quiet():
+        import app as app_module
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from benchmarks.fake_redis import FakeRedis
+    from benchmarks.fixtures import create_fixture_engine
+
+    if use_fake_redis:
+        app_module.redis_client = FakeRedis()
+
+    summary = None
+    if database_url:
+        db_engine = create_engine(database_url, pool_size=5, max_overflow=10, pool_pre_ping=True)
+    else:
+        db_engine, summary = create_fixture_engine(**(fixture_sizes or {}))
+    app_module.instrument_engine(db_engine)
+    app_module.engine = db_engine
+    app_module.Session = sessionmaker(bind=db_engine)
+    return app_module, summary
+
+
+@contextlib.contextmanager
+def quiet():
+    """Membungkam print diagnostik app.py agar laporan benchmark tetap terbaca."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples: return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * (len(sorted_samples) - 1)))))
+    return sorted_samples[index]
+
+
+def summarize(samples_seconds, wall_seconds=None):
+    """Ringkasan latensi (milidetik) + throughput."""
+    ordered = sorted(samples_seconds)
+    total = wall_seconds if wall_seconds is not None else sum(ordered)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / total, 1) if total else 0.0,
+    }
+
+
+def compare_to_baseline(results, baseline_path, tolerance, min_delta_ms=0.05):
+    """
+    Membandingkan p50/p99 terhadap baseline. Mengembalikan daftar regresi
+    (hasil > baseline * (1 + tolerance) dan selisihnya > min_delta_ms, agar
+    operasi sub-mikrodetik tidak memicu alarm karena noise timer).
+    """
+    if not os.path.exists(baseline_path):
+        print(f"Baseline {baseline_path} belum ada (jalankan dengan --update-baseline).")
+        return []
+    with open(baseline_path) as f:
+        baseline = json.load(f).get("results", {})
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous: continue
+        for metric in ("p50_ms", "p99_ms"):
+            limit = previous[metric] * (1 + tolerance)
+            if previous[metric] > 0 and current[metric] > limit and current[metric] - previous[metric] > min_delta_ms:
+                regressions.append(f"{name} {metric}: {current[metric]:.3f} > {limit:.3f} (baseline {previous[metric]:.3f})")
+    return regressions
+
+
+def save_baseline(results, baseline_path, meta):
+    with open(baseline_path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Baseline disimpan ke {baseline_path}")
+
+
+def print_table(results):
+    header = f"{'benchmark':<44} {'count':>7} {'p50 ms':>10} {'p99 ms':>10} {'mean ms':>10} {'rps':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<44} {r['count']:>7} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['mean_ms']:>10.3f} {r['throughput_rps']:>10.1f}")
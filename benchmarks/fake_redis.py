@@ -0,0 +1,197 @@
+"""
+🧪 FAKE REDIS
+Pengganti Redis in-process untuk benchmark (subset perintah yang dipakai app.py).
+Nilai disimpan sebagai string seperti redis-py dengan decode_responses=True, sehingga
+biaya serialisasi JSON di get_cache/set_cache tetap ikut terukur.
+"""
+import threading
+import time
+
+
+class FakeRedis:
+    def __init__(self):
+        self._data = {}
+        self._expire = {}
+        self._lock = threading.RLock()
+
+    # ---------- Internal ----------
+
+    def _alive(self, key):
+        expire_at = self._expire.get(key)
+        if expire_at is not None and time.time() >= expire_at:
+            self._data.pop(key, None)
+            self._expire.pop(key, None)
+            return False
+        return key in self._data
+
+    def _get_typed(self, key, factory):
+        if not self._alive(key):
+            self._data[key] = factory()
+        return self._data[key]
+
+    # ---------- Generic ----------
+
+    def ping(self):
+        return True
+
+    def flushall(self):
+        with self._lock:
+            self._data.clear()
+            self._expire.clear()
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expire.pop(key, None)
+            return removed
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive(key): return False
+            self._expire[key] = time.time() + seconds
+            return True
+
+    def ttl(self, key):
+        with self._lock:
+            if not self._alive(key): return -2
+            expire_at = self._expire.get(key)
+            return -1 if expire_at is None else int(expire_at - time.time())
+
+    # ---------- String ----------
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def mget(self, *keys):
+        with self._lock:
+            return [self.get(key) for key in keys]
+
+    def set(self, key, value, nx=False, ex=None):
+        with self._lock:
+            if nx and self._alive(key): return None
+            self._data[key] = str(value)
+            if ex: self._expire[key] = time.time() + ex
+            else: self._expire.pop(key, None)
+            return True
+
+    def setex(self, key, seconds, value):
+        return self.set(key, value, ex=seconds)
+
+    # ---------- Hash ----------
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            h = self._get_typed(key, dict)
+            h[field] = str(int(h.get(field, 0)) + amount)
+            return int(h[field])
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self._lock:
+            h = self._get_typed(key, dict)
+            updates = dict(mapping or {})
+            if field is not None: updates[field] = value
+            added = sum(1 for f in updates if f not in h)
+            h.update({f: str(v) for f, v in updates.items()})
+            return added
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._data[key]) if self._alive(key) else {}
+
+    # ---------- Set ----------
+
+    def sadd(self, key, *members):
+        with self._lock:
+            s = self._get_typed(key, set)
+            added = sum(1 for m in members if str(m) not in s)
+            s.update(str(m) for m in members)
+            return added
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._data[key]) if self._alive(key) else set()
+
+    # ---------- Sorted Set ----------
+
+    def zincrby(self, key, amount, member):
+        with self._lock:
+            z = self._get_typed(key, dict)
+            z[member] = z.get(member, 0) + amount
+            return z[member]
+
+    def zadd(self, key, mapping):
+        with self._lock:
+            z = self._get_typed(key, dict)
+            added = sum(1 for member in mapping if member not in z)
+            z.update(mapping)
+            return added
+
+    def zrevrange(self, key, start, end):
+        with self._lock:
+            if not self._alive(key): return []
+            ranked = sorted(self._data[key].items(), key=lambda kv: kv[1], reverse=True)
+            stop = None if end == -1 else end + 1
+            return [member for member, _ in ranked[start:stop]]
+
+    def zremrangebyscore(self, key, min_score, max_score):
+        with self._lock:
+            if not self._alive(key): return 0
+            z = self._data[key]
+            doomed = [m for m, score in z.items() if float(min_score) <= score <= float(max_score)]
+            for member in doomed:
+                del z[member]
+            return len(doomed)
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._data[key]) if self._alive(key) else 0
+
+    # ---------- Pipeline & Script ----------
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def register_script(self, script):
+        """Hanya mendukung script token bucket app.py (diterjemahkan ke Python)."""
+        fake = self
+
+        def token_bucket(keys, args):
+            capacity, rate, now, cost, floor = (float(a) for a in args)
+            with fake._lock:
+                h = fake._get_typed(keys[0], dict)
+                tokens = float(h.get('tokens', capacity))
+                ts = float(h.get('ts', now))
+                tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+                allowed = 0
+                if tokens - cost >= floor:
+                    tokens -= cost
+                    allowed = 1
+                h['tokens'], h['ts'] = str(tokens), str(now)
+                return allowed
+
+        return token_bucket
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        with self._client._lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._calls]
+        self._calls = []
+        return results
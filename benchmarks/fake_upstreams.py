@@ -0,0 +1,191 @@
+"""
+🧪 FAKE UPSTREAMS
+Server HTTP lokal yang meniru Open-Meteo, BMKG, dan USGS untuk benchmark/load test.
+Latensi dan tingkat kegagalan bisa diatur agar perilaku cache, rate limit, dan circuit breaker teruji.
+
+Jalankan mandiri:
+    python -m benchmarks.fake_upstreams --port 8900 --latency-ms 80 --failure-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+HOURLY_POINTS = 336
+DAILY_POINTS = 14
+
+
+def _build_location_template():
+    """Satu payload lokasi Open-Meteo (dibangun sekali lalu disalin per koordinat)."""
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)
+    hourly_times = [(start + timedelta(hours=i)).strftime('%Y-%m-%dT%H:%M') for i in range(HOURLY_POINTS)]
+    daily_times = [(start + timedelta(days=i)).date().isoformat() for i in range(DAILY_POINTS)]
+    hourly = {
+        'time': hourly_times,
+        'temperature_2m': [round(27 + 3 * ((i % 24) / 24), 1) for i in range(HOURLY_POINTS)],
+        'relative_humidity_2m': [75] * HOURLY_POINTS,
+        'apparent_temperature': [30.5] * HOURLY_POINTS,
+        'is_day': [1 if 6 <= i % 24 < 18 else 0 for i in range(HOURLY_POINTS)],
+        'precipitation_probability': [(i * 7) % 100 for i in range(HOURLY_POINTS)],
+        'weather_code': [(0, 1, 2, 3, 61, 80)[i % 6] for i in range(HOURLY_POINTS)],
+        'wind_speed_10m': [2.5] * HOURLY_POINTS,
+        'wind_direction_10m': [(i * 15) % 360 for i in range(HOURLY_POINTS)],
+    }
+    daily = {
+        'time': daily_times,
+        'weather_code': [(0, 2, 61, 80)[i % 4] for i in range(DAILY_POINTS)],
+        'temperature_2m_max': [32.0] * DAILY_POINTS,
+        'temperature_2m_min': [24.0] * DAILY_POINTS,
+    }
+    return {
+        'generationtime_ms': 0.5, 'utc_offset_seconds': 25200, 'timezone': 'Asia/Jakarta',
+        'timezone_abbreviation': 'WIB', 'elevation': 10.0,
+        'hourly_units': {}, 'hourly': hourly, 'daily_units': {}, 'daily': daily,
+    }
+
+
+def _build_bmkg_payload(count=15):
+    now = datetime.now()
+    gempa = []
+    for i in range(count):
+        t = now - timedelta(minutes=17 * i)
+        gempa.append({
+            "Tanggal": t.strftime("%d %b %Y"), "Jam": t.strftime("%H:%M:%S WIB"), "DateTime": t.isoformat(),
+            "Coordinates": f"-{2 + (i % 8)}.{10 + i},{100 + (i * 3) % 40}.{20 + i}",
+            "Lintang": "x LS", "Bujur": "x BT", "Magnitude": f"{3.0 + (i % 5) * 0.8:.1f}",
+            "Kedalaman": f"{10 + (i * 37) % 300} km", "Wilayah": f"{10 + i} km BaratDaya FAKE-{i}",
+            "Potensi": "Tidak berpotensi tsunami",
+        })
+    return {"Infogempa": {"gempa": gempa}}
+
+
+def _build_usgs_payload(count=50):
+    now_ms = int(time.time() * 1000)
+    features = []
+    for i in range(count):
+        mag = 4.5 + (i % 6) * 0.4
+        features.append({
+            "type": "Feature",
+            "properties": {"mag": round(mag, 1), "place": f"Fake #{i}", "time": now_ms - i * 600000,
+                           "tsunami": 0, "title": f"M {mag:.1f} - Fake #{i}"},
+            "geometry": {"type": "Point", "coordinates": [95 + (i * 0.9) % 46, -11 + (i * 0.3) % 17, 10 + (i * 13) % 500]},
+            "id": f"fake_usgs_{i}",
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+class FakeUpstreamServer:
+    """
+    Satu server HTTP dengan tiga path:
+    - /v1/forecast     -> Open-Meteo (list lokasi sesuai jumlah koordinat)
+    - /bmkg            -> BMKG gempaterkini.json
+    - /usgs            -> USGS FDSN GeoJSON
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, failure_rate=0.0, seed=42):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.request_counts = {"open-meteo": 0, "bmkg": 0, "usgs": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._location = _build_location_template()
+        self._bmkg_body = json.dumps(_build_bmkg_payload()).encode()
+        self._usgs_body = json.dumps(_build_usgs_payload()).encode()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Variabel environment untuk mengarahkan app.py ke server ini."""
+        return {
+            "OPEN_METEO_URL": f"{self.base_url}/v1/forecast",
+            "BMKG_URL": f"{self.base_url}/bmkg",
+            "USGS_URL": f"{self.base_url}/usgs",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _should_fail(self):
+        with self._lock:
+            return self._rng.random() < self.failure_rate
+
+    def _forecast_body(self, query):
+        lats = query.get("latitude", [""])[0].split(",")
+        lons = query.get("longitude", [""])[0].split(",")
+        locations = [{**self._location, "latitude": float(lat), "longitude": float(lon)}
+                     for lat, lon in zip(lats, lons) if lat and lon]
+        payload = locations[0] if len(locations) == 1 else locations
+        return json.dumps(payload).encode()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                route = {"/v1/forecast": "open-meteo", "/bmkg": "bmkg", "/usgs": "usgs"}.get(parsed.path)
+                if route is None:
+                    self.send_error(404)
+                    return
+                with server._lock:
+                    server.request_counts[route] += 1
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                if server._should_fail():
+                    self.send_error(503, "Fake upstream failure")
+                    return
+                if route == "open-meteo":
+                    body = server._forecast_body(parse_qs(parsed.query))
+                elif route == "bmkg":
+                    body = server._bmkg_body
+                else:
+                    body = server._usgs_body
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Senyap agar output benchmark tetap bersih
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server tiruan Open-Meteo/BMKG/USGS.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeUpstreamServer(args.host, args.port, args.latency_ms, args.failure_rate).start()
+    print(f"Fake upstreams berjalan di {server.base_url}")
+    for key, value in server.env().items():
+        print(f"  {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+🧪 FIXTURE DATABASE
+Membangun database SQLite sintetis dengan skema yang sama seperti hasil migrate_data.py
+(batas_negara, batas_provinsi, batas_kabupatenkota, batas_kecamatandistrik, wilayah_administratif).
+
+Fungsi PostGIS/PostgreSQL yang dipakai query app.py (ST_Intersects, ST_GeomFromEWKT, LEFT, CONCAT)
+diemulasikan sebagai fungsi SQLite. Geometri disimpan sebagai titik centroid "lon lat", jadi
+ST_Intersects hanya menguji titik terhadap bbox. Untuk angka yang representatif terhadap
+produksi, arahkan harness ke PostGIS lokal (docker-compose) dengan --database-url.
+"""
+import os
+import re
+import sqlite3
+import tempfile
+
+from sqlalchemy import create_engine, event
+
+BBOX_REGEX = re.compile(r"POLYGON\(\(([-\d.]+) ([-\d.]+), ([-\d.]+) [-\d.]+, [-\d.]+ ([-\d.]+)")
+
+
+def _st_intersects(point, bbox_wkt):
+    if not point or not bbox_wkt: return 0
+    match = BBOX_REGEX.search(bbox_wkt)
+    if not match: return 0
+    xmin, ymin, xmax, ymax = (float(v) for v in match.groups())
+    lon, lat = (float(v) for v in point.split())
+    return int(xmin <= lon <= xmax and ymin <= lat <= ymax)
+
+
+def _register_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function("ST_GeomFromEWKT", 1, lambda wkt: wkt, deterministic=True)
+    dbapi_connection.create_function("ST_Intersects", 2, _st_intersects, deterministic=True)
+    dbapi_connection.create_function("LEFT", 2, lambda s, n: s[:n] if s is not None else None, deterministic=True)
+    dbapi_connection.create_function("CONCAT", -1, lambda *parts: "".join(p for p in parts if p is not None))
+
+
+def build_fixture_db(path, provinsi=34, kab_per_prov=15, kec_per_kab=15, desa_per_kec=12):
+    """
+    Menulis hirarki wilayah sintetis ke file SQLite. Default mendekati ukuran Indonesia
+    (~500 kab/kota, ~7.600 kecamatan, ~90.000 desa). Mengembalikan ringkasan jumlah baris.
+    """
+    if os.path.exists(path): os.remove(path)
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.executescript("""
+        CREATE TABLE batas_negara ("KDPPUM" TEXT, "WADMPR" TEXT, latitude REAL, longitude REAL, "TIPADM" INTEGER);
+        CREATE TABLE batas_provinsi ("KDPPUM" TEXT, "WADMPR" TEXT, latitude REAL, longitude REAL, "TIPADM" INTEGER);
+        CREATE TABLE batas_kabupatenkota ("KDPKAB" TEXT, "WADMKK" TEXT, latitude REAL, longitude REAL, "TIPADM" INTEGER, geometry TEXT);
+        CREATE TABLE batas_kecamatandistrik ("KDCPUM" TEXT, "WADMKC" TEXT, latitude REAL, longitude REAL, "TIPADM" INTEGER, geometry TEXT);
+        CREATE TABLE wilayah_administratif ("KDPPUM" TEXT, "KDPKAB" TEXT, "KDCPUM" TEXT, "KDEPUM" TEXT, "WADMKD" TEXT,
+                                            label TEXT, latitude REAL, longitude REAL, "TIPADM" INTEGER);
+    """)
+    cur.execute("INSERT INTO batas_negara VALUES ('0', 'Indonesia', -2.5, 118.0, 0)")
+
+    prov_rows, kab_rows, kec_rows, wa_rows = [], [], [], []
+    for p in range(provinsi):
+        prov_id = f"{11 + p}"
+        prov_lat, prov_lon = -10.0 + (p % 6) * 2.6, 96.0 + (p // 6) * 7.5
+        prov_rows.append((prov_id, f"Provinsi {prov_id}", prov_lat, prov_lon, 1))
+        wa_rows.append((prov_id, None, None, None, None, f"Provinsi {prov_id}", prov_lat, prov_lon, 1))
+        for k in range(kab_per_prov):
+            kab_id = f"{prov_id}.{k + 1:02d}"
+            kab_lat, kab_lon = prov_lat + (k % 4) * 0.5, prov_lon + (k // 4) * 0.5
+            kab_rows.append((kab_id, f"Kabupaten {kab_id}", kab_lat, kab_lon, 2, f"{kab_lon} {kab_lat}"))
+            wa_rows.append((prov_id, kab_id, None, None, None, f"Kabupaten {kab_id}, Provinsi {prov_id}", kab_lat, kab_lon, 2))
+            for c in range(kec_per_kab):
+                kec_id = f"{kab_id}.{c + 1:02d}"
+                kec_lat, kec_lon = kab_lat + (c % 4) * 0.1, kab_lon + (c // 4) * 0.1
+                kec_rows.append((kec_id, f"Kecamatan {kec_id}", kec_lat, kec_lon, 3, f"{kec_lon} {kec_lat}"))
+                wa_rows.append((prov_id, kab_id, kec_id, None, None, f"Kecamatan {kec_id}, Kabupaten {kab_id}", kec_lat, kec_lon, 3))
+                for d in range(desa_per_kec):
+                    desa_id = f"{kec_id}.{2001 + d}"
+                    desa_lat, desa_lon = kec_lat + (d % 4) * 0.02, kec_lon + (d // 4) * 0.02
+                    wa_rows.append((prov_id, kab_id, kec_id, desa_id, f"Desa {desa_id}",
+                                    f"Desa {desa_id}, Kecamatan {kec_id}", desa_lat, desa_lon, 4))
+
+    cur.executemany("INSERT INTO batas_provinsi VALUES (?, ?, ?, ?, ?)", prov_rows)
+    cur.executemany("INSERT INTO batas_kabupatenkota VALUES (?, ?, ?, ?, ?, ?)", kab_rows)
+    cur.executemany("INSERT INTO batas_kecamatandistrik VALUES (?, ?, ?, ?, ?, ?)", kec_rows)
+    cur.executemany("INSERT INTO wilayah_administratif VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", wa_rows)
+    cur.executescript("""
+        CREATE INDEX idx_kab_id ON batas_kabupatenkota ("KDPKAB");
+        CREATE INDEX idx_kec_id ON batas_kecamatandistrik ("KDCPUM");
+        CREATE INDEX idx_wa_kec ON wilayah_administratif ("KDCPUM", "TIPADM");
+        CREATE INDEX idx_wa_desa ON wilayah_administratif ("KDEPUM");
+    """)
+    conn.commit()
+    conn.close()
+    return {"provinsi": len(prov_rows), "kabkota": len(kab_rows), "kecamatan": len(kec_rows),
+            "desa": len(wa_rows) - len(prov_rows) - len(kab_rows) - len(kec_rows)}
+
+
+def create_fixture_engine(path=None, **sizes):
+    """Membuat (jika perlu) fixture SQLite dan mengembalikan (engine, ringkasan)."""
+    path = path or os.path.join(tempfile.gettempdir(), "web_cuaca_bench.sqlite")
+    summary = build_fixture_db(path, **sizes)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", _register_functions)
+    return engine, summary
@@ -0,0 +1,98 @@
+"""
+⏱️ MICRO-BENCHMARK
+Mengukur hot-path parsing, cache, dan serialisasi di app.py tanpa jaringan.
+
+    python -m benchmarks.micro                    # jalankan & bandingkan dengan baseline
+    python -m benchmarks.micro --update-baseline  # simpan hasil sebagai baseline baru
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks.common import BENCH_DIR, load_app, quiet, summarize, compare_to_baseline, save_baseline, print_table
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline_micro.json")
+
+
+def _bench(fn, iterations, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def build_cases(app, locations):
+    """Menyiapkan input sekali, lalu mengembalikan {nama: callable} untuk diukur."""
+    # Koordinat tersebar (tiap wilayah di sel grid synthetic_data yang berbeda), seperti Kab/Kota
+    # sungguhan: memoization per sel tidak boleh menutupi biaya per lokasi.
+    infos = [{"id": f"99.01.{i:02d}", "nama_simpel": f"Kec {i}", "lat": -2.0 - (i % 12) * 0.45,
+              "lon": 100.0 + i * 0.37, "tipadm": 3} for i in range(locations)]
+    with quiet():
+        api_response = app.generate_dummy_api_response(infos)
+        bmkg_raw = app.generate_dummy_bmkg_data()
+    weather = app.process_api_response(api_response, infos)
+    one_id, one_weather = next(iter(weather.items()))
+
+    # Cache hangat untuk jalur hit process_wilayah_data
+    for wilayah_id, data in weather.items():
+        app.set_cache(f"weather:{wilayah_id}", data, app.CACHE_TTL_WEATHER)
+    merged = app.process_wilayah_data(infos)
+    miss_infos = [{**info, "id": f"miss.{info['id']}"} for info in infos]
+    miss_keys = [f"{prefix}weather:{info['id']}" for info in miss_infos for prefix in ("", "stale:", "neg:")]
+
+    def process_miss():
+        app.get_redis().delete(*miss_keys)
+        app.synthetic_data._cell_series.cache_clear()
+        app.process_wilayah_data(miss_infos)
+
+    return {
+        "parse_bmkg_to_geojson": lambda: app.parse_bmkg_to_geojson(bmkg_raw),
+        f"process_api_response[{locations}]": lambda: app.process_api_response(api_response, infos),
+        f"process_wilayah_data_hit[{locations}]": lambda: app.process_wilayah_data(infos),
+        f"process_wilayah_data_miss_dummy[{locations}]": process_miss,
+        "get_cache_weather": lambda: app.get_cache(f"weather:{one_id}"),
+        "set_cache_weather": lambda: app.set_cache(f"weather:{one_id}", one_weather, app.CACHE_TTL_WEATHER),
+        f"json_dumps_weather[{locations}]": lambda: json.dumps(list(merged.values())),
+        "calculate_esteva_intensity": lambda: app.calculate_esteva_intensity(5.6, 33.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark hot-path app.py.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--locations", type=int, default=50, help="Jumlah wilayah per batch.")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Toleransi regresi (0.3 = 30%%).")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Tulis hasil JSON ke file ini.")
+    args = parser.parse_args()
+
+    app, _ = load_app(fixture_sizes={"provinsi": 1, "kab_per_prov": 1, "kec_per_kab": 1, "desa_per_kec": 1})
+    results = {}
+    with app.app.app_context(), quiet():
+        for name, fn in build_cases(app, args.locations).items():
+            results[name] = _bench(fn, args.iterations)
+
+    print_table(results)
+    meta = {"python": sys.version.split()[0], "platform": platform.platform(),
+            "iterations": args.iterations, "locations": args.locations}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+    if args.update_baseline:
+        save_baseline(results, BASELINE_PATH, meta)
+        return 0
+    regressions = compare_to_baseline(results, BASELINE_PATH, args.tolerance)
+    for line in regressions:
+        print(f"REGRESI: {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+🧊 STARTUP BENCHMARK
+Mengukur cold start app.py di proses Python baru (seperti instance serverless yang baru dibuat):
+- import_app          : durasi `import app`
+- first_request_wmo   : request pertama ke /api/wmo-codes (route tanpa DB/Redis/upstream)
+- process_total       : total proses, termasuk start interpreter
+
+    python -m benchmarks.startup                    # jalankan & bandingkan dengan baseline
+    python -m benchmarks.startup --update-baseline  # simpan hasil sebagai baseline baru
+    python -m benchmarks.startup --profile          # satu run dengan STARTUP_PROFILE=true
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BENCH_DIR, ROOT_DIR, summarize, compare_to_baseline, save_baseline, print_table
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline_startup.json")
+
+# Dijalankan di proses anak; hasil dikirim sebagai satu baris JSON terakhir di stdout
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/wmo-codes')
+first = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({"import_app": imported - start, "first_request_wmo": first - imported,
+                  "heavy_modules": sorted(m for m in ("sqlalchemy", "redis", "requests") if m in sys.modules)}))
+"""
+
+
+def _probe_env(profile=False):
+    env = dict(os.environ)
+    env.update({
+        "VERCEL_ENV": "development",
+        "USE_REAL_API": "false",
+        "REDIS_URL": "",
+        "DEV_DATABASE_URL": "",
+        "STARTUP_PROFILE": "true" if profile else "false",
+    })
+    return env
+
+
+def run_probe(profile=False):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT_DIR, env=_probe_env(profile),
+                               capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    if profile:
+        print(completed.stdout)
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_total"] = total
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start app.py.")
+    parser.add_argument("--runs", type=int, default=9, help="Jumlah proses baru yang diukur.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Toleransi regresi (0.25 = 25%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=20.0, help="Selisih minimum agar dianggap regresi.")
+    parser.add_argument("--profile", action="store_true", help="Cetak laporan STARTUP_PROFILE satu run lalu keluar.")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Tulis hasil JSON ke file ini.")
+    args = parser.parse_args()
+
+    if args.profile:
+        run_probe(profile=True)
+        return 0
+
+    run_probe()  # Pemanasan: bytecode cache & page cache OS, agar run terukur sebanding
+    samples = {"import_app": [], "first_request_wmo": [], "process_total": []}
+    heavy_modules = set()
+    for _ in range(args.runs):
+        result = run_probe()
+        heavy_modules.update(result["heavy_modules"])
+        for name in samples:
+            samples[name].append(result[name])
+
+    results = {name: summarize(values) for name, values in samples.items()}
+    print_table(results)
+    meta = {"python": sys.version.split()[0], "platform": platform.platform(), "runs": args.runs}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+    if args.update_baseline:
+        save_baseline(results, BASELINE_PATH, meta)
+        return 0
+
+    regressions = compare_to_baseline(results, BASELINE_PATH, args.tolerance, min_delta_ms=args.min_delta_ms)
+    # Import berat harus tetap lazy: /api/wmo-codes tidak boleh memuat DB/Redis/HTTP client
+    if heavy_modules:
+        regressions.append(f"modul berat ter-import saat cold start: {', '.join(sorted(heavy_modules))}")
+    for line in regressions:
+        print(f"REGRESI: {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
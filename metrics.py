@@ -0,0 +1,163 @@
+"""
+📊 METRICS
+Registry metrik ringan (tanpa dependensi) untuk instrumentasi hot-path aplikasi.
+Diekspos dalam format teks Prometheus lewat endpoint /metrics, plus header Server-Timing per request.
+
+Catatan: di Vercel setiap instance serverless punya registry sendiri, jadi nilai yang
+di-scrape adalah per-instance (gunakan label 'instance' di sisi Prometheus untuk agregasi).
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+# Bucket default (detik) untuk latensi route, upstream, dan query DB
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+# Bucket default (byte) untuk ukuran payload response
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+INSTANCE_ID = f"{os.getpid()}-{int(time.time())}"
+
+
+class Counter:
+    """Counter monoton dengan label."""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Histogram kumulatif dengan label (kompatibel format Prometheus)."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # key -> [bucket_counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(entry)) for key, entry in self._values.items()]
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_float(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {entry[-1]}")
+            base_labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{base_labels} {_format_float(entry[-2])}")
+            lines.append(f"{self.name}_count{base_labels} {entry[-1]}")
+        return lines
+
+
+def _format_float(value):
+    return repr(float(value))
+
+
+def _format_labels(names, values):
+    if not names: return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# ================== DEFINISI METRIK ==================
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Latensi request per route.", ("route", "method", "status"))
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Ukuran payload response (sebelum kompresi) per route.", ("route",), SIZE_BUCKETS)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Lookup cache per keluarga key (hit/miss/stale_hit/stale_miss).", ("family", "outcome"))
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Latensi panggilan upstream.", ("upstream",))
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Jumlah panggilan upstream yang gagal.", ("upstream",))
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Durasi eksekusi query database.")
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Waktu menunggu koneksi dari connection pool.")
+
+REGISTRY = [
+    HTTP_REQUEST_DURATION, HTTP_RESPONSE_SIZE, CACHE_REQUESTS,
+    UPSTREAM_DURATION, UPSTREAM_ERRORS, DB_QUERY_DURATION, DB_POOL_WAIT,
+]
+
+
+def render_prometheus():
+    """Menghasilkan seluruh metrik dalam format teks Prometheus (text/plain; version=0.0.4)."""
+    lines = [f'# instance {INSTANCE_ID}']
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ================== SERVER-TIMING PER REQUEST ==================
+
+def add_server_timing(segment, seconds):
+    """Menambah durasi ke segmen Server-Timing request aktif (no-op di luar request, mis. CLI)."""
+    if not has_request_context(): return
+    timings = g.setdefault("_server_timing", {})
+    timings[segment] = timings.get(segment, 0.0) + seconds
+
+
+@contextmanager
+def timed(histogram, segment=None, **labels):
+    """Context manager: observasi durasi ke histogram dan (opsional) segmen Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, **labels)
+        if segment:
+            add_server_timing(segment, elapsed)
+
+
+def format_server_timing(total_seconds):
+    """Membangun nilai header Server-Timing, contoh: 'db;dur=3.1, upstream;dur=120.4, total;dur=130.2'."""
+    parts = []
+    if has_request_context():
+        for segment, seconds in g.get("_server_timing", {}).items():
+            parts.append(f"{segment};dur={seconds * 1000:.1f}")
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
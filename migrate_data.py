@@ -4,6 +4,7 @@ import pandas as pd
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
 import logging
+import reference_snapshot
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,6 +17,11 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL tidak ditemukan di environment variables. Pastikan file .env sudah benar.")
 
+# Lokasi snapshot data referensi yang dibaca app.py (commit file ini agar ikut ter-deploy)
+REFERENCE_SNAPSHOT_PATH = os.getenv("REFERENCE_SNAPSHOT_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'reference_snapshot.bin'
+)
+
 def migrate_geojson_to_postgis(filepath, table_name, engine):
     """
     Membaca file GeoJSON dan memigrasikannya ke tabel PostGIS.
@@ -56,6 +62,17 @@ def migrate_csv_to_postgres(filepath, table_name, engine, dtype=None):
         # Jangan raise error fatal agar proses lain tetap jalan (misal file tidak ada)
         pass
 
+def export_reference_snapshot(engine, path):
+    """
+    Membangun snapshot referensi (hirarki, nama, label, centroid) dari tabel yang baru dimigrasi.
+    """
+    try:
+        logging.info(f"Membangun snapshot data referensi: {path}...")
+        header = reference_snapshot.build_from_database(engine, path)
+        logging.info(f"Snapshot versi {header['version']} berhasil dibuat. {header['count']} wilayah.")
+    except Exception as e:
+        logging.error(f"Gagal membangun snapshot data referensi: {e}")
+
 def main():
     """
     Fungsi utama untuk menjalankan semua proses migrasi.
@@ -102,6 +119,9 @@ def main():
             migrate_csv_to_postgres(csv_filepath, "wilayah_administratif", engine, dtype=csv_dtypes)
         else:
             logging.warning(f"File {csv_filepath} tidak ditemukan, dilewati.")
+
+        # Snapshot referensi untuk endpoint statis app.py (tanpa query DB)
+        export_reference_snapshot(engine, REFERENCE_SNAPSHOT_PATH)
             
         logging.info("Semua proses migrasi data telah selesai.")
         
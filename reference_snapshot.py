@@ -0,0 +1,214 @@
+"""
+🗂️ REFERENCE SNAPSHOT
+Snapshot data referensi wilayah (hirarki, nama, label, centroid) dalam satu file biner
+yang di-mmap, agar endpoint statis (/api/provinsi-info, /api/sub-wilayah-cuaca?view=simple,
+metadata /api/data-by-ids) tidak perlu membuka koneksi database.
+
+Dibangun oleh migrate_data.py setelah migrasi (data hanya berubah saat migrasi berjalan).
+Versi snapshot adalah hash isi file, dipakai sebagai ETag.
+
+Format file (little-endian):
+    MAGIC (8 byte) | panjang header (uint32) | header JSON | record[] | blob string UTF-8
+- Record berukuran tetap (RECORD_FORMAT), diurutkan per level lalu ID, sehingga tiap level
+  adalah blok kontigu dan anak suatu wilayah (prefiks ID "<induk>.") bisa dicari dengan bisect.
+- Nama & label disimpan sekali di blob string (string yang sama berbagi offset).
+"""
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+MAGIC = b"WCSNAP01"
+# id_off, id_len, nama_off, nama_len, label_off, label_len, lat, lon, level, tipadm
+RECORD_FORMAT = struct.Struct("<IHIHIHddBb")
+LEVELS = (0, 1, 2, 3, 4)  # Negara, Provinsi, Kab/Kota, Kecamatan, Desa/Kelurahan
+NULL_TIPADM = -1
+
+# Urutan kolom: id, nama_simpel, nama_label, lat, lon, tipadm, level.
+# Label mengikuti COALESCE(wilayah_administratif.label, nama) seperti query /api/data-by-ids.
+SNAPSHOT_QUERY = """
+    SELECT "KDPPUM" as id, "WADMPR" as nama_simpel, "WADMPR" as nama_label, latitude as lat, longitude as lon, "TIPADM" as tipadm, 0 as level
+    FROM batas_negara WHERE "KDPPUM" IS NOT NULL
+    UNION ALL
+    SELECT p."KDPPUM", p."WADMPR", COALESCE(wa.label, p."WADMPR"), p.latitude, p.longitude, p."TIPADM", 1
+    FROM batas_provinsi p LEFT JOIN wilayah_administratif wa ON wa."KDPPUM" = p."KDPPUM" AND wa."TIPADM" = 1
+    WHERE p."KDPPUM" IS NOT NULL AND p."WADMPR" IS NOT NULL
+    UNION ALL
+    SELECT k."KDPKAB", k."WADMKK", COALESCE(wa.label, k."WADMKK"), k.latitude, k.longitude, k."TIPADM", 2
+    FROM batas_kabupatenkota k LEFT JOIN wilayah_administratif wa ON wa."KDPKAB" = k."KDPKAB" AND wa."TIPADM" = 2
+    WHERE k."KDPKAB" IS NOT NULL
+    UNION ALL
+    SELECT c."KDCPUM", c."WADMKC", COALESCE(wa.label, c."WADMKC"), c.latitude, c.longitude, c."TIPADM", 3
+    FROM batas_kecamatandistrik c LEFT JOIN wilayah_administratif wa ON wa."KDCPUM" = c."KDCPUM" AND wa."TIPADM" = 3
+    WHERE c."KDCPUM" IS NOT NULL
+    UNION ALL
+    SELECT "KDEPUM", "WADMKD", COALESCE(label, "WADMKD"), latitude, longitude, "TIPADM", 4
+    FROM wilayah_administratif WHERE "TIPADM" = 4 AND "KDEPUM" IS NOT NULL
+"""
+
+
+# ================== PENULIS (MIGRASI) ==================
+
+def write_snapshot(path, rows):
+    """
+    Menulis snapshot dari iterable baris (dict dengan kunci id, nama_simpel, nama_label,
+    lat, lon, tipadm, level). Duplikat (level, id) dari LEFT JOIN dibuang. Penulisan
+    atomik (file sementara lalu rename). Mengembalikan header snapshot.
+    """
+    unique = {}
+    for row in rows:
+        key = (int(row['level']), str(row['id']))
+        if key not in unique:
+            unique[key] = row
+    ordered = sorted(unique.items(), key=lambda item: (item[0][0], item[0][1].encode('utf-8')))
+
+    blob = bytearray()
+    offsets = {}
+    def intern(value):
+        encoded = (value or "").encode('utf-8')
+        if encoded not in offsets:
+            offsets[encoded] = len(blob)
+            blob.extend(encoded)
+        return offsets[encoded], len(encoded)
+
+    records = bytearray()
+    levels = {}
+    for index, ((level, wilayah_id), row) in enumerate(ordered):
+        start, _ = levels.get(level, (index, 0))
+        levels[level] = (start, index - start + 1)
+        id_off, id_len = intern(wilayah_id)
+        nama_off, nama_len = intern(row.get('nama_simpel'))
+        label_off, label_len = intern(row.get('nama_label') or row.get('nama_simpel'))
+        lat = math.nan if row.get('lat') is None else float(row['lat'])
+        lon = math.nan if row.get('lon') is None else float(row['lon'])
+        tipadm = NULL_TIPADM if row.get('tipadm') is None else int(row['tipadm'])
+        records.extend(RECORD_FORMAT.pack(id_off, id_len, nama_off, nama_len, label_off, label_len,
+                                          lat, lon, level, tipadm))
+
+    header = {
+        "version": hashlib.sha256(bytes(records) + bytes(blob)).hexdigest()[:16],
+        "created_at": int(time.time()),
+        "count": len(ordered),
+        "levels": {str(level): list(span) for level, span in sorted(levels.items())},
+        "record_size": RECORD_FORMAT.size,
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(records)
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return header
+
+
+def build_from_database(engine, path):
+    """Membangun snapshot dari tabel hasil migrasi (dipanggil migrate_data.py)."""
+    from sqlalchemy import text
+    with engine.connect() as conn:
+        rows = [dict(row) for row in conn.execute(text(SNAPSHOT_QUERY)).mappings()]
+    return write_snapshot(path, rows)
+
+
+# ================== PEMBACA (APP) ==================
+
+class ReferenceSnapshot:
+    """Pembaca snapshot berbasis mmap: hanya halaman yang disentuh lookup yang dimuat ke memori."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} bukan file snapshot referensi")
+        (header_len,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        self.header = json.loads(self._mm[header_start:header_start + header_len])
+        if self.header.get("record_size") != RECORD_FORMAT.size:
+            raise ValueError(f"Versi format snapshot {path} tidak dikenali")
+        self.version = self.header["version"]
+        self._records_start = header_start + header_len
+        self._blob_start = self._records_start + self.header["count"] * RECORD_FORMAT.size
+        self._levels = {int(level): tuple(span) for level, span in self.header["levels"].items()}
+
+    # ---------- Internal ----------
+
+    def _string(self, offset, length):
+        start = self._blob_start + offset
+        return self._mm[start:start + length].decode('utf-8')
+
+    def _id_bytes(self, index):
+        id_off, id_len = struct.unpack_from("<IH", self._mm, self._records_start + index * RECORD_FORMAT.size)
+        start = self._blob_start + id_off
+        return self._mm[start:start + id_len]
+
+    def _record(self, index):
+        (id_off, id_len, nama_off, nama_len, label_off, label_len,
+         lat, lon, level, tipadm) = RECORD_FORMAT.unpack_from(self._mm, self._records_start + index * RECORD_FORMAT.size)
+        return {
+            "id": self._string(id_off, id_len),
+            "nama_simpel": self._string(nama_off, nama_len),
+            "nama_label": self._string(label_off, label_len),
+            "lat": None if math.isnan(lat) else lat,
+            "lon": None if math.isnan(lon) else lon,
+            "tipadm": None if tipadm == NULL_TIPADM else tipadm,
+            "level": level,
+        }
+
+    def _lower_bound(self, level, key):
+        """Indeks record pertama di blok level dengan ID >= key (bisect manual di atas mmap)."""
+        start, count = self._levels.get(level, (0, 0))
+        lo, hi = start, start + count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_bytes(mid) < key: lo = mid + 1
+            else: hi = mid
+        return lo, start + count
+
+    def _level_range(self, level):
+        start, count = self._levels.get(level, (0, 0))
+        return range(start, start + count)
+
+    # ---------- Lookup ----------
+
+    def level(self, level):
+        """Semua wilayah satu level (urut ID)."""
+        return [self._record(i) for i in self._level_range(level)]
+
+    def children(self, parent_id, level):
+        """Wilayah pada `level` yang ID-nya berprefiks '<parent_id>.' (setara LIKE 'parent.%')."""
+        prefix = f"{parent_id}.".encode('utf-8')
+        index, end = self._lower_bound(level, prefix)
+        result = []
+        while index < end and self._id_bytes(index).startswith(prefix):
+            result.append(self._record(index))
+            index += 1
+        return result
+
+    def lookup(self, wilayah_ids):
+        """Metadata untuk daftar ID di semua level (setara UNION di /api/data-by-ids)."""
+        result = []
+        for wilayah_id in wilayah_ids:
+            key = str(wilayah_id).encode('utf-8')
+            for level in LEVELS:
+                index, end = self._lower_bound(level, key)
+                if index < end and self._id_bytes(index) == key:
+                    result.append(self._record(index))
+        return result
+
+    def close(self):
+        self._mm.close()
+
+
+if __name__ == "__main__":
+    # python reference_snapshot.py data/reference_snapshot.bin -> ringkasan header
+    snapshot = ReferenceSnapshot(sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "reference_snapshot.bin"))
+    print(json.dumps(snapshot.header, indent=2))
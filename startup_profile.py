@@ -0,0 +1,88 @@
+"""
+⏱️ STARTUP PROFILE
+Pencatat biaya cold start: waktu import per modul dan inisialisasi (engine DB, Redis, snapshot).
+
+- Langkah inisialisasi (step) selalu dicatat karena murah; ringkasannya tampil di /api/monitoring-stats.
+- Mode profil (STARTUP_PROFILE=true) juga mengukur setiap import yang dilakukan app.py, baik saat
+  import modul maupun import lazy di dalam fungsi, lalu mencetak laporan per modul:
+      STARTUP_PROFILE=true python -c "import app"
+      STARTUP_PROFILE=true flask --app app run
+"""
+import builtins
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+ENABLED = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+
+_process_start = time.perf_counter()
+_ready_at = None
+_steps = []  # (nama, detik, fase)
+_lock = threading.Lock()
+_tracked_modules = set()
+_original_import = builtins.__import__
+
+
+def _record(name, seconds):
+    phase = "startup" if _ready_at is None else "lazy"
+    with _lock:
+        _steps.append((name, seconds, phase))
+    if ENABLED and phase == "lazy":
+        print(f"⏱️ STARTUP PROFILE (lazy): {name} {seconds * 1000:.1f} ms")
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    caller = (globals or {}).get("__name__")
+    if caller not in _tracked_modules or level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _record(f"import {name}", time.perf_counter() - start)
+
+
+def begin(module_name):
+    """Dipanggil di baris awal modul yang diprofil; memasang timer import jika mode profil aktif."""
+    global _process_start
+    _process_start = time.perf_counter()
+    _tracked_modules.add(module_name)
+    if ENABLED and builtins.__import__ is not _timed_import:
+        builtins.__import__ = _timed_import
+
+
+@contextmanager
+def step(name):
+    """Mengukur satu langkah inisialisasi (mis. 'init db-engine')."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def mark_ready():
+    """Menandai akhir import modul; mencetak laporan jika mode profil aktif."""
+    global _ready_at
+    _ready_at = time.perf_counter()
+    if ENABLED:
+        print_report()
+
+
+def summary():
+    """Ringkasan untuk monitoring: durasi import app dan biaya tiap langkah (ms)."""
+    with _lock:
+        steps = list(_steps)
+    return {
+        "import_ms": round((_ready_at - _process_start) * 1000, 1) if _ready_at else None,
+        "steps": [{"name": name, "ms": round(seconds * 1000, 2), "phase": phase} for name, seconds, phase in steps],
+    }
+
+
+def print_report():
+    data = summary()
+    print(f"⏱️ STARTUP PROFILE: import app selesai dalam {data['import_ms']} ms")
+    for item in sorted(data["steps"], key=lambda s: s["ms"], reverse=True):
+        print(f"   {item['ms']:>9.2f} ms  [{item['phase']:<7}] {item['name']}")
@@ -1,44 +1,289 @@
-/** Mengelola cache data cuaca dengan logika TTL (Time-To-Live) */
-export const cacheManager = {
-    _cache: new Map(),
-    _TTL: 1800 * 1000, // 30 Menit (1800 detik * 1000 ms), sama seperti backend
-
-    /** Mengambil data dari cache. Mengembalikan null jika tidak ada atau kedaluwarsa. */
-    get: function(id) {
-        const entry = this._cache.get(id);
-        if (!entry) {
-            return null; // Tidak ada
-        }
-        
-        // Cek apakah kedaluwarsa
-        if (Date.now() - entry.timestamp > this._TTL) {
-            console.log(`Cache expired for ${id}`);
-            this._cache.delete(id);
-            return null; // Kedaluwarsa
-        }
-        
-        // Valid
-        return entry.data;
-    },
-
-    /** Menyimpan data ke cache dengan timestamp baru. */
-    set: function(id, data) {
-        this._cache.set(id, { data: data, timestamp: Date.now() });
-    },
-    
-    /** Janitor: Membersihkan semua entri yang kedaluwarsa dari cache. */
-    cleanExpired: function() {
-        // console.log("Running cache janitor..."); // Bisa di-enable untuk debugging
-        const now = Date.now();
-        let removedCount = 0;
-        for (const [id, entry] of this._cache.entries()) {
-            if (now - entry.timestamp > this._TTL) {
-                this._cache.delete(id);
-                removedCount++;
-            }
-        }
-        if (removedCount > 0) {
-            console.log(`Cache janitor removed ${removedCount} expired entries.`);
-        }
-    }
+/** 🗄️ CACHE MANAGER
+ * Cache data cuaca dua lapis:
+ * - Memori (Map) untuk akses sinkron dari marker, popup & sidebar. Urutan sisip Map = urutan LRU
+ *   (entri yang diakses dipindah ke akhir), sehingga eviksi cukup mengambil dari awal.
+ * - IndexedDB sebagai penyimpanan persisten: dimuat saat halaman dibuka agar kunjungan berikutnya
+ *   langsung menampilkan cuaca, dan dipakai bersama semua tab (perubahan disiarkan via BroadcastChannel).
+ *
+ * Entri "segar" selama _TTL; setelah itu "stale": tetap ditampilkan sampai _MAX_STALE sambil
+ * direvalidasi ke server memakai versinya (lihat WeatherService). Total ukuran dibatasi _BUDGET_BYTES.
+ * Tanpa IndexedDB (mis. private mode) cache tetap berjalan di memori saja.
+ */
+export const cacheManager = {
+    _cache: new Map(), // id -> { id, data, version, fetchedAt, lastAccess, size }
+    _TTL: 1800 * 1000, // 30 Menit (1800 detik * 1000 ms), sama seperti backend
+    _MAX_STALE: 6 * 3600 * 1000, // 6 Jam, sama seperti CACHE_TTL_STALE backend
+    _BUDGET_BYTES: 20 * 1024 * 1024, // Perkiraan ukuran JSON seluruh entri
+    _ACCESS_PERSIST_MS: 60 * 1000, // lastAccess ke IndexedDB paling sering sekali per menit per entri
+
+    _DB_NAME: 'weather-cache',
+    _DB_VERSION: 1,
+    _STORE: 'entries',
+    _CHANNEL_NAME: 'weather-cache',
+
+    _db: null,
+    _channel: null,
+    _readyPromise: null,
+    _totalBytes: 0,
+    _pendingWrites: new Map(), // id -> record yang menunggu ditulis (sekaligus disiarkan)
+    _pendingDeletes: new Set(),
+    _flushScheduled: false,
+    _listeners: [],
+
+    // =========================================================================
+    // INISIALISASI
+    // =========================================================================
+
+    /** Membuka IndexedDB & memuat entri tersimpan. Aman dipanggil berkali-kali. */
+    ready: function() {
+        if (!this._readyPromise) {
+            this._readyPromise = this._init().catch(e => {
+                console.warn("CacheManager: IndexedDB tidak tersedia, cache hanya di memori.", e);
+            });
+        }
+        return this._readyPromise;
+    },
+
+    _init: async function() {
+        if (typeof BroadcastChannel !== 'undefined') {
+            this._channel = new BroadcastChannel(this._CHANNEL_NAME);
+            this._channel.onmessage = (event) => this._onRemoteMessage(event.data);
+        }
+        if (typeof indexedDB === 'undefined') return;
+
+        this._db = await new Promise((resolve, reject) => {
+            const request = indexedDB.open(this._DB_NAME, this._DB_VERSION);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(this._STORE, { keyPath: 'id' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+        // Tab lain meng-upgrade skema: tutup agar tidak memblokirnya
+        this._db.onversionchange = () => { this._db.close(); this._db = null; };
+
+        const records = await new Promise((resolve, reject) => {
+            const request = this._db.transaction(this._STORE, 'readonly').objectStore(this._STORE).getAll();
+            request.onsuccess = () => resolve(request.result || []);
+            request.onerror = () => reject(request.error);
+        });
+
+        const now = Date.now();
+        let loaded = 0;
+        records.sort((a, b) => a.lastAccess - b.lastAccess); // Paling lama diakses di depan (urutan LRU)
+        for (const record of records) {
+            if (now - record.fetchedAt > this._MAX_STALE) {
+                this._pendingDeletes.add(record.id);
+                continue;
+            }
+            // Entri yang sudah di-set sebelum hidrasi selesai lebih baru; jangan ditimpa
+            const existing = this._cache.get(record.id);
+            if (existing && existing.fetchedAt >= record.fetchedAt) continue;
+            this._insert(record);
+            loaded++;
+        }
+        this._evictOverBudget();
+        this._scheduleFlush();
+        console.log(`✅ CacheManager: ${loaded} entri cuaca dimuat dari IndexedDB.`);
+    },
+
+    // =========================================================================
+    // BACA
+    // =========================================================================
+
+    /** Mengambil data dari cache (segar maupun stale). Mengembalikan null jika tidak ada atau terlalu lama. */
+    get: function(id) {
+        const entry = this._cache.get(id);
+        if (!entry) {
+            return null; // Tidak ada
+        }
+
+        const now = Date.now();
+        if (now - entry.fetchedAt > this._MAX_STALE) {
+            this._remove(id);
+            return null; // Terlalu lama untuk ditampilkan
+        }
+
+        this._markAccessed(entry, now);
+        return entry.data;
+    },
+
+    /** True jika entri ada dan masih dalam TTL (tidak perlu revalidasi). */
+    isFresh: function(id) {
+        const entry = this._cache.get(id);
+        return !!entry && (Date.now() - entry.fetchedAt <= this._TTL);
+    },
+
+    /** Versi entri dari server (untuk revalidasi bersyarat), atau null. */
+    getVersion: function(id) {
+        const entry = this._cache.get(id);
+        return entry ? entry.version : null;
+    },
+
+    // =========================================================================
+    // TULIS
+    // =========================================================================
+
+    /** Menyimpan data ke cache dengan timestamp baru. */
+    set: function(id, data) {
+        const now = Date.now();
+        const record = {
+            id: id,
+            data: data,
+            version: data?.version ?? null,
+            fetchedAt: now,
+            lastAccess: now,
+            size: JSON.stringify(data).length,
+        };
+        this._insert(record);
+        this._pendingDeletes.delete(id);
+        this._pendingWrites.set(id, record);
+        this._evictOverBudget();
+        this._scheduleFlush();
+    },
+
+    /** Menyimpan banyak entri sekaligus (hasil satu batch) lalu memberi tahu pendengar. */
+    setMany: function(dataMap) {
+        const ids = Object.keys(dataMap);
+        ids.forEach(id => this.set(String(id), dataMap[id]));
+        if (ids.length > 0) this._notify(ids);
+    },
+
+    /** Server mengonfirmasi entri stale masih sama (not_modified): perpanjang kesegarannya. */
+    touch: function(id) {
+        const entry = this._cache.get(id);
+        if (!entry) return;
+        const now = Date.now();
+        entry.fetchedAt = now;
+        entry.lastAccess = now;
+        this._pendingWrites.set(id, entry);
+        this._scheduleFlush();
+    },
+
+    /** Mendaftarkan callback(ids) untuk entri yang diperbarui di latar (revalidasi atau tab lain). */
+    subscribe: function(listener) {
+        this._listeners.push(listener);
+    },
+
+    /** Janitor: Membersihkan entri yang terlalu lama & menegakkan budget ukuran. */
+    cleanExpired: function() {
+        const now = Date.now();
+        let removedCount = 0;
+        for (const [id, entry] of this._cache.entries()) {
+            if (now - entry.fetchedAt > this._MAX_STALE) {
+                this._remove(id);
+                removedCount++;
+            }
+        }
+        removedCount += this._evictOverBudget();
+        if (removedCount > 0) {
+            console.log(`Cache janitor removed ${removedCount} expired entries.`);
+        }
+    },
+
+    // =========================================================================
+    // INTERNAL
+    // =========================================================================
+
+    _insert: function(record) {
+        const previous = this._cache.get(record.id);
+        if (previous) {
+            this._totalBytes -= previous.size;
+            this._cache.delete(record.id); // Sisip ulang -> pindah ke akhir urutan LRU
+        }
+        this._cache.set(record.id, record);
+        this._totalBytes += record.size;
+    },
+
+    _remove: function(id) {
+        const entry = this._cache.get(id);
+        if (!entry) return;
+        this._totalBytes -= entry.size;
+        this._cache.delete(id);
+        this._pendingWrites.delete(id);
+        this._pendingDeletes.add(id);
+        this._scheduleFlush();
+    },
+
+    _markAccessed: function(entry, now) {
+        // Pindah ke akhir urutan LRU; dibatasi agar render per frame tidak terus mengocok Map
+        if (now - entry.lastAccess < 1000) return;
+        const persist = now - entry.lastAccess > this._ACCESS_PERSIST_MS;
+        entry.lastAccess = now;
+        this._cache.delete(entry.id);
+        this._cache.set(entry.id, entry);
+        if (persist && this._db && !this._pendingWrites.has(entry.id)) {
+            this._pendingWrites.set(entry.id, entry);
+            this._scheduleFlush();
+        }
+    },
+
+    /** Eviksi LRU sampai total ukuran di bawah budget. Mengembalikan jumlah entri yang dibuang. */
+    _evictOverBudget: function() {
+        let evicted = 0;
+        for (const id of this._cache.keys()) {
+            if (this._totalBytes <= this._BUDGET_BYTES || this._cache.size <= 1) break;
+            this._remove(id);
+            evicted++;
+        }
+        return evicted;
+    },
+
+    _scheduleFlush: function() {
+        if (this._flushScheduled) return;
+        this._flushScheduled = true;
+        const run = () => { this._flushScheduled = false; this._flush(); };
+        if (typeof requestIdleCallback === 'function') requestIdleCallback(run, { timeout: 1000 });
+        else setTimeout(run, 200);
+    },
+
+    /** Menulis semua perubahan tertunda dalam satu transaksi, lalu menyiarkannya ke tab lain. */
+    _flush: function() {
+        const writes = [...this._pendingWrites.values()];
+        const deletes = [...this._pendingDeletes];
+        this._pendingWrites.clear();
+        this._pendingDeletes.clear();
+        if (writes.length === 0 && deletes.length === 0) return;
+
+        if (this._db) {
+            try {
+                const tx = this._db.transaction(this._STORE, 'readwrite');
+                const store = tx.objectStore(this._STORE);
+                writes.forEach(record => store.put(record));
+                deletes.forEach(id => store.delete(id));
+                tx.onerror = () => console.warn("CacheManager: gagal menulis IndexedDB.", tx.error);
+            } catch (e) {
+                console.warn("CacheManager: gagal menulis IndexedDB.", e);
+            }
+        }
+        if (this._channel && writes.length > 0) {
+            this._channel.postMessage({ type: 'set', records: writes });
+        }
+    },
+
+    /** Entri dari tab lain (sudah ditulis ke IndexedDB oleh tab pengirim): cukup masukkan ke memori. */
+    _onRemoteMessage: function(message) {
+        if (!message || message.type !== 'set') return;
+        const updated = [];
+        for (const record of message.records) {
+            const existing = this._cache.get(record.id);
+            if (existing && existing.fetchedAt >= record.fetchedAt) continue;
+            this._insert(record);
+            updated.push(record.id);
+        }
+        if (updated.length === 0) return;
+        // Eviksi karena pesan tab lain tidak dihapus dari IndexedDB milik bersama
+        for (const id of this._cache.keys()) {
+            if (this._totalBytes <= this._BUDGET_BYTES || this._cache.size <= 1) break;
+            this._totalBytes -= this._cache.get(id).size;
+            this._cache.delete(id);
+        }
+        this._notify(updated);
+    },
+
+    _notify: function(ids) {
+        this._listeners.forEach(listener => {
+            try { listener(ids); } catch (e) { console.error("CacheManager listener error:", e); }
+        });
+    }
 };
\ No newline at end of file
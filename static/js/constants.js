@@ -30,7 +30,15 @@ export const MAP_LAYERS = {
     NEGARA_LINE: 'batas-negara-layer',     // [BARU]
     PROVINSI_LINE: 'batas-provinsi-layer',
     KABUPATEN_LINE: 'batas-kabupaten-layer',
-    KECAMATAN_LINE: 'batas-kecamatan-layer'
+    KECAMATAN_LINE: 'batas-kecamatan-layer',
+
+    // Layer Marker Cuaca GPU (MARKER_RENDER_MODE = 'gl')
+    CLUSTER_BACKGROUND: 'cluster-background-layer',
+    CLUSTER_COUNT: 'cluster-count-layer',
+    WEATHER_POINT: 'weather-point-layer',
+    WEATHER_TEMP: 'weather-temp-layer',
+    WEATHER_NAME: 'weather-name-layer',
+    WEATHER_HIT: 'unclustered-point-hit-target'
 };
 
 export const MAP_SOURCES = {
@@ -39,7 +47,8 @@ export const MAP_SOURCES = {
     SOURCE_NEGARA: 'source_negara',        // [BARU]
     SOURCE_PROVINSI: 'source_provinsi',
     SOURCE_KABUPATEN: 'source_kabupaten',
-    SOURCE_KECAMATAN: 'source_kecamatan'
+    SOURCE_KECAMATAN: 'source_kecamatan',
+    DATA_CUACA: 'data-cuaca-source' // GeoJSON ber-cluster untuk marker GPU
 };
 
 export const MAP_KEYS = {
@@ -11,6 +11,7 @@ import { ResetPitchControl } from './reset_pitch_ctrl.js';
 import { calendarManager } from './calender_manager.js';
 import { searchBarManager } from './searchbar.js';
 import { legendManager } from './legend_manager.js';
+import { cacheManager } from './cache_manager.js';
 // [BARU] Import service Vercel
 import { initVercelServices } from './vercel_services.js';
 
@@ -36,6 +37,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Panggil sedini mungkin saat DOM Ready
     initVercelServices();
 
+    // Muat cache cuaca persisten (IndexedDB) sedini mungkin, paralel dengan pemuatan peta
+    cacheManager.ready();
+
     // [BARU] Inisialisasi Protokol PMTiles sebelum Map dimuat
     if (window.pmtiles) {
         let protocol = new pmtiles.Protocol();
@@ -509,7 +513,8 @@ document.addEventListener('DOMContentLoaded', function() {
         map.addControl(new maplibregl.ScaleControl());
         
         map.on('data', (e) => {
-            if (e.sourceId === 'data-cuaca-source' && e.isSourceLoaded) {
+            // Mode GPU mengisi source ini sendiri (setData per frame); fetch dipicu dari moveend
+            if (e.sourceId === 'data-cuaca-source' && e.isSourceLoaded && !mapManager.isGlMarkerMode()) {
                 mapManager.fetchDataForVisibleMarkers(); 
             }
         });
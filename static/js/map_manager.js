@@ -3,6 +3,7 @@ import { utils } from "./utilities.js";
 import { popupManager } from "./popup_manager.js";
 import { timeManager } from "./time_manager.js";
 import { MarkerRenderer } from "./marker_renderer.js";
+import { MarkerLayer } from "./marker_layer.js";
 import { GempaManager } from "./gempa_manager.js";
 import { MapInteraction } from "./map_interaction.js";
 import { WeatherService } from "./weather_service.js";
@@ -32,6 +33,11 @@ export const mapManager = {
 
     _isClickLoading: false,
 
+    // MARKER_RENDER_MODE 'gl': marker dirender MarkerLayer (WebGL), bukan elemen DOM MarkerRenderer
+    _useGlMarkers: false,
+    _glFetchDeferred: false,
+    _glCollectRequested: false,
+
     setSidebarManager: function(managerInstance) {
         this._sidebarManager = managerInstance;
         console.log("MapManager: SidebarManager berhasil disuntikkan.");
@@ -54,9 +60,30 @@ export const mapManager = {
             isGempaMode: () => { return this._isGempaLayerActive; }
         });
 
-        mapInstance.on('move', () => { this.renderMarkers(); });
-        mapInstance.on('zoom', () => { this.renderMarkers(); });
-        mapInstance.on('pitch', () => { this.renderMarkers(); });
+        this._useGlMarkers = (window.APP_CONFIG && window.APP_CONFIG.MARKER_RENDER_MODE === 'gl');
+        if (this._useGlMarkers) {
+            // Titik ikut bergerak di GPU: tidak perlu render ulang per event move/zoom/pitch
+            MarkerLayer.init(mapInstance, {
+                onHover: (id, tip) => { 
+                    this._isHoveringMarker = true; 
+                    MapInteraction.highlightPolygon(id, tip); 
+                },
+                onLeave: () => { 
+                    this._isHoveringMarker = false; 
+                    MapInteraction.clearHoverState(); 
+                }
+            });
+        } else {
+            mapInstance.on('move', () => { this.renderMarkers(); });
+            mapInstance.on('zoom', () => { this.renderMarkers(); });
+            mapInstance.on('pitch', () => { this.renderMarkers(); });
+        }
+
+        // Entri yang diperbarui di latar (revalidasi cache / tab lain) langsung tampil di marker
+        cacheManager.subscribe((ids) => {
+            ids.forEach(id => { if (this._markers[id]) this._updateMarkerContent(id); });
+            if (this._useGlMarkers) MarkerLayer.scheduleUpdate();
+        });
 
         mapInstance.on('moveend', () => { 
             this._isInteracting = false; 
@@ -88,6 +115,7 @@ export const mapManager = {
     getActiveLocationSimpleName: function() { return this._activeLocationSimpleName; }, 
     getActiveLocationLabel: function() { return this._activeLocationLabel; }, 
     getActiveLocationData: function() { return this._activeLocationData; },
+    isGlMarkerMode: function() { return this._useGlMarkers; },
     
     triggerFetchData: function() {
         if (this._fetchDebounceTimer) clearTimeout(this._fetchDebounceTimer);
@@ -113,7 +141,16 @@ export const mapManager = {
         
         const renderedIds = Object.keys(this._markers);
         
-        const potentialIds = renderedIds.filter(id => {
+        if (this._useGlMarkers && MarkerLayer.isPending()) {
+            // Titik baru belum tergambar: query setelah map idle agar hasilnya lengkap
+            if (!this._glFetchDeferred) {
+                this._glFetchDeferred = true;
+                map.once('idle', () => { this._glFetchDeferred = false; this.triggerFetchData(); });
+            }
+            return;
+        }
+
+        const potentialIds = this._useGlMarkers ? MarkerLayer.getVisibleWeatherIds() : renderedIds.filter(id => {
             if (id.startsWith('cl-')) return false; 
             const marker = this._markers[id];
             // [PENTING] Filter ini sekarang mencakup Negara & Provinsi
@@ -166,7 +203,7 @@ export const mapManager = {
         }
         
         let coords = [data.longitude, data.latitude];
-        if(this._markers[data.id]) coords = this._markers[data.id].getLngLat().toArray();
+        coords = this._getMarkerLngLat(data.id) || coords;
         this._renderRichPopup(data, coords);
     },
 
@@ -184,8 +221,8 @@ export const mapManager = {
         
         let coordinates = [parseFloat(props.lon), parseFloat(props.lat)];
         // Fallback ke posisi marker jika koordinat dari props tidak valid
-        if ((!coordinates[0] || isNaN(coordinates[0])) && this._markers[id]) { 
-            coordinates = this._markers[id].getLngLat().toArray(); 
+        if ((!coordinates[0] || isNaN(coordinates[0])) && this._getMarkerLngLat(id)) { 
+            coordinates = this._getMarkerLngLat(id); 
         }
         if (!coordinates || coordinates.length < 2 || isNaN(coordinates[0]) || isNaN(coordinates[1])) {
             console.warn("Koordinat tidak valid untuk marker ini.");
@@ -239,6 +276,7 @@ export const mapManager = {
             }
             
             popupManager.open(coordinates, popupContent);
+            this._loadRollupWeather(props, coordinates);
             return;
         }
 
@@ -255,6 +293,21 @@ export const mapManager = {
         }
     },
 
+    // Rollup cuaca Negara/Provinsi (agregat Kab/Kota dari server, tanpa panggilan upstream).
+    // Popup info sederhana tetap tampil sampai rollup tersedia.
+    _loadRollupWeather: async function(props, coordinates) {
+        const { id, tipadm } = props;
+        try {
+            const data = await WeatherService.fetchSingle(id);
+            if (!data?.hourly?.time?.length || String(this._activeLocationId) !== String(id)) return;
+            this._activeLocationData = { ...this._activeLocationData, ...data, tipadm: tipadm };
+            if (this._sidebarManager && this._sidebarManager.isOpen()) this._sidebarManager.renderSidebarContent();
+            this._renderRichPopup(this._activeLocationData, coordinates);
+        } catch (e) {
+            console.warn(`Rollup cuaca ${id} tidak tersedia:`, e);
+        }
+    },
+
     _handleCacheMiss: async function(props, coordinates) {
         const { id, nama_simpel, tipadm } = props;
         
@@ -312,6 +365,7 @@ export const mapManager = {
             const marker = this._markers[id];
             MarkerRenderer.updateVisualStateOnly(marker, isActive);
         }
+        if (this._useGlMarkers) MarkerLayer.setDimmed(isActive);
 
         if (isActive) {
             await this._loadGempaData();
@@ -411,8 +465,8 @@ export const mapManager = {
         if (!data || !this._map) return;
         
         let coords = [data.longitude, data.latitude];
-        if ((!coords[0] || !coords[1]) && this._markers[data.id]) {
-            coords = this._markers[data.id].getLngLat().toArray();
+        if ((!coords[0] || !coords[1]) && this._getMarkerLngLat(data.id)) {
+            coords = this._getMarkerLngLat(data.id);
         }
         if (!coords[0] || !coords[1]) return;
 
@@ -488,35 +542,21 @@ export const mapManager = {
     // RENDER SYSTEM
     // =========================================================================
 
-    renderMarkers: function() {
-        const map = this.getMap();
-        if (!map) return;
-
-        const zoom = map.getZoom();
-        let targetLayer = '';
-        let idKey = '';
-        let nameKey = '';
-        let tipadmVal = 0;
-
-        // [UPDATE] Logika Zoom untuk Negara (0-4.99)
-        // Layer ID dan Keys menggunakan Constants
-        if (zoom <= 4.99) { 
-            targetLayer = MAP_LAYERS.NEGARA_LINE; 
-            idKey = MAP_KEYS.ID_NEGARA; 
-            nameKey = MAP_KEYS.NAME_NEGARA; 
-            tipadmVal = 0; 
-        } 
-        else if (zoom <= 7.99) { targetLayer = MAP_LAYERS.PROVINSI_LINE; idKey = MAP_KEYS.ID_PROV; nameKey = MAP_KEYS.NAME_PROV; tipadmVal = 1; } 
-        else if (zoom <= 10.99) { targetLayer = MAP_LAYERS.KABUPATEN_LINE; idKey = MAP_KEYS.ID_KAB; nameKey = MAP_KEYS.NAME_KAB; tipadmVal = 2; } 
-        else if (zoom <= 14) { targetLayer = MAP_LAYERS.KECAMATAN_LINE; idKey = MAP_KEYS.ID_KEC; nameKey = MAP_KEYS.NAME_KEC; tipadmVal = 3; } 
-        else { this._clearMarkers(new Set()); return; }
-        
-        if (!map.getLayer(targetLayer)) return;
+    // [UPDATE] Logika Zoom untuk Negara (0-4.99)
+    // Layer ID dan Keys menggunakan Constants. null = zoom terlalu dekat, marker disembunyikan.
+    _getMarkerLevel: function(zoom) {
+        if (zoom <= 4.99) return { targetLayer: MAP_LAYERS.NEGARA_LINE, idKey: MAP_KEYS.ID_NEGARA, nameKey: MAP_KEYS.NAME_NEGARA, tipadmVal: 0 };
+        if (zoom <= 7.99) return { targetLayer: MAP_LAYERS.PROVINSI_LINE, idKey: MAP_KEYS.ID_PROV, nameKey: MAP_KEYS.NAME_PROV, tipadmVal: 1 };
+        if (zoom <= 10.99) return { targetLayer: MAP_LAYERS.KABUPATEN_LINE, idKey: MAP_KEYS.ID_KAB, nameKey: MAP_KEYS.NAME_KAB, tipadmVal: 2 };
+        if (zoom <= 14) return { targetLayer: MAP_LAYERS.KECAMATAN_LINE, idKey: MAP_KEYS.ID_KEC, nameKey: MAP_KEYS.NAME_KEC, tipadmVal: 3 };
+        return null;
+    },
 
-        // Query fitur yang dirender
+    // Titik (centroid) wilayah level aktif dari fitur vector tile yang sedang dirender
+    _queryLevelPoints: function(map, level, bounds) {
+        const { targetLayer, idKey, nameKey, tipadmVal } = level;
         const features = map.queryRenderedFeatures({ layers: [targetLayer] });
-        const bounds = map.getBounds();
-        const validPoints = [];
+        const points = [];
         const processedIds = new Set();
 
         features.forEach(feature => {
@@ -527,11 +567,10 @@ export const mapManager = {
 
             if (!id || isNaN(lat) || isNaN(lon) || processedIds.has(id)) return;
             // Pastikan titik berada dalam viewport
-            if (!bounds.contains([lon, lat])) return; 
+            if (bounds && !bounds.contains([lon, lat])) return; 
 
             processedIds.add(id);
-            validPoints.push({
-                screenPoint: map.project([lon, lat]),
+            points.push({
                 lngLat: [lon, lat],
                 id: id, 
                 props: props, 
@@ -540,6 +579,37 @@ export const mapManager = {
                 label: props.label || props[nameKey]
             });
         });
+        return points;
+    },
+
+    _getMarkerLngLat: function(id) {
+        if (this._markers[id]) return this._markers[id].getLngLat().toArray();
+        return this._useGlMarkers ? MarkerLayer.getLngLat(id) : null;
+    },
+
+    renderMarkers: function() {
+        const map = this.getMap();
+        if (!map) return;
+
+        if (this._useGlMarkers) {
+            // Mode GPU: cukup kumpulkan titik baru, paling banyak sekali per frame (sourcedata/idle bisa beruntun)
+            if (this._glCollectRequested) return;
+            this._glCollectRequested = true;
+            requestAnimationFrame(() => {
+                this._glCollectRequested = false;
+                this._collectGlPoints();
+            });
+            return;
+        }
+
+        const level = this._getMarkerLevel(map.getZoom());
+        if (!level) { this._clearMarkers(new Set()); return; }
+        
+        if (!map.getLayer(level.targetLayer)) return;
+
+        // Query fitur yang dirender
+        const validPoints = this._queryLevelPoints(map, level, map.getBounds());
+        validPoints.forEach(point => { point.screenPoint = map.project(point.lngLat); });
 
         // Logika Clustering (Client-side)
         const clusters = []; 
@@ -649,6 +719,20 @@ export const mapManager = {
         this._clearMarkers(activeMarkerIds);
     },
 
+    _collectGlPoints: function() {
+        const map = this.getMap();
+        if (!map) return;
+
+        const level = this._getMarkerLevel(map.getZoom());
+        if (!level) { MarkerLayer.clear(); return; }
+        if (!map.getLayer(level.targetLayer)) return;
+
+        // Tanpa filter bounds: wilayah yang poligonnya terlihat sebagian ikut dimuat walau centroidnya
+        // di luar viewport, agar pan tidak memperlihatkan area kosong
+        const hasNewPoints = MarkerLayer.setPoints(this._queryLevelPoints(map, level, null), level.tipadmVal);
+        if (hasNewPoints) this.triggerFetchData();
+    },
+
     _clearMarkers: function(activeIds) {
         for (const id in this._markers) {
             if (!activeIds.has(id)) {
@@ -659,16 +743,32 @@ export const mapManager = {
     },
 
     _updateMarkerContent: function(id) {
+        if (this._useGlMarkers) { MarkerLayer.scheduleUpdate(); return; }
         const markerInstance = this._markers[id];
         MarkerRenderer.updateMarkerContent(markerInstance, id, this._isGempaLayerActive);
     },
     
     updateAllMarkersForTime: function() {
+        if (this._useGlMarkers) { MarkerLayer.scheduleUpdate(); return; }
         for (const id in this._markers) { 
             if (!id.startsWith('cl-')) this._updateMarkerContent(id); 
         }
     },
 
+    // Klik cluster GPU (layer cluster-background-layer, lihat main.js): ambil anggota dari source
+    // lalu pakai popup daftar yang sama dengan cluster DOM
+    handleClusterClick: async function(feature, coordinates) {
+        if (this._isGempaLayerActive || !this._useGlMarkers) return;
+        const { cluster_id, point_count } = feature.properties;
+        try {
+            const members = await MarkerLayer.getClusterMembers(cluster_id);
+            const clusterData = { properties: { cluster_id: cluster_id, point_count: point_count }, _directMembers: members };
+            this.handleClientClusterClick(clusterData, coordinates);
+        } catch (e) {
+            console.error("MapManager: Gagal membaca anggota cluster.", e);
+        }
+    },
+
     handleClientClusterClick: async function(clusterData, coordinates) {
         const members = clusterData._directMembers; 
         if (!members) return;
@@ -763,6 +863,7 @@ export const mapManager = {
     },
 
     _applyHighlightStyle: function(id, isActive) {
+        if (this._useGlMarkers) { MarkerLayer.setActive(id, isActive); return; }
         if (this._markers[id]) {
             const capsule = this._markers[id].getElement().querySelector(`.marker-capsule`); 
             if(capsule) {
@@ -853,9 +954,9 @@ export const mapManager = {
     },
 
     _renderRichPopup: function(data, coordinates) {
-        // [UPDATE] Jika Negara/Provinsi, buka popup info simple
+        // [UPDATE] Jika Negara/Provinsi tanpa rollup cuaca, buka popup info simple
         const tipadm = parseInt(data.tipadm, 10);
-        if (tipadm <= 1) {
+        if (tipadm <= 1 && !data.hourly?.time?.length) {
              // [PERBAIKAN] Bedakan Negara vs Provinsi
              let content;
              if (tipadm === 0) {
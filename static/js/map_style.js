@@ -191,9 +191,30 @@ export const getMapStyle = () => {
                 layout: { 'text-field': '{point_count_abbreviated}', 'text-font': ['Noto Sans Regular'], 'text-size': 13, 'text-offset': [0, 0] }, 
                 paint: { 'text-color': '#ffffff', 'text-halo-color': 'rgba(0,0,0,0.2)', 'text-halo-width': 1 } 
             },
+            // Marker cuaca GPU: properti 'color', 'temp_text' & 'nama_simpel' diisi MarkerLayer per frame
+            { 
+                id: 'weather-point-layer', type: 'circle', source: 'data-cuaca-source', filter: ['!', ['has', 'point_count']], 
+                paint: { 
+                    'circle-radius': ['case', ['boolean', ['feature-state', 'active'], false], 17, 14], 
+                    'circle-color': ['get', 'color'], 
+                    'circle-stroke-width': ['case', ['boolean', ['feature-state', 'active'], false], 3, 2], 
+                    'circle-stroke-color': ['case', ['boolean', ['feature-state', 'active'], false], '#e74c3c', '#ffffff'], 
+                    'circle-opacity': ['case', ['==', ['get', 'state'], 'loading'], 0.6, 0.95] 
+                } 
+            },
+            { 
+                id: 'weather-temp-layer', type: 'symbol', source: 'data-cuaca-source', filter: ['!', ['has', 'point_count']], 
+                layout: { 'text-field': ['get', 'temp_text'], 'text-font': ['Noto Sans Regular'], 'text-size': 11, 'text-allow-overlap': true, 'text-ignore-placement': true }, 
+                paint: { 'text-color': '#ffffff' } 
+            },
+            { 
+                id: 'weather-name-layer', type: 'symbol', source: 'data-cuaca-source', filter: ['!', ['has', 'point_count']], 
+                layout: { 'text-field': ['get', 'nama_simpel'], 'text-font': ['Noto Sans Regular'], 'text-size': 11, 'text-offset': [0, 1.7], 'text-anchor': 'top', 'text-optional': true }, 
+                paint: { 'text-color': '#263238', 'text-halo-color': '#ffffff', 'text-halo-width': 1.5 } 
+            },
             { 
                 id: 'unclustered-point-hit-target', type: 'circle', source: 'data-cuaca-source', filter: ['!', ['has', 'point_count']], 
-                paint: { 'circle-color': '#ff0000', 'circle-radius': 6, 'circle-opacity': 0, 'circle-stroke-width': 0 } 
+                paint: { 'circle-color': '#ff0000', 'circle-radius': 16, 'circle-opacity': 0, 'circle-stroke-width': 0 } 
             }
         ]
     };
@@ -0,0 +1,198 @@
+import { utils } from "./utilities.js";
+import { timeManager } from "./time_manager.js";
+import { cacheManager } from "./cache_manager.js";
+import { MAP_LAYERS, MAP_SOURCES } from "./constants.js";
+
+// Warna titik per tema cuaca (warna awal gradien .marker-theme-* di global.css)
+const THEME_COLORS = {
+    'marker-theme-sunny': '#FFA000',
+    'marker-theme-cloudy': '#78909C',
+    'marker-theme-rain': '#1E88E5',
+    'marker-theme-storm': '#37474F',
+    'marker-theme-night': '#2c3e50'
+};
+const REGION_COLOR = '#455A64';   // Negara & Provinsi (sama dengan .marker-theme-province)
+const LOADING_COLOR = '#9E9E9E';  // Skeleton: cuaca belum ada di cache
+
+/** 🖌️ MARKER LAYER (GPU)
+ * Alternatif MarkerRenderer untuk MARKER_RENDER_MODE = 'gl'.
+ * Titik cuaca dimasukkan ke GeoJSON source ber-cluster (data-cuaca-source) dan digambar
+ * MapLibre (WebGL) lewat layer circle/symbol di map_style.js, bukan satu elemen DOM per marker.
+ * Pan/zoom tidak memicu kerja JS sama sekali; source hanya diganti saat titik atau cuaca
+ * berubah, paling banyak sekali per animation frame.
+ */
+export const MarkerLayer = {
+    _map: null,
+    _points: new Map(), // id -> { id, lngLat, name, label, tipadm } untuk level yang sedang tampil
+    _tipadm: null,
+    _activeId: null,
+    _frameRequested: false,
+    _undimmedPaint: {}, // Nilai opacity asli dari map_style.js, dipulihkan saat mode gempa selesai
+
+    init: function(mapInstance, handlers) {
+        this._map = mapInstance;
+        // Hover titik menyorot poligon wilayahnya, sama seperti marker DOM
+        mapInstance.on('mouseenter', MAP_LAYERS.WEATHER_HIT, (e) => {
+            const feature = e.features && e.features[0];
+            if (feature && handlers.onHover) handlers.onHover(String(feature.id), feature.properties.tipadm);
+        });
+        mapInstance.on('mouseleave', MAP_LAYERS.WEATHER_HIT, () => {
+            if (handlers.onLeave) handlers.onLeave();
+        });
+        console.log("MarkerLayer: Marker cuaca dirender GPU (GeoJSON cluster).");
+    },
+
+    /**
+     * Menambahkan titik hasil query viewport. Titik level yang sama diakumulasi agar area yang
+     * sudah dikunjungi tidak kosong saat digeser kembali; pergantian level mengosongkan set.
+     * Mengembalikan true jika ada titik baru.
+     */
+    setPoints: function(points, tipadm) {
+        if (tipadm !== this._tipadm) {
+            this._points.clear();
+            this._tipadm = tipadm;
+        }
+        let changed = false;
+        points.forEach(point => {
+            if (this._points.has(point.id)) return;
+            this._points.set(point.id, point);
+            changed = true;
+        });
+        if (changed) this.scheduleUpdate();
+        return changed;
+    },
+
+    clear: function() {
+        if (this._points.size === 0) return;
+        this._points.clear();
+        this._tipadm = null;
+        this.scheduleUpdate();
+    },
+
+    /** Menjadwalkan penggantian data source pada frame berikutnya (beberapa pemanggilan = satu setData). */
+    scheduleUpdate: function() {
+        if (this._frameRequested) return;
+        this._frameRequested = true;
+        requestAnimationFrame(() => {
+            this._frameRequested = false;
+            this._flush();
+        });
+    },
+
+    _flush: function() {
+        const source = this._map && this._map.getSource(MAP_SOURCES.DATA_CUACA);
+        if (!source) return;
+
+        const idx = timeManager.getSelectedTimeIndex();
+        const features = [];
+        for (const point of this._points.values()) {
+            features.push({
+                type: 'Feature',
+                geometry: { type: 'Point', coordinates: point.lngLat },
+                properties: {
+                    id: point.id,
+                    nama_simpel: point.name,
+                    nama_label: point.label,
+                    tipadm: point.tipadm,
+                    ...this._weatherProperties(point, idx)
+                }
+            });
+        }
+        source.setData({ type: 'FeatureCollection', features: features });
+
+        // setData mengganti feature: pasang ulang state sorotan
+        if (this._activeId && this._points.has(this._activeId)) {
+            this._map.setFeatureState({ source: MAP_SOURCES.DATA_CUACA, id: this._activeId }, { active: true });
+        }
+    },
+
+    _weatherProperties: function(point, idx) {
+        if (point.tipadm <= 1) return { state: 'region', color: REGION_COLOR, temp_text: '' };
+
+        const data = cacheManager.get(point.id);
+        const hourly = data?.hourly;
+        if (!hourly?.time || idx < 0 || idx >= hourly.time.length) {
+            return { state: 'loading', color: LOADING_COLOR, temp_text: '' };
+        }
+
+        const code = hourly.weather_code?.[idx];
+        const isDay = hourly.is_day?.[idx];
+        const temp = hourly.temperature_2m?.[idx];
+        return {
+            state: 'ready',
+            color: THEME_COLORS[utils.getWeatherTheme(code, isDay)] || THEME_COLORS['marker-theme-cloudy'],
+            temp_text: (temp === null || temp === undefined) ? '' : `${Math.round(temp)}°`
+        };
+    },
+
+    // =========================================================================
+    // QUERY & STATE
+    // =========================================================================
+
+    /**
+     * ID titik cuaca (bukan Negara/Provinsi) yang tergambar sebagai titik tunggal di viewport.
+     * Anggota cluster tidak ikut: cuacanya belum terlihat sampai cluster pecah, jadi belum perlu di-fetch.
+     */
+    getVisibleWeatherIds: function() {
+        if (!this._map.getLayer(MAP_LAYERS.WEATHER_POINT)) return [];
+        const ids = new Set(); // Titik di perbatasan tile bisa muncul lebih dari sekali
+        this._map.queryRenderedFeatures({ layers: [MAP_LAYERS.WEATHER_POINT] }).forEach(feature => {
+            if (feature.properties.tipadm <= 1) return;
+            ids.add(String(feature.id ?? feature.properties.id));
+        });
+        return [...ids];
+    },
+
+    /** True selama titik terbaru belum tergambar (setData menunggu frame atau cluster masih dihitung). */
+    isPending: function() {
+        return this._frameRequested || !this._map.isSourceLoaded(MAP_SOURCES.DATA_CUACA);
+    },
+
+    getLngLat: function(id) {
+        const point = this._points.get(String(id));
+        return point ? point.lngLat : null;
+    },
+
+    /** Anggota cluster dalam format _directMembers yang dipakai handleClientClusterClick. */
+    getClusterMembers: async function(clusterId, limit = 100) {
+        const source = this._map.getSource(MAP_SOURCES.DATA_CUACA);
+        const leaves = await source.getClusterLeaves(clusterId, limit, 0);
+        return leaves.map(leaf => ({
+            id: String(leaf.properties.id),
+            name: leaf.properties.nama_simpel,
+            label: leaf.properties.nama_label,
+            tipadm: leaf.properties.tipadm,
+            lngLat: leaf.geometry.coordinates
+        }));
+    },
+
+    setActive: function(id, isActive) {
+        const safeId = String(id);
+        if (isActive) this._activeId = safeId;
+        else if (this._activeId === safeId) this._activeId = null;
+        if (this._points.has(safeId)) {
+            this._map.setFeatureState({ source: MAP_SOURCES.DATA_CUACA, id: safeId }, { active: isActive });
+        }
+    },
+
+    /** Mode gempa: redupkan marker cuaca lewat paint property (tanpa menyentuh data). */
+    setDimmed: function(isDimmed) {
+        const targets = [
+            [MAP_LAYERS.WEATHER_POINT, 'circle-opacity'],
+            [MAP_LAYERS.CLUSTER_BACKGROUND, 'circle-opacity'],
+            [MAP_LAYERS.WEATHER_TEMP, 'text-opacity'],
+            [MAP_LAYERS.WEATHER_NAME, 'text-opacity'],
+            [MAP_LAYERS.CLUSTER_COUNT, 'text-opacity']
+        ];
+        targets.forEach(([layer, property]) => {
+            if (!this._map.getLayer(layer)) return;
+            const key = `${layer}:${property}`;
+            if (!(key in this._undimmedPaint)) this._undimmedPaint[key] = this._map.getPaintProperty(layer, property) ?? 1;
+            this._map.setPaintProperty(layer, property, isDimmed ? 0.25 : this._undimmedPaint[key]);
+        });
+        // Seperti .marker-dimmed (pointer-events: none): titik tidak bisa diklik selama mode gempa
+        if (this._map.getLayer(MAP_LAYERS.WEATHER_HIT)) {
+            this._map.setLayoutProperty(MAP_LAYERS.WEATHER_HIT, 'visibility', isDimmed ? 'none' : 'visible');
+        }
+    }
+};
\ No newline at end of file
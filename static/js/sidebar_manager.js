@@ -2,12 +2,14 @@ import { utils } from "./utilities.js";
 import { popupManager } from "./popup_manager.js";
 import { timeManager } from "./time_manager.js";
 import { cacheManager } from "./cache_manager.js"; 
+import { WeatherService } from "./weather_service.js";
 
 /** ➡️ SIDEBAR MANAGER: Mengelola logika buka/tutup dan render sidebar */
 export const sidebarManager = { 
     _isSidebarOpen: false,
     _subRegionData: null, 
     _observer: null, 
+    _subRegionStream: null, // AbortController stream NDJSON sub-wilayah yang sedang berjalan
 
     // [DI] Variabel penampung untuk Map Manager
     _mapManager: null,
@@ -43,7 +45,8 @@ export const sidebarManager = {
                     const target = entry.target;
                     const id = target.dataset.id;
                     // [UPDATE] Cek jika dataset.skiploading ada (untuk provinsi)
-                    if (id && !target.dataset.loaded && target.dataset.skiploading !== "true") {
+                    // Selama stream NDJSON berjalan, item diisi oleh stream (hindari request ganda)
+                    if (id && !target.dataset.loaded && target.dataset.skiploading !== "true" && !this._subRegionStream) {
                         this._fetchSingleSubRegionWeather(id, target);
                         observer.unobserve(target);
                     }
@@ -437,7 +440,8 @@ export const sidebarManager = {
         const labelEl = sidebarEl.querySelector('#sidebar-location-label-weather');
         if (labelEl) labelEl.textContent = activeLabel;
 
-        const isProvinsi = (activeData.tipadm === 1);
+        // Provinsi hanya punya cuaca jika rollup Kab/Kota sudah terbentuk di server
+        const isProvinsi = (activeData.tipadm === 1) && !activeData.hourly?.time?.length;
         const currentConditionsEl = sidebarEl.querySelector('#sidebar-current-conditions');
         const dailyForecastTitleEl = sidebarEl.querySelector('#sidebar-daily-forecast-title');
         const dailyForecastListEl = sidebarEl.querySelector('#sidebar-daily-forecast-list');
@@ -495,6 +499,11 @@ export const sidebarManager = {
         
         if (!activeData || !activeData.id) { return; }
 
+        if (this._subRegionStream) {
+            this._subRegionStream.abort();
+            this._subRegionStream = null;
+        }
+
         const tipadm = Number(activeData.tipadm);
         
         // Render jika level < 4 (Desa paling bawah)
@@ -538,19 +547,10 @@ export const sidebarManager = {
             this._renderSubRegionListSkeleton(simpleData);
 
             // [CRITICAL] Hanya fetch cuaca otomatis jika BUKAN provinsi
-            // Jika simpleData berisi Provinsi (tipadm=1), kita JANGAN panggil fetchSingle
-            if (timeManager.getGlobalTimeLookup().length === 0 && simpleData.length > 0) {
-                const firstItem = simpleData[0];
-                const firstTip = parseInt(firstItem.tipadm, 10);
-                
-                // Fetch cuaca hanya untuk Kab/Kota ke bawah (> 1)
-                if (firstTip > 1) {
-                    const firstId = firstItem.id;
-                    const firstEl = document.getElementById(`sub-region-${firstId}`);
-                    if (firstEl) {
-                        this._fetchSingleSubRegionWeather(firstId, firstEl);
-                    }
-                }
+            // Kab/Kota ke bawah (> 1): cuaca seluruh item di-stream (NDJSON) dan diisi bertahap
+            const firstTip = parseInt(simpleData[0].tipadm, 10);
+            if (firstTip > 1 && subRegionListEl && subRegionListEl.querySelector('.skeleton-mode')) {
+                this._streamSubRegionWeather(activeData.id, tipadm);
             }
 
         } catch (e) {
@@ -637,6 +637,35 @@ export const sidebarManager = {
         subRegionListEl.appendChild(fragment);
     },
 
+    _streamSubRegionWeather: async function(parentId, tipadm) {
+        const { subRegionListEl } = this.elements;
+        const controller = new AbortController();
+        this._subRegionStream = controller;
+
+        try {
+            await WeatherService.streamSubRegions(parentId, tipadm, (data) => {
+                const element = document.getElementById(`sub-region-${data.id}`);
+                if (!element || element.dataset.loaded) return;
+                if (this._observer) this._observer.unobserve(element);
+                this._fillSubRegionItem(element, data);
+                element.dataset.loaded = "true";
+            }, controller.signal);
+        } catch (e) {
+            if (e.name === 'AbortError') return;
+            console.warn(`Streaming sub-wilayah ${parentId} gagal, kembali ke lazy load.`, e);
+        } finally {
+            if (this._subRegionStream === controller) this._subRegionStream = null;
+        }
+
+        // Item yang tidak terkirim (gagal/tanpa data) kembali ke lazy load per item
+        if (controller.signal.aborted || !subRegionListEl || !this._observer) return;
+        subRegionListEl.querySelectorAll('.sub-region-item.skeleton-mode').forEach(element => {
+            if (element.dataset.loaded) return;
+            this._observer.unobserve(element);
+            this._observer.observe(element);
+        });
+    },
+
     _fetchSingleSubRegionWeather: async function(id, element) {
         const cached = cacheManager.get(id);
         if (cached) {
@@ -646,24 +675,10 @@ export const sidebarManager = {
         }
 
         try {
-            const protocol = window.location.protocol;
-            const hostname = window.location.hostname;
-            const port = window.location.port ? `:${window.location.port}` : '';
-            const baseUrl = `${protocol}//${hostname}${port}`;
-            
-            const resp = await fetch(`${baseUrl}/api/data-by-ids?ids=${id}`);
-            if (!resp.ok) throw new Error("Err");
-            
-            const dataMap = await resp.json();
-            const data = dataMap[id];
+            // Item yang terlihat bersamaan digabung WeatherService menjadi satu request batch
+            const data = await WeatherService.fetchSingle(id);
             
             if (data) {
-                cacheManager.set(id, data);
-                // Inisialisasi waktu global jika belum ada
-                if (timeManager.getGlobalTimeLookup().length === 0 && data.hourly?.time) {
-                     timeManager.setGlobalTimeLookup(data.hourly.time);
-                     timeManager.initializeOrSync(new Date(data.hourly.time[0]));
-                }
                 this._fillSubRegionItem(element, data);
                 element.dataset.loaded = "true";
             }
@@ -11,38 +11,68 @@ import { timeManager } from "./time_manager.js";
 export const WeatherService = {
     _inflightIds: new Set(), // Pengganti inflightIds di map_manager
     _isLoading: false,
+    _SINGLE_BATCH_DELAY_MS: 16, // Satu frame: permintaan tunggal (observer popup/sidebar) digabung jadi satu request
+    _pendingSingles: new Map(), // id -> [resolve, ...]
+    _singleTimer: null,
 
     /**
      * Mengambil data untuk daftar ID lokasi secara batch.
+     * ID yang belum ada di cache dan ID yang entrinya sudah stale dikirim dalam SATU request;
+     * untuk yang stale disertakan versinya sehingga server cukup membalas penanda not_modified.
+     * Jika semua ID sudah ada di cache (sebagian stale), langsung kembali dan revalidasi berjalan
+     * di latar (hasilnya diumumkan lewat cacheManager.subscribe).
      * @param {Array<string>} potentialIds - Daftar ID kandidat (dari marker di viewport).
      * @returns {Promise<object>} Hasil operasi { success, dataMap, error }.
      */
     fetchMissingData: async function(potentialIds) {
+        // Tunggu cache persisten (IndexedDB) termuat agar kunjungan ulang tidak fetch ulang
+        await cacheManager.ready();
+
         // 1. Filter: Hanya ambil yang belum ada di cache & belum sedang di-fetch
         const validIds = potentialIds.filter(id => {
             return id && id !== 'undefined' && id !== 'null';
-        });
+        }).map(String);
 
         const idsToFetch = validIds.filter(id => {
-            return !cacheManager.get(String(id)) && !this._inflightIds.has(String(id));
+            return !cacheManager.get(id) && !this._inflightIds.has(id);
+        });
+        const idsToRevalidate = validIds.filter(id => {
+            return cacheManager.get(id) && !cacheManager.isFresh(id) && !this._inflightIds.has(id);
         });
 
         // Cek khusus untuk inisialisasi waktu awal (jika belum ada data waktu sama sekali)
-        const isFirstLoad = (timeManager.getGlobalTimeLookup().length === 0);
+        let isFirstLoad = (timeManager.getGlobalTimeLookup().length === 0);
+        if (isFirstLoad) {
+            // Data dari cache persisten cukup untuk inisialisasi waktu tanpa menunggu network
+            const cachedWithTime = validIds.map(id => cacheManager.get(id)).find(data => data?.hourly?.time?.length > 0);
+            if (cachedWithTime) {
+                this._initGlobalTime(cachedWithTime);
+                isFirstLoad = false;
+            }
+        }
         
         // [EDGE CASE] Jika load pertama dan tidak ada kandidat (misal semua sudah ter-cache atau kosong),
         // kita paksa ambil satu ID valid dari potentialIds agar waktu bisa di-init.
-        if (isFirstLoad && idsToFetch.length === 0 && potentialIds.length > 0) {
-             const firstValid = potentialIds.find(id => !this._inflightIds.has(String(id)));
+        if (isFirstLoad && idsToFetch.length === 0 && validIds.length > 0) {
+             const firstValid = validIds.find(id => !this._inflightIds.has(id));
              if (firstValid) idsToFetch.push(firstValid);
         }
 
         if (idsToFetch.length === 0) {
+            if (idsToRevalidate.length > 0) this._requestBatch([], idsToRevalidate, false);
             return { success: true, dataMap: {}, isFirstLoad: isFirstLoad };
         }
 
-        // Tandai In-flight
-        idsToFetch.forEach(id => this._inflightIds.add(String(id)));
+        return this._requestBatch(idsToFetch, idsToRevalidate, isFirstLoad);
+    },
+
+    /**
+     * Satu request /api/data-by-ids untuk ID yang hilang + ID stale (dengan versi 'known').
+     * Entri not_modified hanya diperpanjang kesegarannya; entri baru disimpan ke cache.
+     */
+    _requestBatch: async function(missingIds, staleIds, isFirstLoad) {
+        const allIds = [...missingIds, ...staleIds];
+        allIds.forEach(id => this._inflightIds.add(id));
         this._isLoading = true;
 
         const protocol = window.location.protocol;
@@ -50,45 +80,72 @@ export const WeatherService = {
         const port = window.location.port ? `:${window.location.port}` : '';
         const baseUrl = `${protocol}//${hostname}${port}`;
 
+        const known = staleIds
+            .map(id => [id, cacheManager.getVersion(id)])
+            .filter(([, version]) => version)
+            .map(([id, version]) => `${id}:${version}`);
+        let url = `${baseUrl}/api/data-by-ids?ids=${allIds.join(',')}`;
+        if (known.length > 0) url += `&known=${known.join(',')}`;
+
         try {
-            const resp = await fetch(`${baseUrl}/api/data-by-ids?ids=${idsToFetch.join(',')}`);
+            const resp = await fetch(url);
             if (!resp.ok) throw new Error(`Network error ${resp.status}`);
             
-            const dataMap = await resp.json();
-            let didInitTime = false;
+            const body = await resp.json();
+            const dataMap = {};
+            const updated = {};
 
             // Proses Data Masuk
-            for (const id in dataMap) {
-                const data = dataMap[id];
-                cacheManager.set(String(id), data);
-                
-                // Inisialisasi Waktu Global jika ini data pertama yang valid
-                if (isFirstLoad && !didInitTime && data.hourly?.time?.length > 0) {
-                    timeManager.setGlobalTimeLookup(data.hourly.time);
-                    const realStartDate = new Date(data.hourly.time[0]);
-                    timeManager.initializeOrSync(realStartDate);
-                    didInitTime = true;
+            for (const id in body) {
+                const data = body[id];
+                if (data.not_modified) {
+                    cacheManager.touch(String(id));
+                    const cached = cacheManager.get(String(id));
+                    if (cached) dataMap[id] = cached;
+                    continue;
+                }
+                if (data.unavailable) {
+                    // Placeholder server (upstream gagal/ditolak): jangan di-cache agar dicoba lagi nanti
+                    const cached = cacheManager.get(String(id));
+                    if (cached) dataMap[id] = cached;
+                    continue;
                 }
+                updated[id] = data;
+                dataMap[id] = data;
+            }
+            cacheManager.setMany(updated);
+
+            // Inisialisasi Waktu Global jika ini data pertama yang valid
+            if (isFirstLoad) {
+                const firstWithTime = Object.values(dataMap).find(data => data.hourly?.time?.length > 0);
+                if (firstWithTime) this._initGlobalTime(firstWithTime);
             }
 
             return { 
                 success: true, 
                 dataMap: dataMap,
-                idsFetched: idsToFetch 
+                idsFetched: allIds 
             };
 
         } catch (e) {
             console.error("WeatherService: Gagal fetch batch.", e);
-            return { success: false, error: e, idsFailed: idsToFetch };
+            return { success: false, error: e, idsFailed: allIds };
         } finally {
             // Bersihkan status In-flight
-            idsToFetch.forEach(id => this._inflightIds.delete(String(id)));
+            allIds.forEach(id => this._inflightIds.delete(id));
             this._isLoading = false;
         }
     },
 
+    _initGlobalTime: function(data) {
+        timeManager.setGlobalTimeLookup(data.hourly.time);
+        timeManager.initializeOrSync(new Date(data.hourly.time[0]));
+    },
+
     /**
-     * Fetch data tunggal (Wrapper untuk klik marker/sidebar).
+     * Fetch data tunggal (Wrapper untuk klik marker/sidebar/item cluster).
+     * Data di cache (termasuk stale) langsung dikembalikan; sisanya dikumpulkan selama satu
+     * frame lalu diambil bersama dalam satu batch.
      */
     fetchSingle: async function(id) {
         const safeId = String(id);
@@ -96,11 +153,15 @@ export const WeatherService = {
         if (!safeId || safeId === 'undefined' || safeId === 'null') return null;
 
         // 1. Cek Cache
+        await cacheManager.ready();
         const cached = cacheManager.get(safeId);
-        if (cached) return cached;
+        if (cached) {
+            if (!cacheManager.isFresh(safeId)) this._queueSingle(safeId); // Revalidasi di latar
+            return cached;
+        }
 
         // 2. Fetch via Batch Logic
-        const result = await this.fetchMissingData([safeId]);
+        const result = await new Promise(resolve => this._queueSingle(safeId, resolve));
         
         if (result.success && result.dataMap && result.dataMap[safeId]) {
             return result.dataMap[safeId];
@@ -111,6 +172,69 @@ export const WeatherService = {
         return null;
     },
 
+    _queueSingle: function(id, resolve) {
+        if (!this._pendingSingles.has(id)) this._pendingSingles.set(id, []);
+        if (resolve) this._pendingSingles.get(id).push(resolve);
+        if (this._singleTimer) return;
+
+        this._singleTimer = setTimeout(async () => {
+            this._singleTimer = null;
+            const pending = this._pendingSingles;
+            this._pendingSingles = new Map();
+            const result = await this.fetchMissingData([...pending.keys()]);
+            pending.forEach(resolvers => resolvers.forEach(done => done(result)));
+        }, this._SINGLE_BATCH_DELAY_MS);
+    },
+
+    /**
+     * Streaming cuaca sub-wilayah (NDJSON): setiap baris diproses begitu tiba dari server,
+     * sehingga daftar bisa dirender bertahap tanpa menunggu seluruh respons.
+     * @param {string} parentId - ID wilayah induk.
+     * @param {number} tipadm - Level wilayah induk.
+     * @param {function} onItem - Dipanggil untuk setiap wilayah yang datanya sudah lengkap.
+     * @param {AbortSignal} [signal] - Untuk membatalkan stream saat konten sidebar berganti.
+     * @returns {Promise<number>} Jumlah wilayah yang diterima.
+     */
+    streamSubRegions: async function(parentId, tipadm, onItem, signal) {
+        const protocol = window.location.protocol;
+        const hostname = window.location.hostname;
+        const port = window.location.port ? `:${window.location.port}` : '';
+        const baseUrl = `${protocol}//${hostname}${port}`;
+        const url = `${baseUrl}/api/sub-wilayah-cuaca?id=${encodeURIComponent(parentId)}&tipadm=${tipadm}&view=full&format=ndjson`;
+
+        const resp = await fetch(url, { signal });
+        if (!resp.ok || !resp.body) throw new Error(`Network error ${resp.status}`);
+
+        let received = 0;
+        const handleLine = (line) => {
+            if (!line.trim()) return;
+            const data = JSON.parse(line);
+            if (data.error) throw new Error(data.error);
+            if (data.unavailable) return; // Tanpa data cuaca: item tetap skeleton & kembali ke lazy load
+
+            cacheManager.set(String(data.id), data);
+            // Inisialisasi Waktu Global jika ini data pertama yang valid
+            if (timeManager.getGlobalTimeLookup().length === 0 && data.hourly?.time?.length > 0) {
+                this._initGlobalTime(data);
+            }
+            received++;
+            onItem(data);
+        };
+
+        const reader = resp.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            const lines = buffer.split('\n');
+            buffer = lines.pop(); // Baris terakhir mungkin belum lengkap
+            lines.forEach(handleLine);
+        }
+        handleLine(buffer);
+        return received;
+    },
+
     isLoading: function() {
         return this._isLoading;
     }
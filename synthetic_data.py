@@ -0,0 +1,334 @@
+"""
+🧪 SYNTHETIC DATA ENGINE
+Generator data sintetis untuk mode USE_REAL_API=false dan load test.
+
+Sifat utama:
+- Deterministik: output hanya bergantung pada seed, koordinat, dan jam absolut (UTC),
+  jadi panggilan berulang (antar instance sekalipun) menghasilkan data yang sama.
+- Koheren secara spasial & temporal: cuaca dibangun dari *value noise* pada grid kasar
+  (ruang) dan knot tiap beberapa jam (waktu) yang diinterpolasi, sehingga wilayah
+  bertetangga dan jam berurutan memiliki nilai yang mirip.
+- Murah: semua yang hanya bergantung pada jam (bobot interpolasi, siklus harian, siang/malam)
+  dihitung sekali dan dibagi semua lokasi; per lokasi hanya tersisa beberapa list comprehension
+  dan builtin C. Deret per sel grid (SYNTHETIC_CELL_DEG) di-memoize dalam bentuk array ringkas
+  (SYNTHETIC_CELL_CACHE sel, ~10 KB per sel), jadi memori per proses tetap kecil.
+- Gempa: titik disebar di sepanjang zona subduksi/sesar utama Indonesia dengan
+  distribusi magnitudo Gutenberg-Richter, untuk feed berukuran berapa pun.
+"""
+import math
+import os
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+DEFAULT_SEED = int(os.getenv("SYNTHETIC_SEED", 42))
+CELL_DEG = float(os.getenv("SYNTHETIC_CELL_DEG", 0.1))  # Resolusi sel memoization (derajat)
+CELL_CACHE_SIZE = int(os.getenv("SYNTHETIC_CELL_CACHE", 1024))  # Jumlah sel yang di-memoize per proses
+NOISE_GRID_DEG = 2.0      # Jarak knot value noise spasial (derajat)
+KNOT_HOURS = 6            # Jarak knot value noise temporal (jam)
+HOURLY_POINTS = 336       # 7 hari lalu + 7 hari ke depan
+DAILY_POINTS = 14
+
+# Kode WMO berdasarkan intensitas hujan (0..1) dan tutupan awan (0..1), dicari dengan bisect
+RAIN_THRESHOLD = 0.55
+_RAIN_CODES = ((0.55, 51), (0.62, 53), (0.70, 61), (0.78, 63), (0.84, 80), (0.89, 81), (0.93, 65), (0.97, 95), (1.01, 96))
+_RAIN_LIMITS = [limit for limit, _ in _RAIN_CODES]
+_RAIN_CODE_LIST = [code for _, code in _RAIN_CODES]
+_CLOUD_LIMITS = [0.3, 0.5, 0.75]
+_CLOUD_CODES = [0, 1, 2, 3]
+# Severity untuk memilih kode harian (kode terburuk yang dominan)
+_CODE_SEVERITY = {0: 0, 1: 1, 2: 2, 3: 3, 45: 4, 48: 4, 51: 5, 53: 6, 55: 7, 61: 8, 63: 9, 65: 11,
+                  80: 8, 81: 10, 82: 12, 95: 13, 96: 14, 99: 15}
+
+# Zona Waktu Indonesia berdasarkan bujur
+_TIMEZONES = ((115.0, "Asia/Jakarta", "WIB", 25200), (125.0, "Asia/Makassar", "WITA", 28800),
+              (999.0, "Asia/Jayapura", "WIT", 32400))
+
+# Polyline zona sumber gempa utama (lon, lat) + kedalaman dasar (km)
+_SEISMIC_ZONES = (
+    ("Sumatra Barat Daya", ((95.0, 5.5), (97.0, 2.0), (100.0, -2.0), (102.5, -5.0), (105.0, -7.0)), 25),
+    ("Selatan Jawa", ((105.0, -7.5), (108.0, -8.6), (111.0, -9.0), (114.0, -9.3)), 30),
+    ("Nusa Tenggara", ((114.0, -9.3), (117.0, -10.0), (121.0, -10.3), (125.0, -9.8)), 35),
+    ("Laut Banda", ((125.0, -7.5), (129.5, -7.0), (131.0, -5.0), (129.0, -3.5)), 120),
+    ("Laut Maluku", ((125.5, -1.0), (126.5, 1.0), (126.8, 3.0)), 45),
+    ("Sulawesi Utara", ((120.0, 1.2), (122.5, 1.3), (125.0, 1.8)), 30),
+    ("Papua Utara", ((134.0, -1.5), (137.0, -2.0), (140.5, -2.5)), 20),
+)
+
+
+# ================== NOISE DETERMINISTIK ==================
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def _hash01(seed, a, b, c, channel):
+    """Hash integer (splitmix64) -> float [0, 1)."""
+    x = (seed * 0x9E3779B97F4A7C15 + a * 0xBF58476D1CE4E5B9 + b * 0x94D049BB133111EB
+         + c * 0xD6E8FEB86659FD93 + channel * 0xA0761D6478BD642F) & _MASK
+    x ^= x >> 30
+    x = (x * 0xBF58476D1CE4E5B9) & _MASK
+    x ^= x >> 27
+    x = (x * 0x94D049BB133111EB) & _MASK
+    x ^= x >> 31
+    return x / 18446744073709551616.0
+
+
+@lru_cache(maxsize=4096)
+def _corner_knots(seed, ix, iy, first_knot, knot_count, channel):
+    """Knot waktu untuk satu titik grid noise (dibagi semua sel di sekitarnya)."""
+    return [_hash01(seed, ix, iy, k, channel) for k in range(first_knot, first_knot + knot_count)]
+
+
+def _noise_knots(seed, lat, lon, first_knot, knot_count, channel):
+    """Value noise pada knot waktu, diinterpolasi bilinear di ruang (grid NOISE_GRID_DEG)."""
+    gx, gy = lon / NOISE_GRID_DEG, lat / NOISE_GRID_DEG
+    ix, iy = math.floor(gx), math.floor(gy)
+    fx, fy = gx - ix, gy - iy
+    # Smoothstep agar turunan kontinu di batas sel
+    fx, fy = fx * fx * (3 - 2 * fx), fy * fy * (3 - 2 * fy)
+    w00, w10, w01, w11 = (1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy
+    c00 = _corner_knots(seed, ix, iy, first_knot, knot_count, channel)
+    c10 = _corner_knots(seed, ix + 1, iy, first_knot, knot_count, channel)
+    c01 = _corner_knots(seed, ix, iy + 1, first_knot, knot_count, channel)
+    c11 = _corner_knots(seed, ix + 1, iy + 1, first_knot, knot_count, channel)
+    return [w00 * a + w10 * b + w01 * c + w11 * d for a, b, c, d in zip(c00, c10, c01, c11)]
+
+
+# Siklus harian suhu (puncak ~14:00) dan faktor konveksi sore hari (puncak ~16:00) per jam lokal.
+# Sumbu waktu selalu dimulai tengah malam lokal, jadi indeks i ke-HOURLY_POINTS -> jam lokal i % 24
+# sama untuk semua lokasi: deret dibentuk sekali di sini.
+_DIURNAL = [math.cos(2 * math.pi * (i % 24 - 14) / 24) for i in range(HOURLY_POINTS)]
+_CONVECTION = [0.85 + 0.25 * max(0.0, math.cos(2 * math.pi * (i % 24 - 16) / 24)) for i in range(HOURLY_POINTS)]
+_IS_DAY = [1 if 6 <= i % 24 < 18 else 0 for i in range(HOURLY_POINTS)]
+_TEMP_DIURNAL = [3.5 * d for d in _DIURNAL]
+_RH_DIURNAL = [10 * d for d in _DIURNAL]
+
+# Bobot interpolasi cosinus untuk setiap posisi jam di antara dua knot
+_KNOT_WEIGHTS = [(1 - math.cos(j / KNOT_HOURS * math.pi)) * 0.5 for j in range(KNOT_HOURS)]
+
+
+def _interpolate_hours(knots, offset):
+    """Interpolasi cosinus knot (tiap KNOT_HOURS) menjadi deret per jam, per segmen antar-knot."""
+    series = []
+    for a, b in zip(knots, knots[1:]):
+        delta = b - a
+        series += [a + delta * w for w in _KNOT_WEIGHTS]
+    return series[offset:offset + HOURLY_POINTS]
+
+
+# ================== CUACA ==================
+
+def timezone_for(lon):
+    """(timezone, singkatan, utc_offset_seconds) berdasarkan bujur."""
+    for max_lon, tz_name, abbreviation, offset in _TIMEZONES:
+        if lon < max_lon:
+            return tz_name, abbreviation, offset
+    return _TIMEZONES[-1][1:]
+
+
+@lru_cache(maxsize=64)
+def _time_axis(start_date_iso, offset_seconds):
+    """Label waktu lokal hourly/daily (dibagi antar sel dengan zona & tanggal yang sama)."""
+    start = datetime.fromisoformat(start_date_iso)
+    hourly = [(start + timedelta(hours=i)).strftime('%Y-%m-%dT%H:%M') for i in range(HOURLY_POINTS)]
+    daily = [(start + timedelta(days=i)).date().isoformat() for i in range(DAILY_POINTS)]
+    return hourly, daily
+
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _cell_series(seed, cell_x, cell_y, start_date_iso, offset_seconds):
+    """
+    Deret cuaca lengkap untuk satu sel grid (di-memoize). Disimpan sebagai array ringkas
+    (double untuk nilai desimal, integer kecil untuk kode/persen), bukan list float ber-box.
+    """
+    lat, lon = (cell_y + 0.5) * CELL_DEG, (cell_x + 0.5) * CELL_DEG
+    start_local = datetime.fromisoformat(start_date_iso)
+    start_utc_hour = int((start_local - datetime(1970, 1, 1)).total_seconds() - offset_seconds) // 3600
+    first_knot = start_utc_hour // KNOT_HOURS
+    knot_offset = start_utc_hour - first_knot * KNOT_HOURS
+    knot_count = (knot_offset + HOURLY_POINTS) // KNOT_HOURS + 2
+
+    rain, cloud, anomaly, wind, wind_dir = (
+        _interpolate_hours(_noise_knots(seed, lat, lon, first_knot, knot_count, channel), knot_offset)
+        for channel in (1, 2, 3, 4, 5))
+
+    # Suhu dasar menurun sedikit menjauhi ekuator; variasi lokal statis per sel (topografi)
+    base_temp = 28.0 - 0.1 * abs(lat) - 2.0 * _hash01(seed, cell_x, cell_y, 0, 6)
+    r = [1.0 if x * c > 1.0 else x * c for x, c in zip(rain, _CONVECTION)]
+    temp = [base_temp + d + 3.0 * (a - 0.5) - (2.5 * (q - RAIN_THRESHOLD) if q > RAIN_THRESHOLD else 0.0)
+            for d, a, q in zip(_TEMP_DIURNAL, anomaly, r)]
+    humidity = [40 if h < 40 else 100 if h > 100 else h
+                for h in [round(70 + 22 * (q - 0.4) - d) for q, d in zip(r, _RH_DIURNAL)]]
+    codes = [_RAIN_CODE_LIST[bisect_right(_RAIN_LIMITS, q)] if q >= RAIN_THRESHOLD
+             else _CLOUD_CODES[bisect_right(_CLOUD_LIMITS, c)] for q, c in zip(r, cloud)]
+    temperature = [round(t, 1) for t in temp]
+
+    severity = _CODE_SEVERITY.__getitem__
+    daily_codes = [max(codes[d * 24:d * 24 + 24], key=severity) for d in range(DAILY_POINTS)]
+    hourly = (
+        array('d', temperature),
+        array('b', humidity),
+        array('d', [round(t + 0.08 * (rh - 60) + 1.5, 1) for t, rh in zip(temp, humidity)]),
+        array('b', [0 if p < 0 else 100 if p > 100 else p for p in [round((q - 0.35) * 160) for q in r]]),
+        array('b', codes),
+        array('d', [round(0.5 + 6.0 * w * w, 1) for w in wind]),
+        array('h', [int(w * 720) % 360 for w in wind_dir]),
+    )
+    daily = (
+        array('b', daily_codes),
+        array('d', [max(temperature[d * 24:d * 24 + 24]) for d in range(DAILY_POINTS)]),
+        array('d', [min(temperature[d * 24:d * 24 + 24]) for d in range(DAILY_POINTS)]),
+    )
+    elevation = round(5 + 400 * _hash01(seed, cell_x, cell_y, 0, 7) ** 3, 1)
+    return hourly, daily, elevation
+
+
+def _cell_weather(seed, cell_x, cell_y, start_date_iso, offset_seconds):
+    """Deret sel dalam format Open-Meteo (list baru per lokasi, aman dimutasi pemanggil)."""
+    (temperature, humidity, apparent, precip, codes, wind_speed, wind_direction), \
+        (daily_codes, daily_max, daily_min), elevation = _cell_series(seed, cell_x, cell_y, start_date_iso, offset_seconds)
+    hourly_times, daily_times = _time_axis(start_date_iso, offset_seconds)
+    hourly = {
+        'time': hourly_times,
+        'temperature_2m': temperature.tolist(),
+        'relative_humidity_2m': humidity.tolist(),
+        'apparent_temperature': apparent.tolist(),
+        'is_day': _IS_DAY,
+        'precipitation_probability': precip.tolist(),
+        'weather_code': codes.tolist(),
+        'wind_speed_10m': wind_speed.tolist(),
+        'wind_direction_10m': wind_direction.tolist(),
+    }
+    daily = {
+        'time': daily_times,
+        'weather_code': daily_codes.tolist(),
+        'temperature_2m_max': daily_max.tolist(),
+        'temperature_2m_min': daily_min.tolist(),
+    }
+    return hourly, daily, elevation
+
+
+def weather_batch(wilayah_infos, seed=None, now=None):
+    """
+    Menghasilkan respon mirip Open-Meteo (list per lokasi) untuk wilayah sebanyak apa pun.
+    Rentang waktu: 7 hari lalu s.d. 7 hari ke depan, dimulai tengah malam waktu lokal.
+    """
+    seed = DEFAULT_SEED if seed is None else seed
+    now = now or time.time()
+    results = []
+    for info in wilayah_infos:
+        lat, lon = float(info['lat']), float(info['lon'])
+        tz_name, abbreviation, offset = timezone_for(lon)
+        local_now = datetime.fromtimestamp(now, timezone.utc) + timedelta(seconds=offset)
+        start_date_iso = (local_now - timedelta(days=7)).date().isoformat()
+        hourly, daily, elevation = _cell_weather(
+            seed, math.floor(lon / CELL_DEG), math.floor(lat / CELL_DEG), start_date_iso, offset)
+        results.append({
+            'latitude': lat,
+            'longitude': lon,
+            'generationtime_ms': 0.0,
+            'utc_offset_seconds': offset,
+            'timezone': tz_name,
+            'timezone_abbreviation': abbreviation,
+            'elevation': elevation,
+            'hourly_units': {},
+            'hourly': hourly,
+            'daily_units': {},
+            'daily': daily,
+        })
+    return results
+
+
+# ================== GEMPA ==================
+
+def _seismic_event(seed, index, now_ts, window_seconds, min_magnitude):
+    """Satu kejadian gempa deterministik: (lon, lat, depth_km, magnitude, timestamp, nama_zona)."""
+    h = lambda channel: _hash01(seed, index, 0, 0, 100 + channel)
+    zone_name, points, base_depth = _SEISMIC_ZONES[int(h(0) * len(_SEISMIC_ZONES))]
+    # Posisi di sepanjang polyline + jitter tegak lurus (menjauhi palung = lebih dalam)
+    segment = int(h(1) * (len(points) - 1))
+    t = h(2)
+    (x0, y0), (x1, y1) = points[segment], points[segment + 1]
+    dx, dy = x1 - x0, y1 - y0
+    length = math.hypot(dx, dy) or 1.0
+    offset = (h(3) - 0.3) * 2.0
+    lon = x0 + dx * t - dy / length * offset
+    lat = y0 + dy * t + dx / length * offset
+    depth = max(5.0, base_depth + max(0.0, offset) * 90 + 40 * h(4) ** 2)
+    # Gutenberg-Richter (b = 1): M = Mmin - log10(U)
+    magnitude = min(9.0, min_magnitude - math.log10(max(h(5), 1e-9)))
+    # Kejadian terbaru lebih rapat (index kecil = lebih baru)
+    timestamp = now_ts - window_seconds * (index + h(6)) / (index + 50)
+    return round(lon, 2), round(lat, 2), round(depth, 1), round(magnitude, 1), timestamp, zone_name
+
+
+def _anchor(now, bucket_seconds=3600):
+    """Membulatkan waktu agar feed stabil dalam satu bucket (mis. satu jam)."""
+    now = now or time.time()
+    return now - (now % bucket_seconds)
+
+
+def bmkg_feed(count=15, seed=None, now=None):
+    """
+    Feed mirip gempaterkini.json BMKG. Item pertama selalu skenario tsunami agar UI
+    status darurat tetap teruji.
+    """
+    seed = DEFAULT_SEED if seed is None else seed
+    now_ts = _anchor(now)
+    wib = timezone(timedelta(hours=7))
+    gempa_list = []
+    for i in range(count):
+        if i == 0:
+            lon, lat, depth, mag, ts, zone = 102.0, -3.5, 10.0, 8.5, now_ts - 300, "Sumatra Barat Daya"
+            potensi = "BERPOTENSI TSUNAMI UNTUK DITERUSKAN PADA MASYARAKAT"
+        else:
+            lon, lat, depth, mag, ts, zone = _seismic_event(seed, i, now_ts, 7 * 86400, 4.0)
+            potensi = "Tidak berpotensi tsunami"
+        t = datetime.fromtimestamp(ts, wib).replace(tzinfo=None)
+        gempa_list.append({
+            "Tanggal": t.strftime("%d %b %Y"),
+            "Jam": t.strftime("%H:%M:%S WIB"),
+            "DateTime": t.isoformat(),
+            "Coordinates": f"{lat:.2f},{lon:.2f}",
+            "Lintang": f"{abs(lat):.2f} {'LS' if lat < 0 else 'LU'}",
+            "Bujur": f"{lon:.2f} BT",
+            "Magnitude": f"{mag:.1f}",
+            "Kedalaman": f"{int(round(depth))} km",
+            "Wilayah": f"{10 + int(_hash01(seed, i, 0, 0, 99) * 200)} km {zone.upper()}",
+            "Potensi": potensi,
+        })
+    return {"Infogempa": {"gempa": gempa_list}}
+
+
+def usgs_feed(count=50, seed=None, now=None):
+    """Feed GeoJSON mirip USGS FDSN (minmagnitude 4.5). Feature pertama skenario tsunami."""
+    seed = DEFAULT_SEED if seed is None else seed
+    now_ts = _anchor(now)
+    now_ms = int(now_ts * 1000)
+    features = []
+    for i in range(count):
+        if i == 0:
+            lon, lat, depth, mag, ts, zone = 130.0, -5.0, 15.0, 8.2, now_ts - 300, "Laut Banda"
+            tsunami = 1
+        else:
+            lon, lat, depth, mag, ts, zone = _seismic_event(seed + 1, i, now_ts, 86400, 4.5)
+            tsunami = 0
+        features.append({
+            "type": "Feature",
+            "properties": {
+                "mag": mag,
+                "place": f"Synthetic {zone}, Indonesia Region",
+                "time": int(ts * 1000),
+                "updated": now_ms,
+                "tsunami": tsunami,
+                "status": "reviewed",
+                "magType": "mww" if mag >= 6.5 else "mb",
+                "type": "earthquake",
+                "title": f"M {mag} - Synthetic {zone}",
+            },
+            "geometry": {"type": "Point", "coordinates": [lon, lat, depth]},
+            "id": f"synthetic_usgs_{seed}_{i}",
+        })
+    return {"type": "FeatureCollection", "features": features}
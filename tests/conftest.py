@@ -0,0 +1,50 @@
+"""
+Fixture bersama test: app.py dimuat sekali lewat harness benchmark (FakeRedis & fixture SQLite),
+tanpa Redis/PostGIS/upstream sungguhan.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    from benchmarks.common import load_app
+    module, _ = load_app(fixture_sizes=dict(provinsi=2, kab_per_prov=2, kec_per_kab=1, desa_per_kec=1))
+    return module
+
+
+@pytest.fixture(params=["redis", "memory"])
+def backend(request, app_module, monkeypatch):
+    """Menjalankan test dengan state di FakeRedis maupun fallback in-memory."""
+    from benchmarks.fake_redis import FakeRedis
+    monkeypatch.setattr(app_module, "redis_client", FakeRedis() if request.param == "redis" else None)
+    monkeypatch.setattr(app_module, "_redis_checked", True)
+    monkeypatch.setattr(app_module, "MEMORY_CIRCUITS", {})
+    monkeypatch.setattr(app_module, "MEMORY_CACHE", {})
+    monkeypatch.setattr(app_module, "MEMORY_BUCKETS", {})
+    monkeypatch.setattr(app_module, "MEMORY_RATE_LIMIT_STATS", {})
+    monkeypatch.setattr(app_module, "MEMORY_ROLLUP_CHILDREN", {})
+    monkeypatch.setattr(app_module, "MEMORY_ROLLUP_STATE", {'dirty': set(), 'lock_until': 0})
+    return request.param
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Jam yang bisa dimajukan manual (dipakai app.py & FakeRedis lewat time.time)."""
+    import time
+
+    class Clock:
+        now = 1_800_000_000.0
+
+        def advance(self, seconds):
+            self.now += seconds
+
+    fake = Clock()
+    monkeypatch.setattr(time, "time", lambda: fake.now)
+    return fake
@@ -0,0 +1,139 @@
+"""
+🧪 TEST CIRCUIT BREAKER
+State machine per upstream: closed -> open -> half-open (satu probe) -> closed / open lagi,
+serta klasifikasi error upstream (hanya timeout/koneksi/5xx yang dihitung gagal).
+"""
+import pytest
+import requests
+
+UPSTREAM = "open-meteo"
+
+
+def _fail_until_open(app_module):
+    for _ in range(app_module.CIRCUIT_FAILURE_THRESHOLD):
+        app_module.record_upstream_failure(UPSTREAM)
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status}", response=response)
+
+
+def test_closed_sampai_ambang_gagal(app_module, backend, clock):
+    for _ in range(app_module.CIRCUIT_FAILURE_THRESHOLD - 1):
+        app_module.record_upstream_failure(UPSTREAM)
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_CLOSED
+    assert app_module.circuit_allows(UPSTREAM)
+
+    app_module.record_upstream_failure(UPSTREAM)
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_OPEN
+    assert not app_module.circuit_allows(UPSTREAM)
+
+
+def test_gagal_di_luar_jendela_tidak_dihitung(app_module, backend, clock):
+    for _ in range(app_module.CIRCUIT_FAILURE_THRESHOLD - 1):
+        app_module.record_upstream_failure(UPSTREAM)
+    clock.advance(app_module.CIRCUIT_WINDOW + 1)
+    app_module.record_upstream_failure(UPSTREAM)
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_CLOSED
+
+
+def test_half_open_hanya_satu_probe(app_module, backend, clock):
+    _fail_until_open(app_module)
+    clock.advance(app_module.CIRCUIT_COOLDOWN + 1)
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_HALF_OPEN
+    assert app_module.circuit_allows(UPSTREAM)
+    assert not app_module.circuit_allows(UPSTREAM)
+
+    # Probe yang menggantung melewati batas waktunya: pemanggil lain boleh mem-probe
+    clock.advance(app_module.CIRCUIT_PROBE_TIMEOUT + 1)
+    assert app_module.circuit_allows(UPSTREAM)
+
+
+def test_probe_berhasil_menutup_circuit(app_module, backend, clock):
+    _fail_until_open(app_module)
+    clock.advance(app_module.CIRCUIT_COOLDOWN + 1)
+    assert app_module.circuit_allows(UPSTREAM)
+    app_module.record_upstream_success(UPSTREAM)
+
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_CLOSED
+    assert app_module.circuit_allows(UPSTREAM)
+    # Hitungan gagal ikut direset: satu kegagalan baru tidak langsung membuka lagi
+    app_module.record_upstream_failure(UPSTREAM)
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_CLOSED
+
+
+def test_probe_gagal_membuka_lagi(app_module, backend, clock):
+    _fail_until_open(app_module)
+    clock.advance(app_module.CIRCUIT_COOLDOWN + 1)
+    assert app_module.circuit_allows(UPSTREAM)
+    app_module.record_upstream_failure(UPSTREAM)
+
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_OPEN
+    assert not app_module.circuit_allows(UPSTREAM)
+    clock.advance(app_module.CIRCUIT_COOLDOWN + 1)
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_HALF_OPEN
+    assert app_module.circuit_allows(UPSTREAM)
+
+
+@pytest.mark.parametrize("error, is_failure", [
+    (requests.Timeout("timeout"), True),
+    (requests.ConnectionError("reset"), True),
+    (_http_error(503), True),
+    (_http_error(400), False),
+    (_http_error(404), False),
+    (ValueError("json rusak"), False),
+])
+def test_klasifikasi_error_upstream(app_module, error, is_failure):
+    assert app_module.is_upstream_failure(error) is is_failure
+
+
+def test_error_klien_tidak_membuka_circuit(app_module, backend, clock):
+    for _ in range(app_module.CIRCUIT_FAILURE_THRESHOLD * 2):
+        assert not app_module.record_upstream_error(UPSTREAM, _http_error(400))
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_CLOSED
+
+
+def test_error_klien_melepas_probe(app_module, backend, clock):
+    _fail_until_open(app_module)
+    clock.advance(app_module.CIRCUIT_COOLDOWN + 1)
+    assert app_module.circuit_allows(UPSTREAM)
+    app_module.record_upstream_error(UPSTREAM, _http_error(400))
+    assert app_module.get_circuit_state(UPSTREAM) == app_module.CIRCUIT_CLOSED
+
+
+def _allowed(app_module):
+    return app_module.get_rate_limit_stats().get(UPSTREAM, {}).get("interactive:allowed", 0)
+
+
+def test_circuit_open_tidak_memotong_budget(app_module, backend, clock):
+    _fail_until_open(app_module)
+    for _ in range(3):
+        assert not app_module.acquire_upstream_call(UPSTREAM, cost=10)
+    assert _allowed(app_module) == 0
+
+    clock.advance(app_module.CIRCUIT_COOLDOWN + 1)
+    assert app_module.acquire_upstream_call(UPSTREAM, cost=10)
+    assert _allowed(app_module) == 1
+
+
+def test_probe_tidak_diklaim_jika_budget_ditolak(app_module, backend, clock, monkeypatch):
+    _fail_until_open(app_module)
+    clock.advance(app_module.CIRCUIT_COOLDOWN + 1)
+    with monkeypatch.context() as m:
+        m.setattr(app_module, "acquire_upstream_budget", lambda *a, **kw: False)
+        assert not app_module.acquire_upstream_call(UPSTREAM)
+    # Slot probe masih bebas untuk pemanggil yang mendapat budget
+    assert app_module.circuit_allows(UPSTREAM)
+
+
+def test_wilayah_tanpa_koordinat_tidak_di_fetch(app_module, backend, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, "fetch_and_cache_weather", lambda infos, **kw: calls.append(infos) or {})
+    result = app_module.process_wilayah_data([
+        {"id": "9.01.01.2001", "lat": None, "lon": None, "tipadm": 4},
+        {"id": "9.01.01.2002", "lat": -6.2, "lon": 106.8, "tipadm": 4},
+    ])
+    assert result["9.01.01.2001"]["unavailable"] is True
+    assert [[info["id"] for info in infos] for infos in calls] == [["9.01.01.2002"]]
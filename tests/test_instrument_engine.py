@@ -0,0 +1,26 @@
+"""
+🧪 TEST INSTRUMENTASI ENGINE
+Timer query tidak boleh menumpuk state per koneksi saat query gagal (after_cursor_execute
+tidak dipanggil), dan query berikutnya di koneksi yang sama tetap terukur.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+
+def _query_count(app_module):
+    return sum(entry[-1] for entry in app_module.metrics.DB_QUERY_DURATION._values.values())
+
+
+def test_query_gagal_tidak_meninggalkan_state(app_module):
+    db_engine = create_engine("sqlite://")
+    app_module.instrument_engine(db_engine)
+    with db_engine.connect() as conn:
+        before = _query_count(app_module)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM tabel_tidak_ada"))
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+        assert _query_count(app_module) == before + 1
+        assert not any(isinstance(value, list) for value in conn.info.values())
@@ -0,0 +1,116 @@
+"""
+🧪 TEST SNAPSHOT REFERENSI
+Round-trip write_snapshot -> ReferenceSnapshot: hasil lookup harus setara query database
+(children = LIKE '<induk>.%', lookup = UNION semua level), termasuk kasus prefiks ID.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reference_snapshot import ReferenceSnapshot, write_snapshot
+
+
+def _row(wilayah_id, level, nama, lat=-6.2, lon=106.8, tipadm=None, label=None):
+    return {
+        "id": wilayah_id, "nama_simpel": nama, "nama_label": label,
+        "lat": lat, "lon": lon, "tipadm": level if tipadm is None else tipadm, "level": level,
+    }
+
+
+ROWS = [
+    _row("00", 0, "Indonesia"),
+    _row("11", 1, "Aceh"),
+    _row("12", 1, "Sumatera Utara"),
+    _row("11.01", 2, "Simeulue", label="Kabupaten Simeulue"),
+    _row("11.1", 2, "Kode Pendek"),
+    _row("11.10", 2, "Aceh Singkil"),
+    _row("11.11", 2, "Bireuen"),
+    _row("11.1.01", 3, "Anak Kode Pendek"),
+    _row("11.10.01", 3, "Singkil"),
+    _row("11.10.02", 3, "Gunung Meriah"),
+    _row("12.01", 2, "Tapanuli Tengah"),
+    {**_row("11.10.01.2001", 4, "Pulau Sarok", lat=None, lon=None), "tipadm": None},
+    _row("12.01.01", 3, "Barus Utara"),
+    _row("12.01.01", 3, "Barus Utara (duplikat LEFT JOIN)"),
+    _row("11.01.01", 3, "Simeulue Timur"),
+    _row("11.01.02", 3, "Teupah Selatan"),
+    _row("12.01.02", 3, "Kecamatan Ñ Tüg"),
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "reference_snapshot.bin")
+    write_snapshot(path, ROWS)
+    snap = ReferenceSnapshot(path)
+    yield snap
+    snap.close()
+
+
+def _ids(records):
+    return [record["id"] for record in records]
+
+
+def test_children_prefix_tidak_tercampur(snapshot):
+    # "11.1." tidak boleh menangkap anak "11.10" / "11.11" walau urutan byte-nya berdekatan
+    assert _ids(snapshot.children("11.1", 3)) == ["11.1.01"]
+    assert _ids(snapshot.children("11.10", 3)) == ["11.10.01", "11.10.02"]
+    assert _ids(snapshot.children("11.11", 3)) == []
+    assert _ids(snapshot.children("11", 2)) == ["11.01", "11.1", "11.10", "11.11"]
+    assert _ids(snapshot.children("1", 2)) == []
+
+
+def test_children_batas_level(snapshot):
+    # Cucu (level 4) tidak ikut di children level 3
+    assert _ids(snapshot.children("11.10", 4)) == ["11.10.01.2001"]
+    assert snapshot.children("99", 2) == []
+    assert snapshot.children("11", 5) == []
+
+
+def test_lookup_semua_level(snapshot):
+    records = snapshot.lookup(["11.1", "11.10", "12", "11.10.01.2001", "99.99", ""])
+    assert [(r["id"], r["level"]) for r in records] == [
+        ("11.1", 2), ("11.10", 2), ("12", 1), ("11.10.01.2001", 4),
+    ]
+
+
+def test_field_round_trip(snapshot):
+    (simeulue,) = snapshot.lookup(["11.01"])
+    assert simeulue == {
+        "id": "11.01", "nama_simpel": "Simeulue", "nama_label": "Kabupaten Simeulue",
+        "lat": -6.2, "lon": 106.8, "tipadm": 2, "level": 2,
+    }
+    # Label kosong jatuh ke nama_simpel; koordinat/tipadm NULL tetap None
+    (desa,) = snapshot.lookup(["11.10.01.2001"])
+    assert desa["nama_label"] == "Pulau Sarok"
+    assert (desa["lat"], desa["lon"], desa["tipadm"]) == (None, None, None)
+    (unicode_row,) = snapshot.lookup(["12.01.02"])
+    assert unicode_row["nama_simpel"] == "Kecamatan Ñ Tüg"
+
+
+def test_duplikat_dibuang_baris_pertama_menang(snapshot):
+    assert [r["nama_simpel"] for r in snapshot.lookup(["12.01.01"])] == ["Barus Utara"]
+    assert snapshot.header["count"] == len(ROWS) - 1
+
+
+def test_level_urut_id(snapshot):
+    assert _ids(snapshot.level(1)) == ["11", "12"]
+    assert _ids(snapshot.level(0)) == ["00"]
+
+
+def test_versi_hanya_bergantung_isi(tmp_path):
+    first = write_snapshot(str(tmp_path / "a.bin"), ROWS)
+    second = write_snapshot(str(tmp_path / "b.bin"), list(reversed(ROWS[:-4])) + ROWS[-4:])
+    changed = write_snapshot(str(tmp_path / "c.bin"), ROWS + [_row("13", 1, "Sumatera Barat")])
+    assert first["version"] == second["version"]
+    assert first["version"] != changed["version"]
+
+
+def test_file_bukan_snapshot_ditolak(tmp_path):
+    path = tmp_path / "bukan.bin"
+    path.write_bytes(b"BUKAN-SNAPSHOT" + b"\0" * 32)
+    with pytest.raises(ValueError):
+        ReferenceSnapshot(str(path))
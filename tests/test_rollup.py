@@ -0,0 +1,104 @@
+"""
+🧪 TEST ROLLUP CUACA
+_aggregate_rollup: agregasi kolom berbobot, sumbu waktu dari anak zona mayoritas yang paling baru
+di-fetch, penyelarasan zona waktu lewat jam UTC dan seri harian lewat tanggal. Hitung ulang rollup
+tidak berjalan di setiap miss request user (debounce), dan dikerjakan warm-up di akhir run.
+"""
+from datetime import datetime, timedelta
+
+WIB, WITA = 7 * 3600, 8 * 3600
+
+
+def _child(start, mean, n=1, offset=WIB, code=None, precip=None, days=("2026-10-19", "2026-10-20")):
+    base = datetime.fromisoformat(start)
+    hours = len(mean)
+    return {
+        "n": n, "offset": offset, "tz": ["Asia/Jakarta" if offset == WIB else "Asia/Makassar", "WIB" if offset == WIB else "WITA"],
+        "time": [(base + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(hours)],
+        "mean": mean, "code": code or [0] * hours, "precip": precip or [0] * hours, "is_day": [1] * hours,
+        "daily_time": list(days), "daily_max": [max(mean)] * len(days), "daily_min": [min(mean)] * len(days),
+        "daily_code": [(code or [0])[0]] * len(days),
+    }
+
+
+def test_agregat_berbobot(app_module):
+    result = app_module._aggregate_rollup([
+        _child("2026-10-19T00:00", [20.0, 24.0], n=1, code=[61, 3], precip=[80, 10]),
+        _child("2026-10-19T00:00", [28.0, 28.0], n=3, code=[3, 3], precip=[20, 30]),
+    ], "provinsi")
+    hourly = result["hourly"]
+    assert hourly["temperature_2m"] == [26.0, 27.0]
+    assert hourly["temperature_2m_min"] == [20.0, 24.0]
+    assert hourly["temperature_2m_max"] == [28.0, 28.0]
+    assert hourly["weather_code"] == [3, 3]
+    assert hourly["precipitation_probability"] == [80, 30]
+    assert result["rollup"]["children_count"] == 4
+    assert result["rollup"]["level"] == "provinsi"
+
+
+def test_sumbu_waktu_dari_anak_terbaru(app_module):
+    # Anak lama (di-fetch sejam lebih awal) tidak boleh menyeret sumbu ke jam yang sudah lewat
+    old = _child("2026-10-19T00:00", [10.0, 20.0, 30.0])
+    fresh = _child("2026-10-19T01:00", [22.0, 32.0, 40.0])
+    for order in ([old, fresh], [fresh, old]):
+        result = app_module._aggregate_rollup(order, "provinsi")
+        assert result["hourly"]["time"] == fresh["time"]
+        # Jam terakhir hanya dimiliki anak terbaru
+        assert result["hourly"]["temperature_2m"] == [21.0, 31.0, 40.0]
+
+
+def test_zona_waktu_diselaraskan_lewat_utc(app_module):
+    wib = [_child("2026-10-19T00:00", [20.0, 22.0]) for _ in range(2)]
+    # 01:00 WITA = 00:00 WIB: jam UTC yang sama dengan awal seri WIB
+    wita = _child("2026-10-19T01:00", [26.0, 28.0], offset=WITA)
+    result = app_module._aggregate_rollup(wib + [wita], "negara")
+    assert result["utc_offset_seconds"] == WIB and result["timezone_abbreviation"] == "WIB"
+    assert result["hourly"]["time"] == wib[0]["time"]
+    assert result["hourly"]["temperature_2m"] == [22.0, 24.0]
+
+
+def test_seri_harian_diselaraskan_lewat_tanggal(app_module):
+    today = _child("2026-10-19T00:00", [20.0, 22.0])
+    tomorrow = _child("2026-10-19T00:00", [30.0, 34.0], days=("2026-10-20", "2026-10-21"))
+    result = app_module._aggregate_rollup([today, tomorrow], "provinsi")
+    daily = result["daily"]
+    assert daily["time"] == ["2026-10-19", "2026-10-20"]
+    assert daily["temperature_2m_max"] == [22.0, 34.0]
+    assert daily["temperature_2m_min"] == [20.0, 20.0]
+
+
+def test_tanpa_seri_tidak_ada_agregat(app_module):
+    assert app_module._aggregate_rollup([], "provinsi") is None
+    assert app_module._aggregate_rollup([{**_child("2026-10-19T00:00", [1.0]), "time": []}], "provinsi") is None
+
+
+def _kabkota(app_module):
+    session = app_module.get_session_factory()()
+    try:
+        return app_module.get_warmup_candidates("kabkota", session)
+    finally:
+        session.close()
+
+
+def test_miss_request_user_di_debounce(app_module, backend, clock):
+    kabkota = _kabkota(app_module)
+    prov_ids = sorted({str(info["id"]).split(".", 1)[0] for info in kabkota})
+
+    # Miss pertama membangun rollup (belum ada penjadwal), miss berikutnya hanya menandai dirty
+    app_module.fetch_and_cache_weather(kabkota[:1])
+    first = app_module.get_weather_rollup(prov_ids[0], 1)
+    assert first["rollup"]["children_count"] == 1
+    app_module.fetch_and_cache_weather(kabkota[1:])
+    assert app_module.get_weather_rollup(prov_ids[0], 1)["rollup"] == first["rollup"]
+
+    # Warm-up menghitung ulang semua provinsi dirty sekaligus rollup nasional
+    assert app_module.refresh_weather_rollups(force=True) == prov_ids
+    assert app_module.get_weather_rollup("00", 0)["rollup"]["children_count"] == len(kabkota)
+    assert app_module.refresh_weather_rollups(force=True) == []
+
+    # Setelah jeda debounce, request user kembali boleh menghitung ulang
+    app_module.fetch_and_cache_weather(kabkota[:1])
+    assert app_module.refresh_weather_rollups() == []
+    clock.advance(app_module.ROLLUP_DEBOUNCE + 1)
+    app_module.fetch_and_cache_weather(kabkota[:1])
+    assert app_module.get_weather_rollup(prov_ids[0], 1)["rollup"]["updated_at"] > first["rollup"]["updated_at"]
@@ -0,0 +1,50 @@
+"""
+🧪 TEST WARM-UP CACHE
+Dengan jadwal WARMUP_INTERVAL, tiap entri harus di-refresh sekali per dua run (bukan setiap run)
+dan tidak pernah kedaluwarsa di antara dua run; satu run dibatasi waktu & budget upstream.
+"""
+
+
+def _run(app_module, **kwargs):
+    return app_module.warmup_weather_cache(priority=["kabkota"], **kwargs)
+
+
+def _ttls(app_module, ids):
+    return app_module.get_cache_ttls(f"weather:{wilayah_id}" for wilayah_id in ids)
+
+
+def test_refresh_sekali_per_dua_interval(app_module, backend, clock):
+    interval = app_module.WARMUP_INTERVAL
+    first = _run(app_module)
+    assert first["refreshed"] == first["checked"] > 0
+
+    refreshed_per_run = []
+    for _ in range(6):
+        # Tepat sebelum run berikutnya (terlambat selebar margin) tidak ada entri yang kedaluwarsa
+        clock.advance(interval + app_module.WARMUP_MARGIN - 1)
+        candidates = [info["id"] for info in _candidates(app_module)]
+        assert min(_ttls(app_module, candidates)) > 0
+        clock.advance(-(app_module.WARMUP_MARGIN - 1))
+        refreshed_per_run.append(_run(app_module)["refreshed"])
+    assert refreshed_per_run == [0, first["checked"]] * 3
+
+
+def _candidates(app_module):
+    session = app_module.get_session_factory()()
+    try:
+        return app_module.get_warmup_candidates("kabkota", session)
+    finally:
+        session.close()
+
+
+def test_run_dibatasi_waktu(app_module, backend):
+    stats = _run(app_module, time_budget=0)
+    assert stats["stopped"] == "time_budget"
+    assert stats["batches"] == 0 and stats["pending"] == stats["checked"]
+
+
+def test_run_berhenti_saat_batch_gagal_total(app_module, backend, monkeypatch):
+    monkeypatch.setattr(app_module, "fetch_and_cache_weather", lambda batch, **kw: {})
+    stats = _run(app_module, batch_size=1)
+    assert stats["stopped"] == "upstream"
+    assert stats["batches"] == 1 and stats["failed"] == 1
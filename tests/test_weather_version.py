@@ -0,0 +1,37 @@
+"""
+🧪 TEST VERSI DATA CUACA
+Versi disimpan bersama entri cache saat ditulis (satu kali serialisasi) dan dibaca ulang apa adanya.
+"""
+import json
+
+
+def test_versi_tersimpan_sama_dengan_yang_dibaca(app_module, backend):
+    data = {"hourly": {"time": ["2026-10-19T00:00"], "temperature_2m": [27.5]}, "daily": {}}
+    app_module.set_cache("weather:9.01", data, 60, stale_ttl=120, versioned=True)
+    expected = app_module._payload_version(json.dumps({k: v for k, v in data.items() if k != "version"}))
+
+    assert data["version"] == expected
+    assert app_module.get_cache("weather:9.01") == data
+    assert app_module.get_stale_cache("weather:9.01")["version"] == expected
+
+
+def test_versi_berubah_jika_isi_berubah(app_module, backend):
+    first = {"hourly": {"temperature_2m": [27.5]}}
+    second = {"hourly": {"temperature_2m": [28.0]}}
+    app_module.set_cache("weather:9.02", first, 60, versioned=True)
+    app_module.set_cache("weather:9.02", second, 60, versioned=True)
+    assert first["version"] != second["version"]
+
+
+def test_not_modified_memakai_versi_tersimpan(app_module, backend):
+    data = {"id": "9.03", "hourly": {"temperature_2m": [27.5]}}
+    app_module.set_cache("weather:9.03", data, 60, versioned=True)
+    cached = app_module.get_cache("weather:9.03")
+
+    result = app_module.versioned_wilayah_data({"9.03": cached}, {"9.03": data["version"]})
+    assert result["9.03"] == {"id": "9.03", "version": data["version"], "not_modified": True}
+    # Entri lama tanpa versi tetap mendapat versi; placeholder tidak
+    legacy = app_module.versioned_wilayah_data({"9.04": {"id": "9.04", "hourly": {}}}, {})
+    assert app_module.VERSION_REGEX.match(legacy["9.04"]["version"])
+    placeholder = app_module.unavailable_weather({"id": "9.05"})
+    assert "version" not in app_module.versioned_wilayah_data({"9.05": placeholder}, {})["9.05"]